@@ -0,0 +1,136 @@
+"""Admin digest: new-lead notifications batched into one summary email per N leads or T seconds."""
+import asyncio
+import time
+from typing import Dict, Mapping, Optional
+
+from db import connect
+from email_dispatcher import EmailMessage
+from email_rendering import render_admin_digest
+from outbox import EmailOutbox, insert_messages
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS admin_digest (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    user_email TEXT NOT NULL,
+    company_name TEXT,
+    roi_percentage REAL NOT NULL,
+    selected_plan TEXT NOT NULL,
+    total_annual_savings REAL NOT NULL
+)
+"""
+
+
+class AdminDigest:
+    """Durable accumulator of admin notifications, stored next to the email outbox.
+
+    Leads are committed to an `admin_digest` table in the outbox database.
+    Once `max_leads` are waiting, or the oldest has waited `max_age` seconds,
+    they are rendered into summary emails (at most `max_leads` rows each) and
+    moved to the outbox in the same transaction, so a crash neither loses a
+    lead nor sends it twice.
+    """
+
+    def __init__(self, outbox: EmailOutbox, admin_email: str, max_leads: int = 50, max_age: float = 900.0,
+                 check_interval: float = 30.0):
+        # A zero wait would make the flush loop spin (and NaN never expires)
+        if not max_age > 0:
+            raise ValueError(f"max_age must be a positive number of seconds, got {max_age!r}")
+        self.outbox = outbox
+        self.admin_email = admin_email
+        self.max_leads = max(1, max_leads)
+        self.max_age = max_age
+        self.check_interval = min(check_interval, max_age)
+        self.full: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.digests_sent = 0
+        self.leads_sent = 0
+
+    async def start(self) -> None:
+        # A single statement, so it can run inside a writer transaction
+        await self.outbox.writer.run(lambda conn: conn.execute(SCHEMA))
+        self.full = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop; leads still waiting stay stored for the next start"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def add(self, user_email: str, roi_data: Mapping) -> int:
+        """Store one lead; returns how many are now waiting"""
+        row = (
+            time.time(), user_email, roi_data["inputs"].get("company_name"), roi_data["roi_percentage"],
+            roi_data["selected_plan"], roi_data["total_annual_savings"],
+        )
+
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO admin_digest (created_at, user_email, company_name, roi_percentage, selected_plan, "
+                "total_annual_savings) VALUES (?, ?, ?, ?, ?, ?)", row
+            )
+            return conn.execute("SELECT COUNT(*) FROM admin_digest").fetchone()[0]
+
+        waiting = await self.outbox.writer.run(insert)
+        if waiting >= self.max_leads and self.full is not None:
+            self.full.set()
+        return waiting
+
+    async def flush(self, force: bool = False) -> int:
+        """Move waiting leads into summary emails if a threshold is reached (or `force`); returns leads sent"""
+        now = time.time()
+
+        def move(conn):
+            leads = conn.execute(
+                "SELECT id, created_at, user_email, company_name, roi_percentage, selected_plan, total_annual_savings "
+                "FROM admin_digest ORDER BY id"
+            ).fetchall()
+            if not leads:
+                return 0, 0
+            if not force and len(leads) < self.max_leads and now - leads[0]["created_at"] < self.max_age:
+                return 0, 0
+            messages = [
+                EmailMessage(self.admin_email, *render_admin_digest(leads[start:start + self.max_leads]))
+                for start in range(0, len(leads), self.max_leads)
+            ]
+            insert_messages(conn, messages, now)
+            conn.execute("DELETE FROM admin_digest WHERE id <= ?", (leads[-1]["id"],))
+            return len(messages), len(leads)
+
+        digests, leads = await self.outbox.writer.run(move)
+        if digests:
+            self.digests_sent += digests
+            self.leads_sent += leads
+            self.outbox.notify()
+        return leads
+
+    def waiting(self) -> int:
+        conn = connect(self.outbox.path, readonly=True)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM admin_digest").fetchone()[0]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        """Waiting leads (blocking read on a separate connection) and flush counters"""
+        return {
+            "waiting": self.waiting(),
+            "max_leads": self.max_leads,
+            "max_age_seconds": self.max_age,
+            "digests_sent": self.digests_sent,
+            "leads_sent": self.leads_sent,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            self.full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing admin digest: {str(e)}")
+            try:
+                await asyncio.wait_for(self.full.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,137 @@
+"""Admission control: per-client token buckets and global load shedding."""
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Rejection:
+    status_code: int
+    reason: str
+    detail: str
+    retry_after: float
+
+
+class TokenBucketLimiter:
+    """`rate` tokens per second up to `burst`, tracked per key.
+
+    At most `max_keys` buckets are kept; the least recently used is evicted
+    first. An evicted client only comes back with a full bucket, which is the
+    state an idle client would have reached anyway.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [tokens, last refill (monotonic)]
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.evictions = 0
+
+    def acquire(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take `cost` tokens; returns 0 if allowed, else seconds until they would be available"""
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        # A cost above the burst is admitted from a full bucket and leaves it in debt
+        needed = min(cost, self.burst)
+        if bucket[0] >= needed:
+            bucket[0] -= cost
+            return 0.0
+        return (needed - bucket[0]) / self.rate
+
+
+def _per_minute_limiter(per_minute: float, burst: float, max_keys: int) -> Optional[TokenBucketLimiter]:
+    if per_minute <= 0:
+        return None
+    return TokenBucketLimiter(per_minute / 60, burst or per_minute, max_keys)
+
+
+class AdmissionController:
+    """Decides whether a request may proceed.
+
+    Limits are checked cheapest first: global in-flight requests, then the
+    sampled email backlog (both 503), then the client's IP and email buckets
+    (429). A limit of 0 disables that check.
+    """
+
+    def __init__(self, ip_per_minute: float = 0, ip_burst: float = 0, email_per_minute: float = 0,
+                 email_burst: float = 0, max_keys: int = 100000, max_in_flight: int = 0,
+                 max_email_backlog: int = 0):
+        self.ip_limiter = _per_minute_limiter(ip_per_minute, ip_burst, max_keys)
+        self.email_limiter = _per_minute_limiter(email_per_minute, email_burst, max_keys)
+        self.max_in_flight = max_in_flight
+        self.max_email_backlog = max_email_backlog
+        # Maintained by InFlightMiddleware
+        self.in_flight = 0
+        # Refreshed by the backlog sampler
+        self.email_backlog = 0
+        self.sampler: Optional[asyncio.Task] = None
+
+    def check(self, client_ip: str, emails: Iterable[str] = (), cost: float = 1.0) -> Optional[Rejection]:
+        if self.max_in_flight and self.in_flight > self.max_in_flight:
+            return Rejection(503, "in_flight", "Server is overloaded, please retry shortly", 1.0)
+        if self.max_email_backlog and self.email_backlog > self.max_email_backlog:
+            return Rejection(503, "email_backlog", "Email delivery is backlogged, please retry later", 30.0)
+        if self.ip_limiter is not None:
+            retry_after = self.ip_limiter.acquire(client_ip, cost)
+            if retry_after:
+                return Rejection(429, "rate_limit_ip", "Too many requests from this address", retry_after)
+        if self.email_limiter is not None:
+            for email in emails:
+                retry_after = self.email_limiter.acquire(email.lower())
+                if retry_after:
+                    return Rejection(429, "rate_limit_email", "Too many requests for this email", retry_after)
+        return None
+
+    async def start_backlog_sampler(self, backlog: Callable[[], int], interval: float = 1.0) -> None:
+        """Poll `backlog` (a blocking call, run in a thread) every `interval` seconds"""
+        async def sample() -> None:
+            while True:
+                try:
+                    self.email_backlog = await asyncio.to_thread(backlog)
+                except Exception as e:
+                    print(f"Error sampling email backlog: {str(e)}")
+                await asyncio.sleep(interval)
+
+        await self.stop_backlog_sampler()
+        self.sampler = asyncio.create_task(sample())
+
+    async def stop_backlog_sampler(self) -> None:
+        if self.sampler is not None:
+            self.sampler.cancel()
+            await asyncio.gather(self.sampler, return_exceptions=True)
+            self.sampler = None
+
+    def tracked_keys(self) -> Tuple[int, int]:
+        return (
+            len(self.ip_limiter.buckets) if self.ip_limiter else 0,
+            len(self.email_limiter.buckets) if self.email_limiter else 0,
+        )
+
+
+class InFlightMiddleware:
+    """Counts HTTP requests in progress, including their background tasks"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
@@ -0,0 +1,321 @@
+"""Incrementally maintained calculation analytics: per day and plan counters, sums and ROI quantile sketches."""
+import asyncio
+import json
+import math
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from db import GroupCommitWriter, connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_buckets (
+    day TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    roi_sum REAL NOT NULL,
+    savings_sum REAL NOT NULL,
+    investment_sum REAL NOT NULL,
+    hours_sum REAL NOT NULL,
+    roi_sketch TEXT NOT NULL,
+    PRIMARY KEY (day, plan)
+);
+"""
+
+# Relative error of sketch quantiles: p50/p90 are within 1% of a true sample value
+RELATIVE_ACCURACY = 0.01
+# |values| below this share one zero bin (ROI is reported with two decimals)
+MIN_MAGNITUDE = 0.005
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch).
+
+    Values are counted in logarithmically spaced bins, with separate stores
+    for negative values and a zero bin. Two sketches with the same accuracy
+    merge exactly by adding bin counts, so per-bucket and per-process
+    sketches combine into the sketch of the union. Size grows with the
+    log of the value range (a few hundred bins for any realistic ROI), not
+    with the number of values.
+    """
+
+    __slots__ = ("relative_accuracy", "gamma", "log_gamma", "positive", "negative", "zero", "count")
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        if not math.isfinite(value):
+            return
+        if abs(value) < MIN_MAGNITUDE:
+            self.zero += count
+        else:
+            store = self.positive if value > 0 else self.negative
+            key = math.ceil(math.log(abs(value)) / self.log_gamma)
+            store[key] = store.get(key, 0) + count
+        self.count += count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different accuracies")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        # Midpoint (in relative terms) of the bin (gamma^(key-1), gamma^key]
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-quantile (0 <= q <= 1), None if empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending order: most negative first, then zero, then positive
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "relative_accuracy": self.relative_accuracy, "zero": self.zero,
+            "positive": self.positive, "negative": self.negative,
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "QuantileSketch":
+        data = json.loads(text)
+        sketch = cls(data["relative_accuracy"])
+        sketch.zero = data["zero"]
+        sketch.positive = {int(key): count for key, count in data["positive"].items()}
+        sketch.negative = {int(key): count for key, count in data["negative"].items()}
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class BucketStats:
+    """Counters, sums and the ROI sketch of the calculations in one bucket"""
+
+    __slots__ = ("count", "roi_sum", "savings_sum", "investment_sum", "hours_sum", "roi_sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.roi_sum = 0.0
+        self.savings_sum = 0.0
+        self.investment_sum = 0.0
+        self.hours_sum = 0.0
+        self.roi_sketch = QuantileSketch()
+
+    def add(self, record: Mapping) -> None:
+        self.count += 1
+        self.roi_sum += record["roi_percentage"]
+        self.savings_sum += record["total_annual_savings"]
+        self.investment_sum += record["total_investment"]
+        self.hours_sum += record["total_hours_saved_annually"]
+        self.roi_sketch.add(record["roi_percentage"])
+
+    def merge(self, other: "BucketStats") -> None:
+        self.count += other.count
+        self.roi_sum += other.roi_sum
+        self.savings_sum += other.savings_sum
+        self.investment_sum += other.investment_sum
+        self.hours_sum += other.hours_sum
+        self.roi_sketch.merge(other.roi_sketch)
+
+    def row(self) -> tuple:
+        return (self.count, self.roi_sum, self.savings_sum, self.investment_sum, self.hours_sum,
+                self.roi_sketch.to_json())
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> "BucketStats":
+        stats = cls()
+        stats.count = row["count"]
+        stats.roi_sum = row["roi_sum"]
+        stats.savings_sum = row["savings_sum"]
+        stats.investment_sum = row["investment_sum"]
+        stats.hours_sum = row["hours_sum"]
+        stats.roi_sketch = QuantileSketch.from_json(row["roi_sketch"])
+        return stats
+
+
+def bucket_key(record: Mapping) -> Tuple[str, str]:
+    """(day, plan) of a ROICalculationResponse record"""
+    return record["calculation_date"][:10], record["selected_plan"]
+
+
+def merge_buckets(buckets: Iterable[Tuple[Tuple[str, str], BucketStats]]) -> Dict[Tuple[str, str], BucketStats]:
+    merged: Dict[Tuple[str, str], BucketStats] = {}
+    for key, stats in buckets:
+        merged.setdefault(key, BucketStats()).merge(stats)
+    return merged
+
+
+def summarize(stats: BucketStats, plan_counts: Optional[Dict[str, int]] = None) -> dict:
+    """Dashboard figures of one (possibly merged) bucket"""
+    summary = {
+        "calculations": stats.count,
+        "roi_median": _round(stats.roi_sketch.quantile(0.5)),
+        "roi_p90": _round(stats.roi_sketch.quantile(0.9)),
+        "roi_mean": _round(stats.roi_sum / stats.count if stats.count else None),
+        "total_annual_savings": round(stats.savings_sum, 2),
+        "total_investment": round(stats.investment_sum, 2),
+        "total_hours_saved_annually": round(stats.hours_sum, 2),
+    }
+    if plan_counts is not None:
+        summary["plan_mix"] = {plan: round(count / stats.count, 4) for plan, count in sorted(plan_counts.items())}
+    return summary
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+
+class CalculationAnalytics:
+    """Per (day, plan) aggregates, updated as calculations are stored.
+
+    record() only touches an in-memory delta. Every `snapshot_interval`
+    seconds (and at shutdown) the delta is merged into the SQLite
+    `analytics_buckets` table in one transaction; several worker processes
+    share the file, and SQLite's write lock serializes their merges. Queries
+    read the merged table plus this process's unsnapshotted delta, so they
+    cost O(buckets) and see other workers' calculations at most one
+    interval late.
+    """
+
+    def __init__(self, path: str, snapshot_interval: float = 10.0):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.writer = GroupCommitWriter(path, SCHEMA)
+        self.delta: Dict[Tuple[str, str], BucketStats] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.task: Optional[asyncio.Task] = None
+        self.snapshots = 0
+
+    def reader(self):
+        """Per-thread read-only connection"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path, readonly=True)
+        return conn
+
+    async def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the snapshot loop, write the last delta and close the database"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.snapshot()
+        self.writer.close()
+
+    def record(self, record: Mapping) -> None:
+        key = bucket_key(record)
+        with self.lock:
+            stats = self.delta.get(key)
+            if stats is None:
+                stats = self.delta[key] = BucketStats()
+            stats.add(record)
+
+    async def snapshot(self) -> int:
+        """Merge the in-memory delta into the shared table; returns the buckets written"""
+        with self.lock:
+            delta, self.delta = self.delta, {}
+        if not delta:
+            return 0
+
+        def merge(conn):
+            for (day, plan), stats in delta.items():
+                row = conn.execute(
+                    "SELECT count, roi_sum, savings_sum, investment_sum, hours_sum, roi_sketch "
+                    "FROM analytics_buckets WHERE day = ? AND plan = ?", (day, plan),
+                ).fetchone()
+                merged = BucketStats.from_row(row) if row else BucketStats()
+                merged.merge(stats)
+                conn.execute(
+                    "INSERT OR REPLACE INTO analytics_buckets (day, plan, count, roi_sum, savings_sum, "
+                    "investment_sum, hours_sum, roi_sketch) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (day, plan) + merged.row(),
+                )
+
+        try:
+            await self.writer.run(merge)
+        except Exception:
+            # Keep the counts for the next attempt
+            with self.lock:
+                for key, stats in delta.items():
+                    self.delta.setdefault(key, BucketStats()).merge(stats)
+            raise
+        self.snapshots += 1
+        return len(delta)
+
+    def buckets(self, since: Optional[str] = None, until: Optional[str] = None) -> Dict[Tuple[str, str], BucketStats]:
+        """Merged (day, plan) aggregates with since <= day <= until (blocking read)"""
+        where, params = [], []
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if until:
+            where.append("day <= ?")
+            params.append(until)
+        rows = self.reader().execute(
+            "SELECT day, plan, count, roi_sum, savings_sum, investment_sum, hours_sum, roi_sketch "
+            "FROM analytics_buckets" + (" WHERE " + " AND ".join(where) if where else ""), params,
+        ).fetchall()
+        stored = [((row["day"], row["plan"]), BucketStats.from_row(row)) for row in rows]
+        with self.lock:
+            pending = [(key, stats) for key, stats in self.delta.items()
+                       if (not since or key[0] >= since) and (not until or key[0] <= until)]
+            # Merged while holding the lock: record() mutates these objects
+            return merge_buckets(stored + pending)
+
+    def report(self, since: Optional[str] = None, until: Optional[str] = None, group_by: str = "day") -> dict:
+        """Dashboard summaries grouped by "day", "plan" or "day_plan", plus overall totals"""
+        buckets = self.buckets(since, until)
+        groups: Dict[tuple, Tuple[BucketStats, Dict[str, int]]] = {}
+        total, total_plans = BucketStats(), {}
+        for (day, plan), stats in sorted(buckets.items()):
+            group = {"day": (day,), "plan": (plan,), "day_plan": (day, plan)}[group_by]
+            merged, plan_counts = groups.setdefault(group, (BucketStats(), {}))
+            merged.merge(stats)
+            plan_counts[plan] = plan_counts.get(plan, 0) + stats.count
+            total.merge(stats)
+            total_plans[plan] = total_plans.get(plan, 0) + stats.count
+        names = {"day": ("day",), "plan": ("plan",), "day_plan": ("day", "plan")}[group_by]
+        rows: List[dict] = [
+            {**dict(zip(names, group)), **summarize(merged, plan_counts if group_by == "day" else None)}
+            for group, (merged, plan_counts) in sorted(groups.items())
+        ]
+        return {"group_by": group_by, "buckets": rows, "totals": summarize(total, total_plans)}
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            pending = sum(stats.count for stats in self.delta.values())
+        return {"pending_calculations": pending, "snapshots": self.snapshots}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                print(f"Error writing analytics snapshot: {str(e)}")
@@ -0,0 +1,237 @@
+"""Load and latency benchmark of the API, in-process (ASGI) and under a local uvicorn server.
+
+For every endpoint and concurrency level, `concurrency` clients send requests
+back to back for `--duration` seconds; throughput and latency percentiles are
+printed and written as JSON (one file per commit by default), so runs can be
+compared across commits with --compare. Emails are stubbed out and
+calculations are stored in a temporary database. Run from the backend
+directory:
+
+    python -m benchmarks.bench_api --transport asgi uvicorn --concurrency 1 8 32
+    python -m benchmarks.bench_api --compare benchmarks/results/<older commit>.json
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+CALCULATION = {
+    "monthly_inquiries": 1500,
+    "automation_percentage": 65,
+    "team_members": 4,
+    "bitrix24_plan": "Professional Plan",
+    "monthly_price_usd": 199,
+    "average_ticket_ars": 15000,
+    "current_conversion_rate": 2,
+    "expected_conversion_rate": 3,
+    "user_email": "bench@example.com",
+    "company_name": "Bench SA",
+}
+
+# name -> (method, path, JSON body)
+ENDPOINTS = {
+    "calculate-roi": ("POST", "/api/calculate-roi", CALCULATION),
+    "bitrix24-plans": ("GET", "/api/bitrix24-plans", None),
+    "health": ("GET", "/api/health", None),
+}
+
+
+async def no_email(*args) -> None:
+    pass
+
+
+def load_app():
+    """The app with emails stubbed (the dispatcher stays off without SENDGRID_API_KEY)"""
+    os.environ.pop("SENDGRID_API_KEY", None)
+    # One client sending one payload: measure the work, not the rate limiter or replays
+    os.environ.update(RATE_LIMIT_IP_PER_MINUTE="0", RATE_LIMIT_EMAIL_PER_MINUTE="0", DEDUP_WINDOW_SECONDS="0")
+    import server
+    server.send_roi_analysis_email = no_email
+    return server.app
+
+
+async def measure(client: httpx.AsyncClient, endpoint: str, concurrency: int, duration: float,
+                  warmup: float) -> dict:
+    method, path, body = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(deadline: float, record: bool) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            elapsed = time.perf_counter() - started
+            if record:
+                if response.status_code >= 400:
+                    errors += 1
+                latencies.append(elapsed)
+
+    await asyncio.gather(*(worker(time.perf_counter() + warmup, False) for _ in range(concurrency)))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration, True) for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> dict:
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99]) if latencies else (None,) * 3
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 3) if latencies else None,
+        "p95_ms": round(float(p95), 3) if latencies else None,
+        "p99_ms": round(float(p99), 3) if latencies else None,
+    }
+
+
+async def run_levels(client: httpx.AsyncClient, transport: str, args) -> List[dict]:
+    results = []
+    for endpoint in args.endpoints:
+        for concurrency in args.concurrency:
+            result = {"transport": transport, "endpoint": endpoint, "concurrency": concurrency,
+                      **await measure(client, endpoint, concurrency, args.duration, args.warmup)}
+            print(format_result(result))
+            results.append(result)
+    return results
+
+
+async def bench_asgi(args) -> List[dict]:
+    app = load_app()
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_levels(client, "asgi", args)
+    finally:
+        await app.router.shutdown()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_uvicorn(args) -> List[dict]:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_api", "--serve", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/api/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_levels(client, "uvicorn", args)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def serve(port: int) -> None:
+    import uvicorn
+    uvicorn.run(load_app(), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def format_result(result: dict) -> str:
+    return (f"{result['transport']:<8} {result['endpoint']:<15} c={result['concurrency']:<4} "
+            f"{result['requests_per_second']:>9.1f} req/s  p50 {result['p50_ms']:>8.3f} ms  "
+            f"p95 {result['p95_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms  errors {result['errors']}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline_path: str) -> None:
+    """Print throughput and p99 change against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous: Dict[tuple, dict] = {
+        (r["transport"], r["endpoint"], r["concurrency"]): r for r in baseline["results"]
+    }
+    print(f"\nvs {baseline.get('commit') or baseline_path}:")
+    for result in results:
+        old = previous.get((result["transport"], result["endpoint"], result["concurrency"]))
+        if old is None or not old["requests_per_second"] or not old["p99_ms"] or result["p99_ms"] is None:
+            continue
+        print(f"{result['transport']:<8} {result['endpoint']:<15} c={result['concurrency']:<4} "
+              f"throughput {(result['requests_per_second'] / old['requests_per_second'] - 1) * 100:+6.1f}%  "
+              f"p99 {(result['p99_ms'] / old['p99_ms'] - 1) * 100:+6.1f}%")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transport", nargs="+", choices=["asgi", "uvicorn"], default=["asgi", "uvicorn"])
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of unmeasured load per level")
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    # Keep benchmark calculations out of the real history
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["CALCULATIONS_DB_PATH"] = os.path.join(tmp.name, "calculations.db")
+    os.environ["ANALYTICS_DB_PATH"] = os.path.join(tmp.name, "analytics.db")
+    os.environ["REPORT_CACHE_DIR"] = os.path.join(tmp.name, "reports")
+
+    results = []
+    for transport in args.transport:
+        results += asyncio.run(bench_asgi(args) if transport == "asgi" else bench_uvicorn(args))
+    tmp.cleanup()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "duration": args.duration,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
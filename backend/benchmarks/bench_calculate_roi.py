@@ -0,0 +1,101 @@
+"""Requests per second of /api/calculate-roi with and without the orjson fast path.
+
+Calls the ASGI app directly (no client, no network; the email task is
+stubbed and the calculation store is not started), so the numbers are the
+server-side cost of a request. Rounds of both modes are interleaved and the
+median reported. Run from the backend directory:
+
+    python -m benchmarks.bench_calculate_roi --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import server
+
+PAYLOAD = json.dumps({
+    "monthly_inquiries": 1500,
+    "automation_percentage": 65,
+    "team_members": 4,
+    "bitrix24_plan": "Professional Plan",
+    "monthly_price_usd": 199,
+    "average_ticket_ars": 15000,
+    "current_conversion_rate": 2,
+    "expected_conversion_rate": 3,
+    "user_email": "bench@example.com",
+    "company_name": "Bench SA",
+}).encode()
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "POST",
+    "scheme": "http",
+    "path": "/api/calculate-roi",
+    "raw_path": b"/api/calculate-roi",
+    "query_string": b"",
+    "root_path": "",
+    "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                (b"content-length", str(len(PAYLOAD)).encode())],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+async def no_email(*args) -> None:
+    pass
+
+
+async def request() -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": PAYLOAD, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await server.app(dict(SCOPE), receive, send)
+    return status
+
+
+async def run(requests: int, fast_path: bool) -> float:
+    server.ROI_FAST_PATH = fast_path
+    started = time.perf_counter()
+    for _ in range(requests):
+        status = await request()
+        assert status == 200, status
+    return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    server.send_roi_analysis_email = no_email
+    # One client sending one payload: measure the work, not the rate limiter or replays
+    server.admission.ip_limiter = server.admission.email_limiter = None
+    server.submissions.window = 0
+    results = {False: [], True: []}
+
+    async def bench() -> None:
+        await run(200, True)  # warm up
+        for _ in range(args.rounds):
+            for fast_path in (False, True):
+                results[fast_path].append(await run(args.requests, fast_path))
+
+    asyncio.run(bench())
+    before, after = statistics.median(results[False]), statistics.median(results[True])
+    print(f"response_model path: {before:8.0f} req/s")
+    print(f"orjson fast path:    {after:8.0f} req/s  ({(after / before - 1) * 100:+.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
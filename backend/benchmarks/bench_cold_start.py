@@ -0,0 +1,132 @@
+"""Cold-start profile of the API: import cost by module and time to the first response.
+
+Imports `server` in a fresh interpreter under ``-X importtime`` and reports
+where the time goes, grouped by top-level package. Then starts uvicorn
+`--runs` times and measures from process spawn until /api/health first
+answers 200. Exits with status 1 if the median time to first response or
+the import time exceeds its budget, or if a module that should load lazily
+(SendGrid, httpx, NumPy) is imported at startup. Run from the backend
+directory:
+
+    python -m benchmarks.bench_cold_start --runs 5 --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.bench_api import BACKEND_DIR, free_port
+
+# Loaded on first use (email send, FX fetch, vectorized endpoints), never by `import server`
+LAZY_MODULES = ("sendgrid", "python_http_client", "httpx", "numpy")
+
+
+def server_env(data_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("SENDGRID_API_KEY", None)
+    env["CALCULATIONS_DB_PATH"] = os.path.join(data_dir, "calculations.db")
+    env["EMAIL_OUTBOX_PATH"] = os.path.join(data_dir, "outbox.db")
+    env["ANALYTICS_DB_PATH"] = os.path.join(data_dir, "analytics.db")
+    env["REPORT_CACHE_DIR"] = os.path.join(data_dir, "reports")
+    return env
+
+
+def import_profile(env: Dict[str, str]) -> Tuple[float, Dict[str, float], List[str]]:
+    """Seconds to import server, self time per top-level package, and every module imported"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    by_package: Dict[str, float] = defaultdict(float)
+    modules, total = [], 0.0
+    for line in completed.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.append(name)
+        by_package[name.split(".")[0]] += int(self_us) / 1e6
+        if name == "server":
+            total = int(cumulative_us) / 1e6
+    return total, dict(by_package), modules
+
+
+def interpreter_startup(env: Dict[str, str]) -> float:
+    """Seconds for a bare `python -c pass`, the floor under every cold start"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def time_to_first_response(env: Dict[str, str], timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until GET /api/health returns 200"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"no response from {url} within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import breakdown")
+    parser.add_argument("--budget-ms", type=float, default=2000.0,
+                        help="maximum median time to first response (0: no budget)")
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0,
+                        help="maximum time to import server (0: no budget)")
+    args = parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = server_env(data_dir)
+        import_seconds, by_package, modules = import_profile(env)
+        baseline = statistics.median(interpreter_startup(env) for _ in range(args.runs))
+        first_response = sorted(time_to_first_response(env) for _ in range(args.runs))
+
+    print(f"import server: {import_seconds * 1000:7.1f} ms  ({len(modules)} modules)")
+    for package, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<28} {seconds * 1000:7.1f} ms  {seconds / import_seconds * 100:5.1f}%")
+    median = statistics.median(first_response)
+    print(f"interpreter startup:    {baseline * 1000:7.1f} ms (median)")
+    print(f"time to first response: {median * 1000:7.1f} ms (median of {args.runs}; "
+          f"min {first_response[0] * 1000:.1f}, max {first_response[-1] * 1000:.1f})")
+
+    eager = sorted({name.split(".")[0] for name in modules} & set(LAZY_MODULES))
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    if args.import_budget_ms and import_seconds * 1000 > args.import_budget_ms:
+        failures.append(f"import time {import_seconds * 1000:.0f} ms exceeds {args.import_budget_ms:.0f} ms")
+    if args.budget_ms and median * 1000 > args.budget_ms:
+        failures.append(f"time to first response {median * 1000:.0f} ms exceeds {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
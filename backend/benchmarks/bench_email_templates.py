@@ -0,0 +1,205 @@
+"""Micro-benchmark: per-email render time of the file templates vs the inline f-strings.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_email_templates
+"""
+import argparse
+import timeit
+
+from email_rendering import render_admin_email, render_user_email
+
+
+def legacy_render(user_email: str, roi_data: dict):
+    """The previous inline f-string rendering from send_roi_analysis_email, kept for comparison"""
+    # User email content
+    user_subject = "Su Análisis ROI - Bitrix24 + Chatbot"
+    user_html_content = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
+            <div style="background: linear-gradient(135deg, #007bff 0%, #0056b3 100%); color: white; padding: 30px; text-align: center;">
+                <h1 style="margin: 0; font-size: 28px;">Efficiency24</h1>
+                <p style="margin: 10px 0 0 0; font-size: 16px;">Análisis ROI - Bitrix24 + Chatbot</p>
+            </div>
+            
+            <div style="padding: 30px; background: #f8f9fa;">
+                <h2 style="color: #007bff; margin-bottom: 20px;">Resumen de su Análisis ROI</h2>
+                
+                <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                    <h3 style="color: #28a745; text-align: center; margin-bottom: 15px;">ROI Proyectado: {roi_data['roi_percentage']}%</h3>
+                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-top: 20px;">
+                        <div style="text-align: center; padding: 15px; background: #e8f5e8; border-radius: 6px;">
+                            <strong style="color: #28a745;">Ahorro Anual</strong><br>
+                            <span style="font-size: 20px; color: #333;">${roi_data['total_annual_savings']:,.0f} ARS</span>
+                        </div>
+                        <div style="text-align: center; padding: 15px; background: #ffe8e8; border-radius: 6px;">
+                            <strong style="color: #dc3545;">Inversión Total</strong><br>
+                            <span style="font-size: 20px; color: #333;">${roi_data['total_investment']:,.0f} ARS</span>
+                        </div>
+                    </div>
+                </div>
+                
+                <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
+                    <h3 style="color: #007bff; margin-bottom: 15px;">Plan Bitrix24 Seleccionado</h3>
+                    <p><strong>Plan:</strong> {roi_data['selected_plan']}</p>
+                    <p><strong>Costo Mensual:</strong> ${roi_data['monthly_price_usd']} USD</p>
+                    <p><strong>Costo Anual:</strong> ${roi_data['annual_license_cost_usd']} USD</p>
+                </div>
+                
+                <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
+                    <h3 style="color: #007bff; margin-bottom: 15px;">Desglose de Ahorros</h3>
+                    <div style="margin-bottom: 15px; padding: 15px; background: #e3f2fd; border-radius: 6px;">
+                        <strong>Ahorro por Chatbot:</strong> ${roi_data['chatbot_annual_savings']:,.0f} ARS/año<br>
+                        <small style="color: #666;">({roi_data['chatbot_monthly_hours_saved'] * 12:.1f} horas ahorradas anualmente)</small>
+                    </div>
+                    <div style="margin-bottom: 15px; padding: 15px; background: #e8f5e8; border-radius: 6px;">
+                        <strong>Ahorro por CRM:</strong> ${roi_data['crm_annual_savings']:,.0f} ARS/año<br>
+                        <small style="color: #666;">({roi_data['crm_annual_hours_saved']:.1f} horas ahorradas anualmente)</small>
+                    </div>
+                    <div style="padding: 15px; background: #fff3cd; border-radius: 6px;">
+                        <strong>Total Horas Ahorradas:</strong> {roi_data['total_hours_saved_annually']:.1f} horas/año
+                    </div>
+                </div>
+                
+                {"<div style='background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;'><h3 style='color: #007bff; margin-bottom: 15px;'>Ingresos Adicionales Estimados</h3><p style='font-size: 18px; color: #28a745;'><strong>${roi_data['additional_annual_revenue']:,.0f} ARS/año</strong></p><p style='color: #666;'>Por mejora en tasa de conversión</p></div>" if roi_data.get('additional_annual_revenue') else ""}
+                
+                <div style="background: #007bff; color: white; padding: 20px; border-radius: 8px; text-align: center;">
+                    <h3 style="margin: 0 0 10px 0;">¿Listo para dar el siguiente paso?</h3>
+                    <p style="margin: 0; font-size: 14px;">Nuestro equipo se pondrá en contacto contigo para analizar estos resultados y ayudarte a implementar la solución perfecta para tu PyME.</p>
+                </div>
+            </div>
+            
+            <div style="background: #333; color: #ccc; padding: 20px; text-align: center; font-size: 12px;">
+                <p style="margin: 0;">© 2024 Efficiency24. Todos los derechos reservados.</p>
+                <p style="margin: 5px 0 0 0;">Análisis generado el {roi_data['calculation_date'][:10]}</p>
+            </div>
+        </body>
+    </html>
+    """
+    
+    # Admin notification email
+    admin_subject = f"Nueva Consulta ROI - {roi_data.get('company_name', 'Sin especificar')}"
+    admin_html_content = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="background: #007bff; color: white; padding: 20px;">
+                <h1 style="margin: 0;">Nueva Consulta ROI Recibida</h1>
+            </div>
+            
+            <div style="padding: 20px; background: #f8f9fa;">
+                <h2>Información del Lead</h2>
+                <p><strong>Email:</strong> {user_email}</p>
+                <p><strong>Empresa:</strong> {roi_data.get('company_name', 'No especificada')}</p>
+                <p><strong>Fecha:</strong> {roi_data['calculation_date']}</p>
+                <p><strong>ID de Cálculo:</strong> {roi_data['calculation_id']}</p>
+                
+                <h3>Resultados ROI</h3>
+                <ul>
+                    <li><strong>ROI:</strong> {roi_data['roi_percentage']}%</li>
+                    <li><strong>Ahorro Anual:</strong> ${roi_data['total_annual_savings']:,.0f} ARS</li>
+                    <li><strong>Inversión Total:</strong> ${roi_data['total_investment']:,.0f} ARS</li>
+                    <li><strong>Plan Bitrix24:</strong> {roi_data['selected_plan']} (${roi_data['monthly_price_usd']}/mes)</li>
+                    <li><strong>Horas Ahorradas/Año:</strong> {roi_data['total_hours_saved_annually']:.1f}</li>
+                </ul>
+                
+                <h3>Parámetros de Entrada</h3>
+                <ul>
+                    <li><strong>Consultas mensuales:</strong> {roi_data['inputs']['monthly_inquiries']}</li>
+                    <li><strong>% Automatización chatbot:</strong> {roi_data['inputs']['automation_percentage']}%</li>
+                    <li><strong>Minutos por consulta:</strong> {roi_data['inputs']['minutes_per_inquiry']}</li>
+                    <li><strong>Horas CRM mensuales:</strong> {roi_data['inputs']['monthly_crm_hours']}</li>
+                    <li><strong>% Automatización CRM:</strong> {roi_data['inputs']['crm_automation_percentage']}%</li>
+                    <li><strong>Miembros del equipo:</strong> {roi_data['inputs']['team_members']}</li>
+                    <li><strong>Costo por hora:</strong> ${roi_data['inputs']['hourly_cost_ars']} ARS</li>
+                </ul>
+                
+                {"<h3>Proyección de Ingresos</h3><ul><li><strong>Ticket promedio:</strong> $" + str(roi_data['inputs'].get('average_ticket_ars', 'N/A')) + " ARS</li><li><strong>Conversión actual:</strong> " + str(roi_data['inputs'].get('current_conversion_rate', 'N/A')) + "%</li><li><strong>Conversión esperada:</strong> " + str(roi_data['inputs'].get('expected_conversion_rate', 'N/A')) + "%</li><li><strong>Ingresos adicionales:</strong> $" + str(roi_data.get('additional_annual_revenue', 0)) + " ARS/año</li></ul>" if roi_data.get('additional_annual_revenue') else ""}
+            </div>
+        </body>
+    </html>
+    """
+    return user_subject, user_html_content, admin_subject, admin_html_content
+
+
+def template_render(user_email: str, roi_data: dict):
+    user_subject, user_html_content = render_user_email(roi_data)
+    admin_subject, admin_html_content = render_admin_email(user_email, roi_data)
+    return user_subject, user_html_content, admin_subject, admin_html_content
+
+
+def sample_roi_data(with_revenue: bool) -> dict:
+    return {
+        "inputs": {
+            "monthly_inquiries": 1000,
+            "automation_percentage": 60.0,
+            "minutes_per_inquiry": 4,
+            "monthly_crm_hours": 40,
+            "crm_automation_percentage": 50.0,
+            "team_members": 3,
+            "hourly_cost_ars": 5000,
+            "bitrix24_plan": "Standard Plan",
+            "monthly_price_usd": 99,
+            "implementation_cost": 1000000,
+            "average_ticket_ars": 15000 if with_revenue else None,
+            "current_conversion_rate": 2.0 if with_revenue else None,
+            "expected_conversion_rate": 3.0 if with_revenue else None,
+            "company_name": "ACME SRL",
+        },
+        "selected_plan": "Standard Plan",
+        "monthly_price_usd": 99,
+        "annual_license_cost_usd": 1188,
+        "chatbot_monthly_hours_saved": 40.0,
+        "chatbot_annual_savings": 2400000.0,
+        "crm_annual_hours_saved": 720.0,
+        "crm_annual_savings": 3600000.0,
+        "total_annual_savings": 6000000.0,
+        "total_investment": 1950400,
+        "roi_percentage": 207.63,
+        "additional_annual_revenue": 1800000.0 if with_revenue else None,
+        "total_hours_saved_annually": 1200.0,
+        "calculation_date": "2024-05-01T12:00:00.000000",
+        "calculation_id": "00000000-0000-0000-0000-000000000000",
+        "user_email": "lead@example.com",
+    }
+
+
+def normalize(rendered) -> list:
+    """Rendered emails without indentation and blank lines (the f-strings carried source indentation)"""
+    return ["\n".join(line.strip() for line in part.splitlines() if line.strip()) for part in rendered]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="renders per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is reported)")
+    args = parser.parse_args()
+
+    for with_revenue in (False, True):
+        roi_data = sample_roi_data(with_revenue)
+        # The legacy user revenue block was a plain string inside the f-string, so it
+        # emailed the literal placeholder; only compare outputs where that doesn't apply.
+        if not with_revenue:
+            assert normalize(legacy_render("lead@example.com", roi_data)) == normalize(
+                template_render("lead@example.com", roi_data)
+            ), "template output differs from the legacy rendering"
+
+        label = "with revenue" if with_revenue else "without revenue"
+        renders = {"f-string": legacy_render, "template": template_render}
+        best = dict.fromkeys(renders, float("inf"))
+        # Alternate the two so drift in machine load affects both alike
+        for _ in range(args.repeat):
+            for name, render in renders.items():
+                elapsed = timeit.timeit(lambda: render("lead@example.com", roi_data), number=args.number)
+                best[name] = min(best[name], elapsed)
+        results = {}
+        for name in renders:
+            results[name] = best[name] / args.number * 1e6
+            print(f"{label:16} {name:9} {results[name]:8.2f} us/email")
+        print(f"{label:16} speedup   {results['f-string'] / results['template']:8.2f}x")
+        legacy_size = sum(len(part.encode()) for part in legacy_render("lead@example.com", roi_data))
+        template_size = sum(len(part.encode()) for part in template_render("lead@example.com", roi_data))
+        print(f"{label:16} bytes     {legacy_size} -> {template_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Enqueue throughput of the email outbox under concurrent load.
+
+Compares the group-committed outbox against committing every enqueue on its
+own connection (what a naive per-request INSERT would do). Run from the
+backend directory:
+
+    python -m benchmarks.bench_outbox --producers 1 8 64 --messages 2000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import db
+from db import connect
+from email_dispatcher import EmailMessage
+from outbox import SCHEMA, EmailOutbox
+
+# Same size as a rendered user email
+BODY = "<p>" + "x" * 4000 + "</p>"
+
+
+async def bench_group_commit(path: str, producers: int, messages: int) -> dict:
+    outbox = EmailOutbox(path)
+    latencies = []
+
+    async def producer(index: int) -> None:
+        for i in range(messages // producers):
+            started = time.perf_counter()
+            await outbox.enqueue([EmailMessage(f"lead{index}-{i}@example.com", "Hola", BODY)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(producer(index) for index in range(producers)))
+    elapsed = time.perf_counter() - started
+    commits = outbox.writer.commits
+    outbox.close()
+    return summarize(len(latencies), elapsed, latencies, commits)
+
+
+def bench_per_row_commit(path: str, producers: int, messages: int) -> dict:
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    conn.close()
+    latencies = []
+    lock = threading.Lock()
+
+    def producer(index: int) -> None:
+        conn = connect(path)
+        local = []
+        for i in range(messages // producers):
+            started = time.perf_counter()
+            while True:
+                try:
+                    conn.execute(
+                        "INSERT INTO email_outbox (created_at, to_email, subject, html_content, next_attempt_at) "
+                        "VALUES (?, ?, ?, ?, ?)", (time.time(), f"lead{index}-{i}@example.com", "Hola", BODY, 0)
+                    )
+                    break
+                except sqlite3.OperationalError:
+                    time.sleep(0.001)
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=producer, args=(index,)) for index in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarize(len(latencies), elapsed, latencies, len(latencies))
+
+
+def summarize(count: int, elapsed: float, latencies: list, commits: int) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "enqueues_per_second": round(count / elapsed),
+        "commits": commits,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--producers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--messages", type=int, default=2000, help="total enqueues per run")
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous for both variants")
+    args = parser.parse_args()
+    db.SYNCHRONOUS = args.synchronous
+
+    for producers in args.producers:
+        with tempfile.TemporaryDirectory() as tmp:
+            group = asyncio.run(bench_group_commit(os.path.join(tmp, "group.db"), producers, args.messages))
+            naive = bench_per_row_commit(os.path.join(tmp, "naive.db"), producers, args.messages)
+        print(f"producers={producers:<4} group-commit {group}")
+        print(f"{'':14} per-row      {naive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Persistence of ROICalculationResponse records, with lookup by id and by email."""
+import base64
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from db import GroupCommitWriter, connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculations (
+    calculation_id TEXT PRIMARY KEY,
+    user_email TEXT NOT NULL,
+    calculation_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calculations_by_email ON calculations (user_email, calculation_date, calculation_id);
+CREATE INDEX IF NOT EXISTS calculations_by_date ON calculations (calculation_date, calculation_id);
+"""
+
+
+def encode_cursor(calculation_date: str, calculation_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([calculation_date, calculation_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Raises ValueError for malformed cursors"""
+    try:
+        calculation_date, calculation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("invalid cursor")
+    return str(calculation_date), str(calculation_id)
+
+
+class CalculationStore:
+    """SQLite-backed calculation history.
+
+    save() never blocks the caller: records are serialized and inserted by
+    the group-commit writer thread, and stay readable from an in-memory
+    pending map until their transaction commits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = GroupCommitWriter(path, SCHEMA)
+        self.pending: Dict[str, dict] = {}
+        self.local = threading.local()
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def reader(self):
+        """Per-thread read-only connection"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path, readonly=True)
+        return conn
+
+    def save(self, record: dict):
+        """Queue a response record for insertion; returns the writer future"""
+        calculation_id = record["calculation_id"]
+        self.pending[calculation_id] = record
+
+        def insert(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO calculations (calculation_id, user_email, calculation_date, data) "
+                "VALUES (?, ?, ?, ?)",
+                (calculation_id, record["user_email"], record["calculation_date"],
+                 json.dumps(record, separators=(",", ":"))),
+            )
+
+        future = self.writer.submit(insert)
+        future.add_done_callback(lambda f: self._saved(calculation_id, f))
+        return future
+
+    def _saved(self, calculation_id: str, future) -> None:
+        self.pending.pop(calculation_id, None)
+        if future.exception() is not None:
+            print(f"Error saving calculation {calculation_id}: {future.exception()}")
+
+    def get(self, calculation_id: str) -> Optional[dict]:
+        record = self.pending.get(calculation_id)
+        if record is not None:
+            return record
+        row = self.reader().execute(
+            "SELECT data FROM calculations WHERE calculation_id = ?", (calculation_id,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def list_by_email(self, user_email: str, limit: int = 20,
+                      cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Newest first, keyset-paginated; returns (records, cursor of the next page or None)"""
+        params: list = [user_email]
+        where = "user_email = ?"
+        if cursor:
+            calculation_date, calculation_id = decode_cursor(cursor)
+            where += " AND (calculation_date, calculation_id) < (?, ?)"
+            params += [calculation_date, calculation_id]
+        rows = self.reader().execute(
+            f"SELECT calculation_date, calculation_id, data FROM calculations WHERE {where} "
+            "ORDER BY calculation_date DESC, calculation_id DESC LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["calculation_date"], rows[-1]["calculation_id"])
+        return [json.loads(row["data"]) for row in rows], next_cursor
@@ -0,0 +1,171 @@
+"""Pure ROI calculation core shared by the API endpoints."""
+from dataclasses import dataclass, fields
+import functools
+import os
+from typing import Mapping, Optional
+
+# Approximate rate: 1 USD = 800 ARS as of 2024; the live rate comes from fx.FXRateCache
+USD_TO_ARS = 800
+
+# Bound on memoized input combinations (the default slider values repeat constantly)
+ROI_CACHE_SIZE = int(os.getenv('ROI_CACHE_SIZE', '4096'))
+
+
+@dataclass(frozen=True, slots=True)
+class ROIInputs:
+    """Numeric inputs of one ROI calculation (everything the formula depends on)"""
+    monthly_inquiries: int
+    automation_percentage: float
+    minutes_per_inquiry: int
+    monthly_crm_hours: int
+    crm_automation_percentage: float
+    team_members: int
+    hourly_cost_ars: int
+    monthly_price_usd: int
+    implementation_cost: int
+    average_ticket_ars: Optional[int] = None
+    current_conversion_rate: Optional[float] = None
+    expected_conversion_rate: Optional[float] = None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "ROIInputs":
+        return cls(**{name: data[name] for name in INPUT_FIELDS if name in data})
+
+
+INPUT_FIELDS = tuple(field.name for field in fields(ROIInputs))
+# Revenue inputs that may be left out (None); every other input is required
+OPTIONAL_INPUT_FIELDS = tuple(field.name for field in fields(ROIInputs) if field.default is None)
+# Inputs that take whole numbers only
+INTEGER_INPUT_FIELDS = tuple(field.name for field in fields(ROIInputs) if field.type in (int, Optional[int]))
+
+# Defaults of the calculator form (ROICalculationRequest), shared with offline tools
+INPUT_DEFAULTS = {
+    "monthly_inquiries": 1000,
+    "automation_percentage": 60.0,
+    "minutes_per_inquiry": 4,
+    "monthly_crm_hours": 40,
+    "crm_automation_percentage": 50.0,
+    "team_members": 3,
+    "hourly_cost_ars": 5000,
+    "monthly_price_usd": 99,
+    "implementation_cost": 1000000,
+    "average_ticket_ars": None,
+    "current_conversion_rate": None,
+    "expected_conversion_rate": None,
+}
+DEFAULT_PLAN = "Standard Plan"
+
+
+@dataclass(frozen=True, slots=True)
+class ROIResult:
+    """Rounded results, as reported in ROICalculationResponse"""
+    annual_license_cost_usd: int
+    chatbot_monthly_hours_saved: float
+    chatbot_annual_savings: float
+    crm_annual_hours_saved: float
+    crm_annual_savings: float
+    total_annual_savings: float
+    total_investment: int
+    roi_percentage: float
+    additional_annual_revenue: Optional[float]
+    total_hours_saved_annually: float
+
+
+# The formula in stages, so a caller holding the intermediate values (see live.py)
+# can recompute only the stages whose inputs changed. compute_roi composes them.
+
+def chatbot_monthly_hours(monthly_inquiries: int, automation_percentage: float, minutes_per_inquiry: int) -> float:
+    """Hours of inquiry handling the chatbot takes over each month"""
+    return (
+        monthly_inquiries *
+        (automation_percentage / 100) *
+        minutes_per_inquiry
+    ) / 60
+
+
+def crm_annual_hours(monthly_crm_hours: int, crm_automation_percentage: float, team_members: int) -> float:
+    """Hours of CRM work automated per year across the team"""
+    return (
+        monthly_crm_hours *
+        (crm_automation_percentage / 100) *
+        team_members *
+        12
+    )
+
+
+def additional_revenue(monthly_inquiries: int, average_ticket_ars: Optional[int],
+                       current_conversion_rate: Optional[float],
+                       expected_conversion_rate: Optional[float]) -> Optional[float]:
+    """Extra annual revenue from better conversion; None unless all revenue inputs are given"""
+    if not (average_ticket_ars and current_conversion_rate and expected_conversion_rate):
+        return None
+
+    conversion_improvement = (expected_conversion_rate - current_conversion_rate) / 100
+
+    return (
+        monthly_inquiries *
+        conversion_improvement *
+        average_ticket_ars *
+        12
+    )
+
+
+def combine_roi(chatbot_monthly_hours_saved: float, crm_annual_hours_saved: float,
+                additional_annual_revenue: Optional[float], hourly_cost_ars: int, monthly_price_usd: int,
+                implementation_cost: int, usd_to_ars: float) -> ROIResult:
+    """Savings, investment and ROI from the stage results, rounded as reported"""
+    # Calculate annual license cost from monthly price
+    annual_license_cost_usd = monthly_price_usd * 12
+
+    chatbot_annual_savings = (
+        chatbot_monthly_hours_saved *
+        hourly_cost_ars *
+        12
+    )
+    crm_annual_savings = crm_annual_hours_saved * hourly_cost_ars
+
+    # Total calculations
+    total_annual_savings = chatbot_annual_savings + crm_annual_savings
+    annual_license_cost_ars = annual_license_cost_usd * usd_to_ars
+    total_investment = annual_license_cost_ars + implementation_cost
+
+    # ROI calculation
+    roi_percentage = ((total_annual_savings - total_investment) / total_investment) * 100
+
+    # Total hours saved
+    total_hours_saved_annually = (chatbot_monthly_hours_saved * 12) + crm_annual_hours_saved
+
+    return ROIResult(
+        annual_license_cost_usd=annual_license_cost_usd,
+        chatbot_monthly_hours_saved=round(chatbot_monthly_hours_saved, 2),
+        chatbot_annual_savings=round(chatbot_annual_savings, 2),
+        crm_annual_hours_saved=round(crm_annual_hours_saved, 2),
+        crm_annual_savings=round(crm_annual_savings, 2),
+        total_annual_savings=round(total_annual_savings, 2),
+        # Whole pesos (a fractional exchange rate would otherwise leave cents)
+        total_investment=round(total_investment),
+        roi_percentage=round(roi_percentage, 2),
+        additional_annual_revenue=round(additional_annual_revenue, 2) if additional_annual_revenue else None,
+        total_hours_saved_annually=round(total_hours_saved_annually, 2),
+    )
+
+
+@functools.lru_cache(maxsize=ROI_CACHE_SIZE)
+def compute_roi(inputs: ROIInputs, usd_to_ars: float = USD_TO_ARS) -> ROIResult:
+    """Compute savings, investment and ROI for one set of inputs at the given ARS/USD rate (pure, memoized)"""
+    return combine_roi(
+        chatbot_monthly_hours(inputs.monthly_inquiries, inputs.automation_percentage, inputs.minutes_per_inquiry),
+        crm_annual_hours(inputs.monthly_crm_hours, inputs.crm_automation_percentage, inputs.team_members),
+        additional_revenue(inputs.monthly_inquiries, inputs.average_ticket_ars, inputs.current_conversion_rate,
+                           inputs.expected_conversion_rate),
+        inputs.hourly_cost_ars,
+        inputs.monthly_price_usd,
+        inputs.implementation_cost,
+        usd_to_ars,
+    )
+
+
+def roi_cache_stats() -> dict:
+    """Hit/miss counters of the compute_roi memo cache"""
+    info = compute_roi.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
@@ -0,0 +1,51 @@
+"""One set of inputs evaluated against every Bitrix24 plan in a single vectorized pass."""
+from typing import List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from calculations import USD_TO_ARS
+from projection import MAX_MONTHS, project_cash_flow_columns, ramp_fractions
+from vectorized import compute_roi_columns
+
+
+def compare_plans(base: Mapping[str, float], plans: Sequence[Mapping],
+                  usd_to_ars: float = USD_TO_ARS) -> Tuple[List[dict], int]:
+    """Per-plan ROI, investment and payback, and the index of the recommended plan.
+
+    `base` holds the numeric inputs (its monthly_price_usd is replaced by
+    each plan's price). Savings don't depend on the plan, so among the plans
+    whose `max_users` fits the team the cheapest has the best ROI; that one
+    is recommended. If no plan fits, the one allowing the most users is.
+    Payback is the break-even month of a flat `MAX_MONTHS` projection (None
+    beyond it).
+    """
+    columns = dict(base)
+    columns["monthly_price_usd"] = np.array([plan["monthly_price_usd"] for plan in plans], dtype=np.float64)
+    roi = compute_roi_columns(columns, usd_to_ars)
+    projection = project_cash_flow_columns(columns, ramp_fractions(MAX_MONTHS), usd_to_ars)
+
+    max_users = np.array([plan.get("max_users") or np.inf for plan in plans], dtype=np.float64)
+    eligible = base["team_members"] <= max_users
+    if eligible.any():
+        # Highest ROI, then the cheaper plan
+        order = np.lexsort((columns["monthly_price_usd"], -roi["roi_percentage"]))
+        recommended = int(next(index for index in order if eligible[index]))
+    else:
+        recommended = int(max_users.argmax())
+
+    comparison = [
+        {
+            "plan": plan["name"],
+            "monthly_price_usd": int(roi["monthly_price_usd"][index]),
+            "annual_license_cost_usd": int(roi["annual_license_cost_usd"][index]),
+            "total_investment": int(roi["total_investment"][index]),
+            "roi_percentage": float(roi["roi_percentage"][index]),
+            "break_even_month": int(projection["break_even_month"][index]) or None,
+            "payback_months": (
+                float(projection["payback_months"][index]) if projection["break_even_month"][index] else None
+            ),
+            "eligible": bool(eligible[index]),
+        }
+        for index, plan in enumerate(plans)
+    ]
+    return comparison, recommended
@@ -0,0 +1,127 @@
+"""SQLite (WAL) helpers: a single writer thread that group-commits queued operations."""
+import asyncio
+from concurrent.futures import Future
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+# NORMAL: with WAL, commits survive a process crash and only checkpoints fsync.
+# FULL additionally survives power loss at the cost of an fsync per commit.
+SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+
+def connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    """Open a connection in WAL mode; transactions are managed explicitly (autocommit mode)"""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout=5000")
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    return conn
+
+
+class GroupCommitWriter:
+    """Serialize writes through one thread and commit them in groups.
+
+    Each submitted operation is a callable taking the connection. The writer
+    takes everything queued (up to `max_batch`, optionally waiting
+    `max_delay` seconds for stragglers) and runs it in a single transaction,
+    so operations that arrive while a commit is in progress share the next
+    one. Every operation runs in its own savepoint: a failing operation only
+    fails its own future.
+    """
+
+    def __init__(self, path: str, schema: str = "", max_batch: int = 512, max_delay: float = 0.0):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: "queue.SimpleQueue[Optional[Tuple[Callable, Future]]]" = queue.SimpleQueue()
+        self.conn = connect(path)
+        if schema:
+            # executescript() commits on its own, so it can't run inside a group
+            self.conn.executescript(schema)
+        self.commits = 0
+        self.operations = 0
+        self.thread = threading.Thread(target=self._run, name=f"sqlite-writer:{os.path.basename(path)}", daemon=True)
+        self.thread.start()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue `operation(conn)`; the future resolves once its transaction has committed"""
+        future: Future = Future()
+        self.queue.put((operation, future))
+        return future
+
+    async def run(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Async form of submit()"""
+        return await asyncio.wrap_future(self.submit(operation))
+
+    def execute(self, sql: str, params=()) -> Future:
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def executemany(self, sql: str, rows) -> Future:
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def close(self) -> None:
+        """Flush pending operations and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.conn.close()
+
+    def _collect(self) -> Tuple[List[Tuple[Callable, Future]], bool]:
+        item = self.queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                continue
+            results = []
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for operation, future in batch:
+                    self.conn.execute("SAVEPOINT op")
+                    try:
+                        results.append((future, operation(self.conn), None))
+                        self.conn.execute("RELEASE op")
+                    except Exception as e:
+                        self.conn.execute("ROLLBACK TO op")
+                        self.conn.execute("RELEASE op")
+                        results.append((future, None, e))
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.commits += 1
+            self.operations += len(batch)
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,178 @@
+"""Long-lived asynchronous SendGrid dispatcher: one pooled HTTP client, batched requests, retries."""
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+from metrics import ERRORS, STAGE_SECONDS
+
+# SendGrid accepts up to 1000 personalizations per /v3/mail/send request
+MAX_PERSONALIZATIONS = 1000
+
+# Retried after backoff; other 4xx responses are permanent failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# httpx and sendgrid are imported on the first send, not at server start (cold starts)
+if TYPE_CHECKING:
+    import httpx
+
+
+@dataclass(frozen=True, slots=True)
+class EmailMessage:
+    to_email: str
+    subject: str
+    html_content: str
+
+
+class EmailDispatcher:
+    """Deliver emails through the SendGrid v3 API over one pooled HTTP client.
+
+    The durable outbox is the only queue: its drainer hands groups of
+    messages sharing sender, subject and body to deliver(), which sends each
+    as one request with a personalization per recipient. At most
+    `concurrency` connections are open at once. Failed requests are retried
+    with exponential backoff (honoring Retry-After) up to `max_retries` times.
+    """
+
+    def __init__(self, api_key: str, sender_email: str, base_url: str = "https://api.sendgrid.com",
+                 concurrency: int = 4, max_retries: int = 3,
+                 backoff_base: float = 0.5, batch_size: int = 100, timeout: float = 10.0,
+                 transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self.api_key = api_key
+        self.sender_email = sender_email
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.batch_size = min(batch_size, MAX_PERSONALIZATIONS)
+        self.timeout = timeout
+        # Custom transport, e.g. httpx.ASGITransport(fake_sendgrid.app) in tests
+        self.transport = transport
+        # Created by the first delivery
+        self.client: Optional["httpx.AsyncClient"] = None
+        self.in_flight = 0
+        self.counters = {"sent": 0, "failed": 0, "retried": 0, "requests": 0}
+        # Most recent request latencies (seconds) for the stats endpoint
+        self.latencies: Deque[float] = deque(maxlen=1000)
+
+    def http_client(self) -> "httpx.AsyncClient":
+        """The pooled SendGrid client, created (and httpx imported) on first use"""
+        if self.client is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                transport=self.transport,
+            )
+        return self.client
+
+    async def stop(self) -> None:
+        """Close the pooled client; undelivered messages stay in the outbox"""
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+
+    async def deliver(self, group: List[EmailMessage]) -> Optional[str]:
+        """Send one group now (with retries); returns None on success or the last error"""
+        client = self.http_client()
+        payload = build_payload(self.sender_email, group)
+        self.in_flight += len(group)
+        try:
+            return await self._send(client, payload, group)
+        finally:
+            self.in_flight -= len(group)
+
+    async def _send(self, client: "httpx.AsyncClient", payload: dict, group: List[EmailMessage]) -> Optional[str]:
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            delay = None
+            started = time.perf_counter()
+            try:
+                response = await client.post("/v3/mail/send", json=payload)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                ERRORS.inc("sendgrid_" + type(e).__name__)
+            else:
+                elapsed = time.perf_counter() - started
+                self.latencies.append(elapsed)
+                STAGE_SECONDS.observe("sendgrid", value=elapsed)
+                self.counters["requests"] += 1
+                if response.status_code < 300:
+                    self.counters["sent"] += len(group)
+                    return None
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                ERRORS.inc(f"sendgrid_http_{response.status_code}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = float(retry_after)
+            if attempt < self.max_retries:
+                self.counters["retried"] += 1
+                await asyncio.sleep(delay if delay is not None else backoff_delay(self.backoff_base, attempt))
+        self.counters["failed"] += len(group)
+        print(f"Error sending email to {', '.join(m.to_email for m in group)}: {error}")
+        return error
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "in_flight": self.in_flight,
+            **self.counters,
+            "send_latency_ms": {
+                "samples": len(latencies),
+                "avg": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+                "p50": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+                "max": round(latencies[-1] * 1000, 2) if latencies else None,
+            },
+        }
+
+
+def backoff_delay(base: float, attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+def group_messages(messages: List[EmailMessage], batch_size: int) -> List[List[EmailMessage]]:
+    """Group messages with identical subject and body, at most `batch_size` recipients per group"""
+    groups: Dict[Tuple[str, str], List[EmailMessage]] = {}
+    for message in messages:
+        groups.setdefault((message.subject, message.html_content), []).append(message)
+    return [group[i:i + batch_size] for group in groups.values() for i in range(0, len(group), batch_size)]
+
+
+def build_payload(sender_email: str, group: List[EmailMessage]) -> dict:
+    """SendGrid v3 request body; one personalization per recipient so they don't see each other"""
+    from sendgrid.helpers.mail import Mail
+
+    return Mail(
+        from_email=sender_email,
+        to_emails=[message.to_email for message in group],
+        subject=group[0].subject,
+        html_content=group[0].html_content,
+        is_multiple=True,
+    ).get()
+
+
+def dispatcher_from_env() -> Optional[EmailDispatcher]:
+    """Build the dispatcher from environment settings; None if SendGrid isn't configured"""
+    api_key = os.getenv('SENDGRID_API_KEY')
+    if not api_key or api_key == "your_sendgrid_api_key_here":
+        return None
+    return EmailDispatcher(
+        api_key=api_key,
+        sender_email=os.getenv('SENDER_EMAIL', 'hola@efficiency.io'),
+        # Point at a local fake (see fake_sendgrid.py) for testing
+        base_url=os.getenv('SENDGRID_API_URL', 'https://api.sendgrid.com'),
+        concurrency=int(os.getenv('EMAIL_CONCURRENCY', '4')),
+        max_retries=int(os.getenv('EMAIL_MAX_RETRIES', '3')),
+        batch_size=int(os.getenv('EMAIL_BATCH_SIZE', '100')),
+    )
@@ -0,0 +1,182 @@
+"""HTML templates for the ROI analysis emails."""
+from datetime import datetime, timezone
+from html import escape
+from pathlib import Path
+from string import Formatter
+from typing import Any, Callable, Dict, Mapping, Sequence, Tuple
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+USER_SUBJECT = "Su Análisis ROI - Bitrix24 + Chatbot"
+ADMIN_SUBJECT_PREFIX = "Nueva Consulta ROI - "
+ADMIN_DIGEST_SUBJECT = "Resumen ROI - {count} nuevas consultas"
+
+
+class _FormatCache(dict):
+    """format(value, spec) results for one spec, keyed by value.
+
+    Formatting numbers is most of the cost of a render, and the same values
+    recur: the user and admin emails of one calculation share most fields, and
+    the calculator's default inputs repeat constantly. Hits are a plain dict
+    lookup; zero (-0.0 == 0.0 formats differently) and NaN are never stored.
+    """
+    __slots__ = ("spec",)
+    MAX_ENTRIES = 1024
+
+    def __init__(self, spec: str):
+        super().__init__()
+        self.spec = spec
+
+    def __missing__(self, value):
+        text = format(value, self.spec)
+        if value and value == value:
+            if len(self) >= self.MAX_ENTRIES:
+                self.clear()
+            self[value] = text
+        return text
+
+
+_FORMAT_CACHES: Dict[str, _FormatCache] = {}
+
+
+class HTMLTemplate:
+    """A str.format-style template, compiled once into a render function.
+
+    Fields may index into nested dicts (``{inputs[team_members]}``) and use
+    format specs (``{total_investment:,.0f}``). The template is parsed when it
+    is loaded, so a broken template fails at server startup, and turned into a
+    function returning one f-string: literal text and field lookups are
+    referenced by generated names (template text never becomes code), and
+    fields with a format spec go through a _FormatCache.
+    """
+    __slots__ = ("source", "_render")
+
+    def __init__(self, source: str):
+        self.source = source
+        namespace: Dict[str, Any] = {}
+
+        def ref(value) -> str:
+            name = f"_{len(namespace)}"
+            namespace[name] = value
+            return name
+
+        pieces = []
+        text = ""
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            # Escaped braces come back as extra literal chunks without a field
+            text += literal
+            if field_name is None:
+                continue
+            name, *keys = field_name.replace("]", "").split("[")
+            if conversion or "{" in format_spec or not name or "." in field_name:
+                raise ValueError(f"unsupported template field: {field_name}")
+            if text:
+                pieces.append(ref(text))
+                text = ""
+            expression = f"context[{ref(name)}]" + "".join(
+                f"[{ref(int(key) if key.isdigit() else key)}]" for key in keys
+            )
+            if format_spec:
+                cache = _FORMAT_CACHES.setdefault(format_spec, _FormatCache(format_spec))
+                expression = f"{ref(cache)}[{expression}]"
+            pieces.append(expression)
+        if text:
+            pieces.append(ref(text))
+        code = "def render(context):\n    return f\"" + "".join("{%s}" % piece for piece in pieces) + "\"\n"
+        exec(compile(code, "<HTMLTemplate>", "exec"), namespace)
+        self._render: Callable[[Mapping], str] = namespace["render"]
+
+    def render(self, context: Mapping) -> str:
+        return self._render(context)
+
+    @classmethod
+    def load(cls, name: str) -> "HTMLTemplate":
+        """Load a template file, dropping indentation and blank lines (insignificant in HTML)"""
+        source = (TEMPLATES_DIR / name).read_text(encoding="utf-8")
+        return cls("\n".join(line.strip() for line in source.splitlines() if line.strip()))
+
+
+# Loaded once at import (server startup)
+USER_TEMPLATE = HTMLTemplate.load("roi_user.html")
+USER_REVENUE_TEMPLATE = HTMLTemplate.load("roi_user_revenue.html")
+ADMIN_TEMPLATE = HTMLTemplate.load("roi_admin.html")
+ADMIN_REVENUE_TEMPLATE = HTMLTemplate.load("roi_admin_revenue.html")
+COMPARISON_TEMPLATE = HTMLTemplate.load("roi_comparison.html")
+COMPARISON_ROW_TEMPLATE = HTMLTemplate.load("roi_comparison_row.html")
+ADMIN_DIGEST_TEMPLATE = HTMLTemplate.load("roi_admin_digest.html")
+ADMIN_DIGEST_ROW_TEMPLATE = HTMLTemplate.load("roi_admin_digest_row.html")
+
+
+def render_comparison_section(roi_data: Mapping) -> str:
+    """Per-plan table of a plan comparison, empty for single-plan calculations"""
+    if not roi_data.get("plan_comparison"):
+        return ""
+    rows = "".join(
+        COMPARISON_ROW_TEMPLATE.render({
+            **plan,
+            "payback": f"{plan['payback_months']:.1f} meses" if plan["payback_months"] is not None else "Más de 5 años",
+        })
+        for plan in roi_data["plan_comparison"]
+    )
+    return COMPARISON_TEMPLATE.render({"recommended_plan": roi_data["recommended_plan"], "rows": rows})
+
+
+def render_user_email(roi_data: Mapping) -> Tuple[str, str]:
+    """Subject and HTML body of the analysis email sent to the lead"""
+    context = {
+        **roi_data,
+        "chatbot_annual_hours_saved": roi_data["chatbot_monthly_hours_saved"] * 12,
+        "calculation_day": roi_data["calculation_date"][:10],
+        "revenue_section": USER_REVENUE_TEMPLATE.render(roi_data) if roi_data.get("additional_annual_revenue") else "",
+        "comparison_section": render_comparison_section(roi_data),
+    }
+    return USER_SUBJECT, USER_TEMPLATE.render(context)
+
+
+def render_admin_email(user_email: str, roi_data: Mapping) -> Tuple[str, str]:
+    """Subject and HTML body of the new-lead notification sent to the admin inbox"""
+    revenue_section = ""
+    if roi_data.get("additional_annual_revenue"):
+        inputs = roi_data["inputs"]
+        revenue_section = ADMIN_REVENUE_TEMPLATE.render({
+            "average_ticket_ars": inputs.get("average_ticket_ars", "N/A"),
+            "current_conversion_rate": inputs.get("current_conversion_rate", "N/A"),
+            "expected_conversion_rate": inputs.get("expected_conversion_rate", "N/A"),
+            "additional_annual_revenue": roi_data.get("additional_annual_revenue", 0),
+        })
+    context = {
+        **roi_data,
+        "user_email": user_email,
+        "company_name": roi_data.get("company_name", "No especificada"),
+        "revenue_section": revenue_section,
+        "comparison_section": render_comparison_section(roi_data),
+    }
+    subject = ADMIN_SUBJECT_PREFIX + str(roi_data.get("company_name", "Sin especificar"))
+    return subject, ADMIN_TEMPLATE.render(context)
+
+
+def render_admin_digest(leads: Sequence[Mapping]) -> Tuple[str, str]:
+    """Subject and HTML body of one summary email covering several leads.
+
+    Each lead has company_name, user_email, roi_percentage, selected_plan,
+    total_annual_savings and created_at (epoch seconds), in arrival order.
+    """
+    rows = "".join(
+        ADMIN_DIGEST_ROW_TEMPLATE.render({
+            # Free-text fields from the form end up in a table cell
+            "company_name": escape(lead["company_name"] or "No especificada"),
+            "user_email": escape(lead["user_email"]),
+            "roi_percentage": lead["roi_percentage"],
+            "selected_plan": escape(lead["selected_plan"]),
+            "total_annual_savings": lead["total_annual_savings"],
+        })
+        for lead in leads
+    )
+    times = [datetime.fromtimestamp(lead["created_at"], timezone.utc) for lead in leads]
+    context = {
+        "lead_count": len(leads),
+        "period_start": min(times).strftime("%Y-%m-%d %H:%M"),
+        "period_end": max(times).strftime("%Y-%m-%d %H:%M"),
+        "rows": rows,
+    }
+    return ADMIN_DIGEST_SUBJECT.format(count=len(leads)), ADMIN_DIGEST_TEMPLATE.render(context)
@@ -0,0 +1,234 @@
+"""Streaming export of stored calculations as CSV, NDJSON or Parquet.
+
+Also usable from the command line, e.g. for the nightly warehouse load:
+
+    python -m export --format parquet --output leads.parquet --state-file export.state
+
+With --state-file only calculations newer than the previous run are exported.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from db import connect
+
+# ROICalculationResponse fields, with `inputs` flattened into input_* columns
+RESPONSE_COLUMNS = (
+    "calculation_id",
+    "calculation_date",
+    "user_email",
+    "selected_plan",
+    "monthly_price_usd",
+    "annual_license_cost_usd",
+    "chatbot_monthly_hours_saved",
+    "chatbot_annual_savings",
+    "crm_annual_hours_saved",
+    "crm_annual_savings",
+    "total_annual_savings",
+    "total_investment",
+    "roi_percentage",
+    "additional_annual_revenue",
+    "total_hours_saved_annually",
+    "usd_to_ars_rate",
+    "usd_to_ars_rate_as_of",
+)
+INPUT_COLUMNS = (
+    "monthly_inquiries",
+    "automation_percentage",
+    "minutes_per_inquiry",
+    "monthly_crm_hours",
+    "crm_automation_percentage",
+    "team_members",
+    "hourly_cost_ars",
+    "bitrix24_plan",
+    "monthly_price_usd",
+    "implementation_cost",
+    "average_ticket_ars",
+    "current_conversion_rate",
+    "expected_conversion_rate",
+    "company_name",
+)
+EXPORT_COLUMNS = RESPONSE_COLUMNS + tuple(f"input_{name}" for name in INPUT_COLUMNS)
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+STRING_COLUMNS = {
+    "calculation_id", "calculation_date", "user_email", "selected_plan", "usd_to_ars_rate_as_of",
+    "input_bitrix24_plan", "input_company_name",
+}
+INTEGER_COLUMNS = {
+    "monthly_price_usd", "annual_license_cost_usd", "total_investment", "input_monthly_inquiries",
+    "input_minutes_per_inquiry", "input_monthly_crm_hours", "input_team_members", "input_hourly_cost_ars",
+    "input_monthly_price_usd", "input_implementation_cost", "input_average_ticket_ars",
+}
+
+# Rows fetched (and held in memory) per keyset page
+PAGE_SIZE = 1000
+
+
+def flatten(record: dict) -> dict:
+    row = {name: record.get(name) for name in RESPONSE_COLUMNS}
+    inputs = record.get("inputs") or {}
+    for name in INPUT_COLUMNS:
+        row[f"input_{name}"] = inputs.get(name)
+    return row
+
+
+def iter_pages(path: str, after: Optional[Tuple[str, str]] = None,
+               page_size: int = PAGE_SIZE) -> Iterator[List[dict]]:
+    """Yield pages of flattened records in (calculation_date, calculation_id) order.
+
+    Each page is its own short query resuming after the last key seen, so no
+    read transaction stays open across the export (which would keep the WAL
+    from checkpointing) and memory is bounded by the page size.
+    """
+    conn = connect(path, readonly=True)
+    try:
+        key = after or ("", "")
+        while True:
+            cursor = conn.execute(
+                "SELECT calculation_date, calculation_id, data FROM calculations "
+                "WHERE (calculation_date, calculation_id) > (?, ?) "
+                "ORDER BY calculation_date, calculation_id LIMIT ?",
+                (key[0], key[1], page_size),
+            )
+            page = []
+            for row in cursor:
+                page.append(flatten(json.loads(row["data"])))
+                key = (row["calculation_date"], row["calculation_id"])
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+    finally:
+        conn.close()
+
+
+def iter_csv(pages: Iterable[List[dict]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_ndjson(pages: Iterable[List[dict]]) -> Iterator[bytes]:
+    for page in pages:
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in page).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting bytes so they can be streamed out as produced"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(pages: Iterable[List[dict]]) -> Iterator[bytes]:
+    """One row group per page; requires pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        (name, pa.string() if name in STRING_COLUMNS else pa.int64() if name in INTEGER_COLUMNS else pa.float64())
+        for name in EXPORT_COLUMNS
+    ])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for page in pages:
+            writer.write_table(pa.Table.from_pylist(page, schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+WRITERS = {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet}
+
+
+def export_stream(path: str, export_format: str, since: Optional[str] = None,
+                  after: Optional[Tuple[str, str]] = None) -> Iterator[bytes]:
+    """Encoded export of calculations dated at or after `since` (or strictly after key `after`)"""
+    if after is None and since:
+        after = (since, "")
+    return WRITERS[export_format](iter_pages(path, after))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export stored ROI calculations")
+    parser.add_argument("--db", default=os.getenv('CALCULATIONS_DB_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "calculations.db")))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--output", "-o", help="output file (default: stdout)")
+    parser.add_argument("--since", help="only calculations at or after this ISO timestamp")
+    parser.add_argument("--state-file", help="resume after the last row exported by the previous run")
+    args = parser.parse_args(argv)
+
+    after = None
+    if args.state_file and os.path.exists(args.state_file):
+        with open(args.state_file) as f:
+            after = tuple(json.load(f)["after"])
+
+    # Track the last exported key while streaming, for the state file
+    last = {}
+
+    def tracked(pages):
+        for page in pages:
+            last["key"] = (page[-1]["calculation_date"], page[-1]["calculation_id"])
+            last["rows"] = last.get("rows", 0) + len(page)
+            yield page
+
+    if after is None and args.since:
+        after = (args.since, "")
+    chunks = WRITERS[args.format](tracked(iter_pages(args.db, after)))
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.state_file and "key" in last:
+        with open(args.state_file, "w") as f:
+            json.dump({"after": list(last["key"])}, f)
+    print(f"Exported {last.get('rows', 0)} calculations", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
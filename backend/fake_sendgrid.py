@@ -0,0 +1,64 @@
+"""Local stand-in for the SendGrid v3 mail API, for testing the email pipeline.
+
+    uvicorn fake_sendgrid:app --port 8025
+    SENDGRID_API_KEY=test SENDGRID_API_URL=http://localhost:8025 uvicorn server:app --port 8001
+
+Accepted requests are kept in memory and listed at GET /messages. Failures
+can be injected with POST /fail {"count": n, "status": 503} and latency with
+FAKE_SENDGRID_DELAY (seconds).
+"""
+import asyncio
+import os
+from typing import List
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from pydantic import BaseModel
+
+app = FastAPI()
+
+SEND_DELAY = float(os.getenv('FAKE_SENDGRID_DELAY', '0'))
+
+# Accepted /v3/mail/send payloads, oldest first
+messages: List[dict] = []
+# Pending injected failures: [remaining count, status code]
+failures = [0, 503]
+
+
+class FailureInjection(BaseModel):
+    count: int = 1
+    status: int = 503
+
+
+@app.post("/v3/mail/send")
+async def mail_send(request: Request, authorization: str = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="missing bearer token")
+    if SEND_DELAY:
+        await asyncio.sleep(SEND_DELAY)
+    if failures[0] > 0:
+        failures[0] -= 1
+        return Response(status_code=failures[1])
+    payload = await request.json()
+    if not payload.get("personalizations") or not payload.get("content"):
+        raise HTTPException(status_code=400, detail="personalizations and content are required")
+    messages.append(payload)
+    return Response(status_code=202)
+
+
+@app.get("/messages")
+async def list_messages():
+    recipients = [to["email"] for payload in messages for p in payload["personalizations"] for to in p["to"]]
+    return {"requests": len(messages), "recipients": recipients, "messages": messages}
+
+
+@app.delete("/messages")
+async def clear_messages():
+    messages.clear()
+    failures[0] = 0
+    return {"cleared": True}
+
+
+@app.post("/fail")
+async def inject_failures(injection: FailureInjection):
+    failures[0], failures[1] = injection.count, injection.status
+    return {"pending_failures": failures[0], "status": failures[1]}
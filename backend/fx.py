@@ -0,0 +1,166 @@
+"""USD -> ARS exchange rate: pluggable providers behind a stale-while-revalidate cache.
+
+Requests never wait on a provider. The cache hands out the last good quote
+and, once it is older than the TTL, starts a single background refresh; a
+failed refresh keeps serving the previous quote and is retried later.
+"""
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import json
+import os
+import time
+from typing import Optional
+
+from calculations import USD_TO_ARS
+
+
+@dataclass(frozen=True, slots=True)
+class FXQuote:
+    """ARS per USD and when the provider published (or we obtained) it"""
+    rate: float
+    as_of: str
+    source: str
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FXProvider(ABC):
+    """Source of USD -> ARS quotes; fetch() may be slow or fail"""
+    name = "provider"
+
+    @abstractmethod
+    async def fetch(self) -> FXQuote:
+        """Obtain a current quote; raises on failure"""
+
+
+class StaticFXProvider(FXProvider):
+    """Fixed rate (the historical 800 by default)"""
+    name = "static"
+
+    def __init__(self, rate: float = USD_TO_ARS):
+        self.rate = float(rate)
+
+    async def fetch(self) -> FXQuote:
+        return FXQuote(self.rate, _now_iso(), self.name)
+
+
+class FileFXProvider(FXProvider):
+    """Rate from a local JSON file, e.g. {"rate": 1050.5, "as_of": "2025-01-31T12:00:00Z"}
+
+    Useful as a stub in tests and for setting the rate by hand or from a cron job.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch(self) -> FXQuote:
+        with open(self.path) as f:
+            data = json.load(f)
+        return FXQuote(_parse_rate(data.get("rate")), str(data.get("as_of") or _now_iso()), self.name)
+
+
+class HTTPFXProvider(FXProvider):
+    """Rate from a JSON HTTP endpoint; `rate_field` is a dotted path into the response body"""
+    name = "http"
+
+    def __init__(self, url: str, rate_field: str = "rate", timeout: float = 5.0):
+        self.url = url
+        self.rate_field = rate_field
+        self.timeout = timeout
+
+    async def fetch(self) -> FXQuote:
+        # Only deployments with an FX_RATE_URL pay for importing httpx
+        import httpx
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+        value = response.json()
+        for key in self.rate_field.split("."):
+            value = value[key]
+        return FXQuote(_parse_rate(value), _now_iso(), self.name)
+
+
+def _parse_rate(value) -> float:
+    rate = float(value)
+    if not rate > 0:
+        raise ValueError(f"invalid exchange rate: {value!r}")
+    return rate
+
+
+class FXRateCache:
+    """In-memory quote with a TTL, refreshed in the background (single flight).
+
+    quote() is cheap and safe to call from any thread; it never blocks. Until
+    the first successful fetch it returns `fallback`.
+    """
+
+    def __init__(self, provider: FXProvider, ttl: float = 3600.0, retry_interval: float = 60.0,
+                 fallback: float = USD_TO_ARS):
+        self.provider = provider
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.current = FXQuote(float(fallback), _now_iso(), "fallback")
+        # Monotonic time after which the next refresh is due
+        self.refresh_at = 0.0
+        self.refreshing = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.last_error: Optional[str] = None
+        self.counters = {"refreshes": 0, "errors": 0, "stale_served": 0}
+
+    async def start(self) -> FXQuote:
+        """Bind to the running loop and fetch the first quote (falls back on error)"""
+        self.loop = asyncio.get_running_loop()
+        self.refreshing = True
+        await self._refresh()
+        return self.current
+
+    def quote(self) -> FXQuote:
+        """Current quote; schedules a refresh when it has expired"""
+        if time.monotonic() >= self.refresh_at:
+            self.counters["stale_served"] += 1
+            if not self.refreshing and self.loop is not None and not self.loop.is_closed():
+                self.refreshing = True
+                asyncio.run_coroutine_threadsafe(self._refresh(), self.loop)
+        return self.current
+
+    async def _refresh(self) -> None:
+        try:
+            self.current = await self.provider.fetch()
+        except Exception as e:
+            self.counters["errors"] += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.refresh_at = time.monotonic() + self.retry_interval
+            print(f"Error refreshing USD/ARS rate from {self.provider.name}: {self.last_error}")
+        else:
+            self.counters["refreshes"] += 1
+            self.last_error = None
+            self.refresh_at = time.monotonic() + self.ttl
+        finally:
+            self.refreshing = False
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.current.rate,
+            "as_of": self.current.as_of,
+            "source": self.current.source,
+            "stale": time.monotonic() >= self.refresh_at,
+            "last_error": self.last_error,
+            **self.counters,
+        }
+
+
+def fx_cache_from_env() -> FXRateCache:
+    """FX_RATE_URL (HTTP) or FX_RATE_FILE (JSON file) if set, else the static 800 ARS/USD"""
+    if os.getenv('FX_RATE_URL'):
+        provider: FXProvider = HTTPFXProvider(os.getenv('FX_RATE_URL'), os.getenv('FX_RATE_FIELD', 'rate'))
+    elif os.getenv('FX_RATE_FILE'):
+        provider = FileFXProvider(os.getenv('FX_RATE_FILE'))
+    else:
+        provider = StaticFXProvider(float(os.getenv('FX_RATE_STATIC', str(USD_TO_ARS))))
+    return FXRateCache(provider, ttl=float(os.getenv('FX_RATE_TTL', '3600')))
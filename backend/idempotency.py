@@ -0,0 +1,87 @@
+"""Replay of repeated calculate-roi submissions (Idempotency-Key header and automatic dedup)."""
+from collections import OrderedDict
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after they were stored.
+
+    All entries share one TTL, so insertion order is expiry order: expired
+    entries and, past `max_entries`, the oldest ones are dropped from the front.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        self.entries.pop(key, None)
+        self.entries[key] = (now + self.ttl, value)
+        while self.entries:
+            oldest_key, (expires_at, _) = next(iter(self.entries.items()))
+            if expires_at > now and len(self.entries) <= self.max_entries:
+                break
+            del self.entries[oldest_key]
+            if expires_at > now:
+                self.evictions += 1
+
+
+class IdempotencyKeyReused(ValueError):
+    """The Idempotency-Key was already used for a different request"""
+
+
+class SubmissionDeduplicator:
+    """Remembers responses by Idempotency-Key and by (email, inputs) fingerprint.
+
+    A request with a known key gets the original response back (for
+    `key_ttl` seconds); without a key, an identical submission within
+    `window` seconds does. Either way the caller skips the calculation,
+    storage and emails.
+    """
+
+    def __init__(self, window: float = 300.0, key_ttl: float = 86400.0, max_entries: int = 10000):
+        self.window = window
+        self.keys = TTLCache(max_entries, key_ttl)
+        self.recent = TTLCache(max_entries, window)
+
+    def lookup(self, idempotency_key: Optional[str], fingerprint: Hashable) -> Optional[dict]:
+        """The response to replay, or None to process the request"""
+        if idempotency_key is not None:
+            entry = self.keys.get(idempotency_key)
+            if entry is None:
+                return None
+            if entry[0] != fingerprint:
+                raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+            return entry[1]
+        if self.window <= 0:
+            return None
+        return self.recent.get(fingerprint)
+
+    def remember(self, idempotency_key: Optional[str], fingerprint: Hashable, response: dict) -> None:
+        if idempotency_key is not None:
+            self.keys.put(idempotency_key, (fingerprint, response))
+        if self.window > 0:
+            self.recent.put(fingerprint, response)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self.keys),
+            "recent": len(self.recent),
+            "evictions": self.keys.evictions + self.recent.evictions,
+        }
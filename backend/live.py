@@ -0,0 +1,120 @@
+"""Incremental ROI recalculation for long-lived slider sessions (WebSocket /api/calculate-roi/live)."""
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from calculations import additional_revenue, chatbot_monthly_hours, combine_roi, crm_annual_hours
+
+# Cached intermediate -> (stage function, the inputs it reads)
+STAGES: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {
+    "chatbot_monthly_hours": (
+        chatbot_monthly_hours, ("monthly_inquiries", "automation_percentage", "minutes_per_inquiry"),
+    ),
+    "crm_annual_hours": (
+        crm_annual_hours, ("monthly_crm_hours", "crm_automation_percentage", "team_members"),
+    ),
+    "additional_revenue": (
+        additional_revenue,
+        ("monthly_inquiries", "average_ticket_ars", "current_conversion_rate", "expected_conversion_rate"),
+    ),
+}
+# Inputs combine_roi reads directly
+COMBINE_INPUTS = ("hourly_cost_ars", "monthly_price_usd", "implementation_cost")
+
+
+class LiveSession:
+    """Inputs, cached stage results and the fields last sent to one client.
+
+    apply() merges a (validated) delta; result() recomputes only the stages
+    whose inputs changed since the last call and returns just the response
+    fields whose values differ from what the client already has.
+    """
+
+    def __init__(self, inputs: Mapping[str, Any]):
+        self.inputs: Dict[str, Any] = dict(inputs)
+        self.stages: Dict[str, Any] = {}
+        self.dirty = set(self.inputs)
+        self.sent: Dict[str, Any] = {}
+        self.usd_to_ars: Optional[float] = None
+        self.stage_runs = 0
+
+    def apply(self, delta: Mapping[str, Any]) -> None:
+        for name, value in delta.items():
+            if self.inputs.get(name) != value:
+                self.inputs[name] = value
+                self.dirty.add(name)
+
+    def _recompute(self, usd_to_ars: float, rate_as_of: str) -> Dict[str, Any]:
+        for name, (stage, reads) in STAGES.items():
+            if name not in self.stages or not self.dirty.isdisjoint(reads):
+                self.stages[name] = stage(*(self.inputs[field] for field in reads))
+                self.stage_runs += 1
+        result = combine_roi(
+            self.stages["chatbot_monthly_hours"],
+            self.stages["crm_annual_hours"],
+            self.stages["additional_revenue"],
+            *(self.inputs[field] for field in COMBINE_INPUTS),
+            usd_to_ars,
+        )
+        # Only once combine_roi succeeded: inputs it rejects stay dirty and fail again next time
+        self.dirty.clear()
+        self.usd_to_ars = usd_to_ars
+        # ROICalculationResponse fields that depend on the inputs, in model order
+        return {
+            "selected_plan": self.inputs["bitrix24_plan"],
+            "monthly_price_usd": self.inputs["monthly_price_usd"],
+            "annual_license_cost_usd": result.annual_license_cost_usd,
+            "chatbot_monthly_hours_saved": result.chatbot_monthly_hours_saved,
+            "chatbot_annual_savings": result.chatbot_annual_savings,
+            "crm_annual_hours_saved": result.crm_annual_hours_saved,
+            "crm_annual_savings": result.crm_annual_savings,
+            "total_annual_savings": result.total_annual_savings,
+            "total_investment": result.total_investment,
+            "roi_percentage": result.roi_percentage,
+            "additional_annual_revenue": result.additional_annual_revenue,
+            "total_hours_saved_annually": result.total_hours_saved_annually,
+            "usd_to_ars_rate": usd_to_ars,
+            "usd_to_ars_rate_as_of": rate_as_of,
+        }
+
+    def result(self, usd_to_ars: float, rate_as_of: str) -> Dict[str, Any]:
+        """Response fields that changed since the previous call (all of them on the first)"""
+        if not self.dirty and usd_to_ars == self.usd_to_ars and self.sent:
+            return {}
+        fields = self._recompute(usd_to_ars, rate_as_of)
+        changed = {name: value for name, value in fields.items() if self.sent.get(name, ...) != value}
+        self.sent.update(changed)
+        return changed
+
+
+async def collect_frame(queue: "asyncio.Queue[Optional[Mapping]]", frame_seconds: float,
+                        last_frame: float) -> List[Optional[Mapping]]:
+    """Wait for the next client message, then take everything else that arrives before
+    the next frame boundary (`last_frame` + `frame_seconds`, loop time), so a burst of
+    slider moves produces one update. Stops early at a submit or at None (disconnected).
+    """
+    loop = asyncio.get_running_loop()
+    messages = [await queue.get()]
+    while messages[-1] is not None and messages[-1].get("type") != "submit":
+        if queue.empty():
+            remaining = last_frame + frame_seconds - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+            if queue.empty():
+                break
+        messages.append(queue.get_nowait())
+    return messages
+
+
+def coalesce(messages: Iterable[Mapping]) -> Tuple[Dict[str, Any], Optional[Mapping]]:
+    """Merge the fields of a frame's messages; returns them and the submit message, if any.
+
+    Each message's "fields" must be a mapping or missing; the caller rejects other frames.
+    """
+    fields: Dict[str, Any] = {}
+    submit = None
+    for message in messages:
+        fields.update(message.get("fields") or {})
+        if message.get("type") == "submit":
+            submit = message
+    return fields, submit
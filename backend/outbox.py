@@ -0,0 +1,195 @@
+"""Durable email outbox: emails are committed to SQLite before delivery and drained by a worker."""
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from db import GroupCommitWriter, connect
+from email_dispatcher import EmailDispatcher, EmailMessage, group_messages
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html_content TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS email_outbox_due ON email_outbox (status, next_attempt_at);
+"""
+
+STATUSES = ("pending", "sending", "sent", "failed")
+
+
+def insert_messages(conn, messages: Sequence[EmailMessage], now: float) -> List[int]:
+    """Insert pending rows on the writer connection, inside the caller's transaction"""
+    return [
+        conn.execute(
+            "INSERT INTO email_outbox (created_at, to_email, subject, html_content, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, ?)", (now, m.to_email, m.subject, m.html_content, now)
+        ).lastrowid
+        for m in messages
+    ]
+
+
+class EmailOutbox:
+    """Persistent queue of emails in a WAL-mode SQLite table.
+
+    Writes go through a GroupCommitWriter, so bursts of enqueues from many
+    requests share a transaction. Rows move pending -> sending -> sent, or
+    back to pending with a backoff delay, and to failed after `max_attempts`.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, retry_base: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.writer = GroupCommitWriter(path, SCHEMA)
+        # Set when new rows are committed so the drainer wakes up immediately
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def close(self) -> None:
+        self.writer.close()
+
+    async def enqueue(self, messages: Sequence[EmailMessage]) -> List[int]:
+        """Durably store messages for delivery; returns their outbox ids"""
+        now = time.time()
+        ids = await self.writer.run(lambda conn: insert_messages(conn, messages, now))
+        self.notify()
+        return ids
+
+    def notify(self) -> None:
+        """Wake the drainer after rows were committed outside enqueue()"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def recover(self) -> int:
+        """Return rows left in 'sending' by a crash to the pending state"""
+        return await self.writer.run(
+            lambda conn: conn.execute("UPDATE email_outbox SET status = 'pending' WHERE status = 'sending'").rowcount
+        )
+
+    async def claim_due(self, limit: int) -> List[Tuple[int, EmailMessage]]:
+        """Mark up to `limit` due pending rows as sending (counting the attempt) and return them"""
+        now = time.time()
+
+        def claim(conn):
+            return conn.execute(
+                "UPDATE email_outbox SET status = 'sending', attempts = attempts + 1 "
+                "WHERE id IN (SELECT id FROM email_outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?) "
+                "RETURNING id, to_email, subject, html_content",
+                (now, limit),
+            ).fetchall()
+
+        rows = await self.writer.run(claim)
+        return sorted((row["id"], EmailMessage(row["to_email"], row["subject"], row["html_content"])) for row in rows)
+
+    async def mark_sent(self, ids: Sequence[int]) -> None:
+        now = time.time()
+        await self.writer.run(lambda conn: conn.executemany(
+            "UPDATE email_outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+            [(now, outbox_id) for outbox_id in ids],
+        ))
+
+    async def mark_failed(self, ids: Sequence[int], error: str) -> None:
+        """Reschedule with exponential backoff, or give up after max_attempts"""
+        now = time.time()
+
+        def fail(conn):
+            for outbox_id in ids:
+                conn.execute(
+                    "UPDATE email_outbox SET "
+                    "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                    "next_attempt_at = ? + ? * (1 << (attempts - 1)), last_error = ? WHERE id = ?",
+                    (self.max_attempts, now, self.retry_base, error[:1000], outbox_id),
+                )
+
+        await self.writer.run(fail)
+
+    def backlog(self) -> int:
+        """Rows not yet delivered (pending or sending), counted on the status index"""
+        conn = connect(self.path, readonly=True)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM email_outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Row counts per status (read on a separate connection; WAL readers don't block the writer)"""
+        conn = connect(self.path, readonly=True)
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+
+class OutboxDrainer:
+    """Background task delivering due outbox rows through the dispatcher"""
+
+    def __init__(self, outbox: EmailOutbox, dispatcher: EmailDispatcher, batch_size: int = 100,
+                 poll_interval: float = 1.0):
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.outbox.wakeup = asyncio.Event()
+        recovered = await self.outbox.recover()
+        if recovered:
+            print(f"Email outbox: requeued {recovered} messages interrupted during delivery")
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due rows; returns how many were claimed"""
+        claimed = await self.outbox.claim_due(self.batch_size)
+        if not claimed:
+            return 0
+        ids_by_message = {}
+        for outbox_id, message in claimed:
+            ids_by_message.setdefault(message, []).append(outbox_id)
+        semaphore = asyncio.Semaphore(self.dispatcher.concurrency)
+
+        async def send(group: List[EmailMessage]) -> None:
+            ids = [outbox_id for message in group for outbox_id in ids_by_message[message]]
+            async with semaphore:
+                try:
+                    error = await self.dispatcher.deliver(group)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+            if error is None:
+                await self.outbox.mark_sent(ids)
+            else:
+                await self.outbox.mark_failed(ids, error)
+
+        groups = group_messages(list(ids_by_message), self.dispatcher.batch_size)
+        await asyncio.gather(*(send(group) for group in groups))
+        return len(claimed)
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before draining so rows committed meanwhile still wake us
+            self.outbox.wakeup.clear()
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                print(f"Error draining email outbox: {str(e)}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self.outbox.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,119 @@
+"""Bitrix24 plan catalog loaded from a JSON config file, served pre-serialized with an ETag."""
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Browsers and proxies may reuse the catalog for this long, then revalidate (cheap: 304)
+CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+
+@dataclass(frozen=True, slots=True)
+class PlanSnapshot:
+    """One loaded version of the catalog; replaced as a whole on reload"""
+    plans: Tuple[dict, ...]
+    # Plan name -> monthly price in USD
+    prices: Dict[str, int]
+    # Response body, exactly as served
+    body: bytes
+    etag: str
+    # (mtime_ns, size) of the file this was loaded from
+    version: Tuple[int, int]
+
+
+def parse_catalog(raw: bytes) -> dict:
+    """Validate catalog JSON; raises ValueError describing the first problem"""
+    data = json.loads(raw)
+    plans = data.get("plans") if isinstance(data, dict) else None
+    if not isinstance(plans, list) or not plans:
+        raise ValueError("catalog must be an object with a non-empty 'plans' list")
+    names = set()
+    for plan in plans:
+        name = plan.get("name") if isinstance(plan, dict) else None
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"plan without a name: {plan!r}")
+        if name in names:
+            raise ValueError(f"duplicate plan name: {name}")
+        price = plan.get("monthly_price_usd")
+        if not isinstance(price, int) or isinstance(price, bool) or price < 0:
+            raise ValueError(f"plan {name!r} needs a non-negative integer monthly_price_usd")
+        max_users = plan.get("max_users")
+        if max_users is not None and (not isinstance(max_users, int) or isinstance(max_users, bool) or max_users < 1):
+            raise ValueError(f"plan {name!r} max_users must be a positive integer")
+        names.add(name)
+    return data
+
+
+class PlanCatalog:
+    """The plan list, re-read when its file changes.
+
+    Reads hit an immutable snapshot: `body` is serialized once per file
+    version and the strong ETag is a hash of it. The file is stat()ed at
+    most once every `check_interval` seconds; an invalid edit is reported
+    and the previous snapshot keeps being served.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+        self.snapshot = self._load(self._stat())
+        self.checked_at = time.monotonic()
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, version: Tuple[int, int]) -> PlanSnapshot:
+        with open(self.path, "rb") as f:
+            data = parse_catalog(f.read())
+        body = json.dumps(data, separators=(",", ":")).encode()
+        return PlanSnapshot(
+            plans=tuple(data["plans"]),
+            prices={plan["name"]: plan["monthly_price_usd"] for plan in data["plans"]},
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            version=version,
+        )
+
+    def current(self) -> PlanSnapshot:
+        """Latest snapshot, reloading first if the file changed"""
+        now = time.monotonic()
+        if now - self.checked_at >= self.check_interval and self.lock.acquire(blocking=False):
+            # Whoever holds the lock checks; everyone else keeps using the current snapshot
+            try:
+                self.checked_at = now
+                self.reload()
+            finally:
+                self.lock.release()
+        return self.snapshot
+
+    def reload(self) -> bool:
+        """Load the file if it changed since the current snapshot; True if a new version was loaded"""
+        try:
+            version = self._stat()
+            if version == self.snapshot.version:
+                return False
+            self.snapshot = self._load(version)
+        except (OSError, ValueError) as e:
+            print(f"Error reloading plan catalog {self.path}: {str(e)}")
+            return False
+        print(f"Plan catalog reloaded from {self.path} ({len(self.snapshot.plans)} plans)")
+        return True
+
+    def price(self, plan_name: str) -> Optional[int]:
+        """Monthly USD price of a plan, None if the catalog doesn't list it"""
+        return self.current().prices.get(plan_name)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 prescribes for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
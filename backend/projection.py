@@ -0,0 +1,77 @@
+"""Month-by-month cash-flow projection and payback period, vectorized over many scenarios."""
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from calculations import USD_TO_ARS
+from vectorized import compute_roi_columns
+
+MIN_MONTHS = 12
+MAX_MONTHS = 60
+
+
+def ramp_fractions(months: int, ramp_up_months: int = 0, ramp_up: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Share of the target automation percentages reached in each month 1..`months`.
+
+    `ramp_up` gives explicit percentages (0-100) of the target for the first
+    months; otherwise the target is reached linearly by month
+    `ramp_up_months`. Every later month runs at the full target.
+    """
+    fractions = np.ones(months)
+    if ramp_up is not None:
+        values = np.asarray(ramp_up, dtype=np.float64)
+        if len(values) > months:
+            raise ValueError(f"ramp_up has {len(values)} values for a {months}-month projection")
+        if ((values < 0) | (values > 100)).any():
+            raise ValueError("ramp_up values must be between 0 and 100")
+        fractions[:len(values)] = values / 100
+    elif ramp_up_months > 0:
+        fractions = np.minimum(np.arange(1, months + 1) / ramp_up_months, 1.0)
+    return fractions
+
+
+def project_cash_flow_columns(columns: Mapping[str, Sequence], ramp: np.ndarray,
+                              usd_to_ars: float = USD_TO_ARS, rounded: bool = True) -> Dict[str, np.ndarray]:
+    """Monthly and cumulative net position of each scenario over len(ramp) months.
+
+    `columns` are input columns as for compute_roi_columns (one scenario per
+    element). The implementation cost is paid up front (month 0); each month
+    then adds the savings at that month's ramp level minus the license cost
+    in ARS. Savings are linear in the automation percentages, so ramping both
+    scales the full-automation monthly savings. Series are (scenarios, months)
+    arrays built with a single cumulative sum. `rounded=False` returns
+    exact float64 columns instead, as for compute_roi_columns.
+    """
+    roi = compute_roi_columns(columns, usd_to_ars, rounded=rounded)
+    size = roi["total_annual_savings"].shape
+    full_monthly_savings = roi["total_annual_savings"] / 12
+    monthly_license_cost_ars = np.broadcast_to(np.asarray(columns["monthly_price_usd"], np.float64) * usd_to_ars, size)
+    implementation_cost = np.broadcast_to(np.asarray(columns["implementation_cost"], np.float64), size)
+
+    monthly_savings = full_monthly_savings[:, None] * ramp[None, :]
+    monthly_net = monthly_savings - monthly_license_cost_ars[:, None]
+    cumulative = np.cumsum(monthly_net, axis=1) - implementation_cost[:, None]
+
+    # First month ending with a non-negative cumulative position (0: not within the horizon)
+    reached = cumulative >= 0
+    first = reached.argmax(axis=1)
+    break_even_month = np.where(reached.any(axis=1), first + 1, 0)
+    # Fractional payback, interpolating within the break-even month
+    rows = np.arange(len(first))
+    before = np.where(first > 0, cumulative[rows, first - 1], -implementation_cost)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback_months = np.where(
+            break_even_month > 0, first + np.clip(-before / monthly_net[rows, first], 0, 1), np.nan
+        )
+
+    round2 = (lambda values: np.round(values, 2)) if rounded else (lambda values: values)
+    return {
+        "monthly_license_cost_ars": round2(monthly_license_cost_ars),
+        "implementation_cost": implementation_cost,
+        "break_even_month": break_even_month,
+        "payback_months": round2(payback_months),
+        "final_net_position": round2(cumulative[:, -1]),
+        "monthly_savings": round2(monthly_savings),
+        "monthly_net_cash_flow": round2(monthly_net),
+        "cumulative_net_position": round2(cumulative),
+    }
@@ -0,0 +1,252 @@
+"""Downloadable ROI reports (standalone HTML or PDF) and their size-bounded disk cache."""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from email_rendering import TEMPLATES_DIR, HTMLTemplate, render_user_email
+
+# Templates whose content ends up in a report; editing any of them changes TEMPLATE_VERSION
+REPORT_TEMPLATES = (
+    "roi_report.html", "roi_user.html", "roi_user_revenue.html", "roi_comparison.html", "roi_comparison_row.html",
+)
+# Bump when the PDF layout below changes
+PDF_LAYOUT_VERSION = "1"
+
+REPORT_TEMPLATE = HTMLTemplate.load("roi_report.html")
+
+CONTENT_TYPES = {"pdf": "application/pdf", "html": "text/html; charset=utf-8"}
+
+# calculation_ids are uuid4 strings; anything else never reaches the file system
+CALCULATION_ID = re.compile(r"^[A-Za-z0-9-]{1,64}$")
+
+
+def template_version() -> str:
+    digest = hashlib.sha256(PDF_LAYOUT_VERSION.encode())
+    for name in REPORT_TEMPLATES:
+        digest.update((TEMPLATES_DIR / name).read_bytes())
+    return digest.hexdigest()[:12]
+
+
+TEMPLATE_VERSION = template_version()
+
+
+def render_report_html(roi_data: Mapping) -> bytes:
+    """The analysis email as a standalone page (doctype, charset, title)"""
+    _, email_html = render_user_email(roi_data)
+    # Keep the email's <body> element, drop its bare <html> wrapper
+    body = "<body" + email_html.partition("<body")[2].rpartition("</body>")[0] + "</body>"
+    return REPORT_TEMPLATE.render({
+        "selected_plan": roi_data["selected_plan"],
+        "calculation_day": roi_data["calculation_date"][:10],
+        "body": body,
+    }).encode("utf-8")
+
+
+def report_lines(roi_data: Mapping) -> List[Tuple[str, str, str]]:
+    """(style, label, value) rows of the PDF report, the same figures as the analysis email"""
+    lines = [
+        ("title", "Efficiency24 - Análisis ROI Bitrix24 + Chatbot", ""),
+        ("small", f"Análisis generado el {roi_data['calculation_date'][:10]}", f"ID {roi_data['calculation_id']}"),
+        ("heading", "Resumen", ""),
+        ("row", "ROI proyectado", f"{roi_data['roi_percentage']}%"),
+        ("row", "Ahorro anual", f"${roi_data['total_annual_savings']:,.0f} ARS"),
+        ("row", "Inversión total", f"${roi_data['total_investment']:,.0f} ARS"),
+        ("heading", "Plan Bitrix24 seleccionado", ""),
+        ("row", "Plan", roi_data["selected_plan"]),
+        ("row", "Costo mensual", f"${roi_data['monthly_price_usd']} USD"),
+        ("row", "Costo anual", f"${roi_data['annual_license_cost_usd']} USD"),
+        ("heading", "Desglose de ahorros", ""),
+        ("row", "Ahorro por chatbot", f"${roi_data['chatbot_annual_savings']:,.0f} ARS/año"),
+        ("row", "  Horas ahorradas por año", f"{roi_data['chatbot_monthly_hours_saved'] * 12:.1f}"),
+        ("row", "Ahorro por CRM", f"${roi_data['crm_annual_savings']:,.0f} ARS/año"),
+        ("row", "  Horas ahorradas por año", f"{roi_data['crm_annual_hours_saved']:.1f}"),
+        ("row", "Total horas ahorradas", f"{roi_data['total_hours_saved_annually']:.1f} horas/año"),
+    ]
+    if roi_data.get("additional_annual_revenue"):
+        lines += [
+            ("heading", "Ingresos adicionales estimados", ""),
+            ("row", "Por mejora en tasa de conversión", f"${roi_data['additional_annual_revenue']:,.0f} ARS/año"),
+        ]
+    if roi_data.get("plan_comparison"):
+        lines += [
+            ("heading", "Comparación de planes", ""),
+            ("row", "Plan recomendado", roi_data["recommended_plan"]),
+        ]
+        for plan in roi_data["plan_comparison"]:
+            payback = f"{plan['payback_months']:.1f} meses" if plan["payback_months"] is not None else "Más de 5 años"
+            lines.append(("row", f"  {plan['plan']}", f"ROI {plan['roi_percentage']}%, recupero {payback}"))
+    return lines
+
+
+# (font resource, size, space before) per line style; A4 portrait in points
+PDF_STYLES = {"title": ("F2", 18, 0), "small": ("F1", 9, 22), "heading": ("F2", 13, 26), "row": ("F1", 11, 17)}
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN, VALUE_X = 595, 842, 56, 330
+
+
+def _pdf_text(text: str) -> bytes:
+    """PDF string literal in WinAnsiEncoding (covers Spanish accents; other characters become '?')"""
+    encoded = text.encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def render_report_pdf(roi_data: Mapping) -> bytes:
+    """A text-only PDF of the report (built-in Helvetica, no external dependencies).
+
+    Output is deterministic: the same calculation always renders the same
+    bytes, so cached copies and ETags stay valid across workers.
+    """
+    pages: List[List[bytes]] = [[]]
+    y = PAGE_HEIGHT - MARGIN
+    for style, label, value in report_lines(roi_data):
+        font, size, before = PDF_STYLES[style]
+        y -= before or size
+        if y < MARGIN:
+            pages.append([])
+            y = PAGE_HEIGHT - MARGIN - size
+        ops = pages[-1]
+        ops.append(b"BT /%s %d Tf %d %d Td %s Tj ET" % (font.encode(), size, MARGIN, y, _pdf_text(label)))
+        if value:
+            x = VALUE_X if style == "row" else PAGE_WIDTH - MARGIN - len(value) * size // 2
+            ops.append(b"BT /%s %d Tf %d %d Td %s Tj ET" % (font.encode(), size, x, y, _pdf_text(value)))
+
+    # 1 catalog, 2 page tree, 3-4 fonts, then a (page, content stream) pair per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % (5 + 2 * index) for index in range(len(pages))), len(pages)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    for index, ops in enumerate(pages):
+        content = b"\n".join(ops)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+            b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, 6 + 2 * index)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+RENDERERS = {"pdf": render_report_pdf, "html": render_report_html}
+
+
+def render_report(roi_data: Mapping, report_format: str) -> bytes:
+    """Render one report (runs in a worker process)"""
+    return RENDERERS[report_format](roi_data)
+
+
+SAMPLE_CALCULATION = {
+    "calculation_id": "warm-up", "calculation_date": "2024-01-01T00:00:00", "selected_plan": "Standard Plan",
+    "monthly_price_usd": 99, "annual_license_cost_usd": 1188, "chatbot_monthly_hours_saved": 40.0,
+    "chatbot_annual_savings": 2400000.0, "crm_annual_hours_saved": 720.0, "crm_annual_savings": 3600000.0,
+    "total_annual_savings": 6000000.0, "total_investment": 1950400, "roi_percentage": 207.63,
+    "additional_annual_revenue": None, "total_hours_saved_annually": 1200.0, "inputs": {},
+}
+
+
+def warm_up() -> int:
+    """Render a sample of every format so a fresh worker has its imports and templates loaded; returns its pid"""
+    for report_format in RENDERERS:
+        render_report(SAMPLE_CALCULATION, report_format)
+    return os.getpid()
+
+
+class ReportCache:
+    """Rendered reports on disk, keyed by calculation_id, format and TEMPLATE_VERSION.
+
+    Files are written atomically (temporary file + rename), so concurrent
+    workers and readers never see a partial report. Once the directory
+    holds more than `max_bytes`, the least recently served files are
+    deleted. Reports of an older template version are never read again and
+    age out the same way.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, version: str = TEMPLATE_VERSION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._files())
+
+    def path(self, calculation_id: str, report_format: str) -> str:
+        return os.path.join(self.directory, f"{calculation_id}.{self.version}.{report_format}")
+
+    def etag(self, calculation_id: str, report_format: str) -> str:
+        # Calculations never change, so the key alone identifies the bytes
+        return f'"{calculation_id}.{self.version}.{report_format}"'
+
+    def get(self, calculation_id: str, report_format: str) -> Optional[str]:
+        """Path of the cached report (marked as recently used), None on a miss"""
+        path = self.path(calculation_id, report_format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, calculation_id: str, report_format: str, data: bytes) -> str:
+        """Store a rendered report; returns its path"""
+        path = self.path(calculation_id, report_format)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self.lock:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _files(self) -> List[Tuple[str, int, float]]:
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith(".tmp-"):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self, keep: str) -> None:
+        # Rescan: other worker processes write to the same directory
+        files = sorted(self._files(), key=lambda item: item[2])
+        self.size = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self.size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "template_version": self.version, "bytes": self.size, "max_bytes": self.max_bytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
@@ -0,0 +1,327 @@
+"""Offline scoring of lead files (CSV or Parquet) with the calculate_roi formula.
+
+Reads the input in memory-mapped chunks, validates and scores each chunk in
+vectorized form on a process pool, and appends the enriched rows to the
+output as chunks complete (in input order). Rows that fail validation go to
+a CSV reject file with their row number and the reason. Requires pyarrow.
+
+    python -m score_leads prospects.csv -o scored.parquet --map "Consultas=monthly_inquiries"
+
+Input columns named like ROICalculationRequest fields are used directly;
+--map assigns other names. Fields without a column (or with an empty cell)
+take the request defaults, and monthly_price_usd always comes from the plan
+catalog, as in the API. The exchange rate comes from the same FX provider
+settings as the API (FX_RATE_URL, FX_RATE_FILE, FX_RATE_STATIC) unless
+--usd-to-ars is given.
+"""
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculations import DEFAULT_PLAN, INPUT_DEFAULTS, INPUT_FIELDS, INTEGER_INPUT_FIELDS, USD_TO_ARS
+from vectorized import RESULT_FIELDS, compute_roi_columns
+
+# Result columns stored as integers (the rest are float64, null where the API returns None)
+INTEGER_RESULTS = ("monthly_price_usd", "annual_license_cost_usd", "total_investment")
+# Output columns added to every input row
+SCORE_COLUMNS = ("selected_plan",) + RESULT_FIELDS
+
+CHUNK_ROWS = 100000
+
+# Vectorized syntax check for user_email columns. Looser than the API's
+# EmailStr (no IDNA/RFC 5322 rules), which would cost ~50x the whole scoring.
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s.]+$"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("score_leads requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def field_specs() -> Dict[str, Tuple[Optional[float], bool]]:
+    """Numeric request fields -> (default, whole numbers only)"""
+    return {name: (INPUT_DEFAULTS[name], name in INTEGER_INPUT_FIELDS) for name in INPUT_FIELDS}
+
+
+def output_schema(input_schema, pa=None):
+    """Input columns (minus any named like a score column) followed by the score columns"""
+    pa = pa or _pyarrow()
+    kept = [field for field in input_schema if field.name not in SCORE_COLUMNS]
+    scores = [pa.field("selected_plan", pa.string())] + [
+        pa.field(name, pa.int64() if name in INTEGER_RESULTS else pa.float64()) for name in RESULT_FIELDS
+    ]
+    return pa.schema(kept + scores)
+
+
+def reject_schema(input_schema, pa=None):
+    pa = pa or _pyarrow()
+    return pa.schema(list(input_schema) + [pa.field("row_number", pa.int64()), pa.field("error", pa.string())])
+
+
+def _to_float(array, pa) -> Tuple[np.ndarray, np.ndarray]:
+    """float64 values (NaN for nulls) and a mask of unparsable cells"""
+    pc = pa.compute
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        trimmed = pc.utf8_trim_whitespace(array)
+        try:
+            array = pc.cast(pc.if_else(pc.equal(trimmed, ""), None, trimmed), pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Dirty chunk: parse cell by cell to find the bad ones
+            values, bad = np.full(len(trimmed), np.nan), np.zeros(len(trimmed), dtype=bool)
+            for index, text in enumerate(trimmed.to_pylist()):
+                if text:
+                    try:
+                        values[index] = float(text)
+                    except ValueError:
+                        bad[index] = True
+            return values, bad
+    else:
+        array = pc.cast(array, pa.float64())
+    return array.to_numpy(zero_copy_only=False, writable=True), np.zeros(len(array), dtype=bool)
+
+
+def score_batch(batch, mapping: Mapping[str, str], specs: Mapping[str, Tuple[Optional[float], bool]],
+                prices: Mapping[str, int], default_plan: str, usd_to_ars: float, first_row: int):
+    """Validate and score one chunk (runs in a worker process); returns (scored, rejected) tables.
+
+    `mapping` is request field -> input column. `first_row` is the 1-based
+    row number of the chunk's first row, reported in the reject file.
+    """
+    pa = _pyarrow()
+    pc = pa.compute
+    size = batch.num_rows
+    errors = np.full(size, None, dtype=object)
+
+    def reject(mask: np.ndarray, message: str) -> None:
+        errors[mask & (errors == None)] = message  # noqa: E711 (elementwise)
+
+    columns: Dict[str, np.ndarray] = {}
+    for name, (default, integer) in specs.items():
+        if name == "monthly_price_usd":
+            continue
+        source = mapping.get(name)
+        fill = np.nan if default is None else default
+        if source is None:
+            columns[name] = np.full(size, fill, dtype=np.float64)
+            continue
+        values, bad = _to_float(batch.column(source), pa)
+        reject(bad, f"{source}: not a number")
+        values[np.isnan(values) & ~bad] = fill
+        reject(np.isinf(values), f"{source}: not a finite number")
+        if integer:
+            with np.errstate(invalid="ignore"):
+                reject(np.isfinite(values) & (values != np.floor(values)), f"{source}: must be a whole number")
+        columns[name] = values
+
+    plan_source = mapping.get("bitrix24_plan")
+    if plan_source is None:
+        plans = pa.array([default_plan] * size, pa.string())
+    else:
+        plans = pc.cast(batch.column(plan_source), pa.string())
+        plans = pc.fill_null(pc.if_else(pc.equal(pc.utf8_trim_whitespace(plans), ""), None, plans), default_plan)
+    names = list(prices)
+    index = pc.index_in(plans, value_set=pa.array(names, pa.string())).to_numpy(zero_copy_only=False)
+    unknown = np.isnan(index.astype(np.float64))
+    reject(unknown, f"{plan_source}: unknown Bitrix24 plan")
+    plan_prices = np.asarray([prices[name] for name in names], dtype=np.float64)
+    columns["monthly_price_usd"] = np.where(unknown, np.nan, plan_prices[np.nan_to_num(index).astype(np.int64)])
+
+    email_source = mapping.get("user_email")
+    if email_source is not None:
+        emails = pc.utf8_trim_whitespace(pc.cast(batch.column(email_source), pa.string()))
+        matches = pc.fill_null(pc.match_substring_regex(emails, EMAIL_PATTERN), False)
+        reject(~matches.to_numpy(zero_copy_only=False), f"{email_source}: not a valid email address")
+
+    valid = errors == None  # noqa: E711 (elementwise)
+    results = compute_roi_columns({name: values[valid] for name, values in columns.items()}, usd_to_ars)
+
+    schema = output_schema(batch.schema, pa)
+    kept = batch.filter(pa.array(valid))
+    arrays = [kept.column(field.name) for field in schema if field.name in batch.schema.names
+              and field.name not in SCORE_COLUMNS]
+    arrays.append(plans.filter(pa.array(valid)))
+    for name in RESULT_FIELDS:
+        arrays.append(pa.array(results[name], type=schema.field(name).type, from_pandas=True))
+    scored = pa.Table.from_arrays(arrays, schema=schema)
+
+    invalid = ~valid
+    rejected = pa.Table.from_batches([batch.filter(pa.array(invalid))]).append_column(
+        "row_number", pa.array(np.flatnonzero(invalid) + first_row, pa.int64()),
+    ).append_column("error", pa.array(errors[invalid].tolist(), pa.string()))
+    return scored, rejected
+
+
+def open_input(path: str, chunk_rows: int = CHUNK_ROWS):
+    """(schema, batch iterator, total rows if known) of a memory-mapped CSV or Parquet file.
+
+    CSV cells are read as strings (validation does the parsing, so a bad
+    cell rejects one row instead of failing the file); the block size is
+    estimated from the first 64 KiB to give roughly `chunk_rows` per chunk.
+    """
+    pa = _pyarrow()
+    if path.endswith(".parquet"):
+        parquet = pa.parquet.ParquetFile(path, memory_map=True)
+        schema = parquet.schema_arrow
+        return schema, parquet.iter_batches(batch_size=chunk_rows), parquet.metadata.num_rows
+
+    with open(path, "rb") as f:
+        sample = f.read(65536)
+    header = pa.csv.read_csv(pa.py_buffer(sample.split(b"\n", 1)[0] + b"\n")).column_names
+    lines = max(1, sample.count(b"\n") - 1)
+    bytes_per_row = max(1, (len(sample) - len(sample.split(b"\n", 1)[0])) // lines)
+    reader = pa.csv.open_csv(
+        pa.memory_map(path, "r"),
+        read_options=pa.csv.ReadOptions(block_size=max(1 << 16, min(bytes_per_row * chunk_rows, 1 << 30))),
+        convert_options=pa.csv.ConvertOptions(
+            column_types={name: pa.string() for name in header}, strings_can_be_null=True,
+        ),
+    )
+    return reader.schema, reader, None
+
+
+class OutputWriter:
+    """Incremental CSV or Parquet writer (one row group per chunk)"""
+
+    def __init__(self, path: str, schema, output_format: str):
+        pa = _pyarrow()
+        if output_format == "parquet":
+            self.writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self.writer = pa.csv.CSVWriter(path, schema)
+
+    def write(self, table) -> None:
+        if table.num_rows:
+            self.writer.write_table(table)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def resolve_mapping(columns: Sequence[str], mapped: Sequence[str], fields: Sequence[str]) -> Dict[str, str]:
+    """Request field -> input column from --map SOURCE=FIELD options plus same-named columns.
+
+    Raises ValueError for unknown fields or columns.
+    """
+    mapping = {name: name for name in fields if name in columns}
+    for option in mapped:
+        source, sep, field = option.rpartition("=")
+        if not sep or not source:
+            raise ValueError(f"--map expects SOURCE=FIELD, got {option!r}")
+        if field not in fields:
+            raise ValueError(f"unknown field {field!r} in --map (expected one of {', '.join(fields)})")
+        if source not in columns:
+            raise ValueError(f"input has no column {source!r}")
+        mapping[field] = source
+    return mapping
+
+
+def score_file(input_path: str, output_path: str, rejects_path: str, mapping: Mapping[str, str],
+               specs: Mapping[str, Tuple[Optional[float], bool]], prices: Mapping[str, int], default_plan: str,
+               usd_to_ars: float = USD_TO_ARS, workers: Optional[int] = None, chunk_rows: int = CHUNK_ROWS,
+               output_format: Optional[str] = None, progress_seconds: float = 2.0, log=None) -> Dict[str, float]:
+    """Score every row of `input_path`; returns row counts and timing"""
+    log = log or sys.stderr
+    schema, batches, total = open_input(input_path, chunk_rows)
+    output_format = output_format or ("parquet" if output_path.endswith(".parquet") else "csv")
+    output = OutputWriter(output_path, output_schema(schema), output_format)
+    rejects = OutputWriter(rejects_path, reject_schema(schema), "csv")
+    workers = workers or os.cpu_count() or 1
+    started = last_report = time.perf_counter()
+    counts = {"rows": 0, "scored": 0, "rejected": 0}
+
+    def report(final: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        done = f"{counts['rows']:,}" + (f"/{total:,}" if total else "")
+        print(f"{'Scored' if final else 'Scoring'} {done} rows ({counts['rejected']:,} rejected) "
+              f"in {elapsed:.1f}s, {counts['rows'] / elapsed if elapsed else 0:,.0f} rows/s", file=log)
+
+    def drain(future) -> None:
+        nonlocal last_report
+        scored, rejected = future.result()
+        output.write(scored)
+        rejects.write(rejected)
+        counts["rows"] += scored.num_rows + rejected.num_rows
+        counts["scored"] += scored.num_rows
+        counts["rejected"] += rejected.num_rows
+        if progress_seconds and time.perf_counter() - last_report >= progress_seconds:
+            last_report = time.perf_counter()
+            report()
+
+    # Bounded read-ahead: at most two chunks per worker are in memory at once
+    pending = deque()
+    next_row = 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch in batches:
+                if len(pending) >= 2 * workers:
+                    drain(pending.popleft())
+                pending.append(pool.submit(score_batch, batch, mapping, specs, prices, default_plan,
+                                           usd_to_ars, next_row))
+                next_row += batch.num_rows
+            while pending:
+                drain(pending.popleft())
+    finally:
+        output.close()
+        rejects.close()
+    report(final=True)
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet lead file with the ROI formula")
+    parser.add_argument("input", help="CSV or .parquet file")
+    parser.add_argument("--output", "-o", required=True, help="enriched rows (.parquet for Parquet, else CSV)")
+    parser.add_argument("--rejects", help="invalid rows as CSV (default: <output>.rejects.csv)")
+    parser.add_argument("--map", action="append", default=[], metavar="SOURCE=FIELD",
+                        help="read request field FIELD from input column SOURCE (repeatable)")
+    parser.add_argument("--format", choices=("csv", "parquet"), help="output format (default: from the extension)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0: one per CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--usd-to-ars", type=float, help="ARS per USD (default: from the FX provider settings)")
+    parser.add_argument("--plans", default=os.getenv('PLANS_CONFIG_PATH', os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "plans.json")))
+    parser.add_argument("--progress-seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    from fx import fx_cache_from_env
+    from plan_catalog import PlanCatalog
+
+    specs = field_specs()
+    fields = tuple(name for name in INPUT_FIELDS if name != "monthly_price_usd") + ("bitrix24_plan", "user_email")
+    try:
+        schema, _, _ = open_input(args.input, args.chunk_rows)
+        mapping = resolve_mapping(schema.names, args.map, fields)
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(str(e))
+
+    catalog = PlanCatalog(args.plans).current()
+    usd_to_ars = args.usd_to_ars
+    if usd_to_ars is None:
+        # One fetch, as the API does at startup (the fallback rate if the provider fails)
+        quote = asyncio.run(fx_cache_from_env().start())
+        usd_to_ars = quote.rate
+        print(f"USD/ARS rate {quote.rate} ({quote.source}, as of {quote.as_of})", file=sys.stderr)
+    counts = score_file(
+        args.input, args.output, args.rejects or f"{args.output}.rejects.csv", mapping, specs, catalog.prices,
+        DEFAULT_PLAN, usd_to_ars, args.workers or None,
+        args.chunk_rows, args.format, args.progress_seconds,
+    )
+    return 0 if counts["scored"] or not counts["rows"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
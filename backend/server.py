@@ -1,12 +1,126 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, ValidationError
+from starlette.requests import HTTPConnection
+from typing import Dict, List, Literal, Mapping, Optional, Tuple
+import asyncio
+import hmac
+import math
+import multiprocessing
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+import time
 import uuid
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+
+import orjson
+
+from admin_digest import AdminDigest
+from admission import AdmissionController, InFlightMiddleware
+from analytics import CalculationAnalytics
+from calculation_store import CalculationStore
+from calculations import (
+    DEFAULT_PLAN, INPUT_DEFAULTS, INPUT_FIELDS as NUMERIC_FIELDS, OPTIONAL_INPUT_FIELDS, ROIInputs, ROIResult, compute_roi,
+    roi_cache_stats,
+)
+from email_dispatcher import EmailDispatcher, EmailMessage, dispatcher_from_env
+from email_rendering import render_admin_email, render_user_email
+from export import FORMATS, export_stream, parquet_available
+from fx import FXQuote, FXRateCache, fx_cache_from_env
+from idempotency import IdempotencyKeyReused, SubmissionDeduplicator
+from live import LiveSession, coalesce, collect_frame
+from metrics import ERRORS, REGISTRY, STAGE_SECONDS, MetricsMiddleware, since_request_start
+from outbox import EmailOutbox, OutboxDrainer
+from plan_catalog import CACHE_CONTROL, PlanCatalog, etag_matches
+from reports import CALCULATION_ID, CONTENT_TYPES, ReportCache, render_report, warm_up
+# The NumPy-based modules (vectorized, sweep, simulation, projection, comparison,
+# solver) are imported inside the endpoints that use them: NumPy is the largest
+# import of the app, and a cold start should serve /api/health and
+# /api/calculate-roi without it.
+
+ROOT_DIR = Path(__file__).parent
+
+# Serve calculate-roi from a prebuilt dict via orjson instead of the response_model round trip
+ROI_FAST_PATH = os.getenv('ROI_FAST_PATH', '1') == '1'
+# Upper bound on grid points a single sweep may evaluate
+SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', '20000000'))
+# Monte Carlo limits and process pool size (defaults to one worker per CPU)
+SIMULATION_MAX_DRAWS = int(os.getenv('SIMULATION_MAX_DRAWS', '50000000'))
+SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', '0')) or None
+# Upper bound on scenarios x months a single projection may evaluate
+PROJECTION_MAX_CELLS = int(os.getenv('PROJECTION_MAX_CELLS', '6000000'))
+# Upper bound on rows in one /api/calculate-roi/batch request
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', '100000'))
+
+# Worker processes start from a forkserver instead of forking this process,
+# which already runs threads (SQLite writers, the threadpool) that a fork
+# could leave holding locks. The forkserver imports the workers' modules once.
+POOL_CONTEXT = multiprocessing.get_context("forkserver")
+POOL_CONTEXT.set_forkserver_preload(["reports", "simulation"])
+
+# Created on first use so plain API workers don't start simulation processes
+_simulation_pool: Optional[ProcessPoolExecutor] = None
+
+# Shared SendGrid dispatcher, created at startup (None when email is not configured)
+email_dispatcher: Optional[EmailDispatcher] = None
+# Durable outbox the calculations write to; drained into the dispatcher
+EMAIL_OUTBOX_PATH = os.getenv('EMAIL_OUTBOX_PATH', str(ROOT_DIR / 'data' / 'email_outbox.db'))
+email_outbox: Optional[EmailOutbox] = None
+outbox_drainer: Optional[OutboxDrainer] = None
+# ADMIN_EMAIL_MODE=digest replaces the per-lead admin email with one summary per
+# ADMIN_DIGEST_MAX_LEADS leads or ADMIN_DIGEST_MAX_MINUTES minutes, whichever comes first
+ADMIN_EMAIL_MODE = os.getenv('ADMIN_EMAIL_MODE', 'immediate')
+admin_digest: Optional[AdminDigest] = None
+
+# Calculation history (SQLite), opened at startup
+CALCULATIONS_DB_PATH = os.getenv('CALCULATIONS_DB_PATH', str(ROOT_DIR / 'data' / 'calculations.db'))
+calculation_store: Optional[CalculationStore] = None
+# Shared secret (X-Admin-Key header) for endpoints that expose stored leads; unset disables them
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+
+# Downloadable reports: rendered by a process pool (started and warmed at startup) into a bounded disk cache
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', str(ROOT_DIR / 'data' / 'reports'))
+REPORT_CACHE_MAX_MB = float(os.getenv('REPORT_CACHE_MAX_MB', '256'))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+report_pool: Optional[ProcessPoolExecutor] = None
+report_cache: Optional[ReportCache] = None
+# Renders in progress, so concurrent downloads of one report share a single render
+report_renders: Dict[Tuple[str, str], "asyncio.Future[str]"] = {}
+
+# Per day/plan aggregates for the analytics dashboard, shared by all workers through this file
+ANALYTICS_DB_PATH = os.getenv('ANALYTICS_DB_PATH', str(ROOT_DIR / 'data' / 'analytics.db'))
+ANALYTICS_SNAPSHOT_SECONDS = float(os.getenv('ANALYTICS_SNAPSHOT_SECONDS', '10'))
+analytics: Optional[CalculationAnalytics] = None
+
+# Bitrix24 plans and prices; edits to the file are picked up without a restart
+PLANS_CONFIG_PATH = os.getenv('PLANS_CONFIG_PATH', str(ROOT_DIR / 'plans.json'))
+plan_catalog = PlanCatalog(PLANS_CONFIG_PATH)
+
+# Repeated calculate-roi submissions are answered from here without recalculating or re-emailing
+REJECTED = REGISTRY.counter("roi_rejected_requests_total", "Requests refused by admission control", ("reason",))
+REPLAYS = REGISTRY.counter(
+    "roi_replayed_submissions_total", "calculate-roi requests answered from the idempotency/dedup cache", ("reason",)
+)
+submissions = SubmissionDeduplicator(
+    # Identical (email, inputs) submissions within this many seconds are duplicates; 0 disables
+    window=float(os.getenv('DEDUP_WINDOW_SECONDS', '300')),
+    key_ttl=float(os.getenv('IDEMPOTENCY_KEY_TTL', '86400')),
+    max_entries=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000')),
+)
+
+# USD -> ARS rate; serves the cached quote and refreshes it in the background (started at startup)
+fx_rates: FXRateCache = fx_cache_from_env()
+
+def get_simulation_pool() -> ProcessPoolExecutor:
+    global _simulation_pool
+    if _simulation_pool is None:
+        _simulation_pool = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS, mp_context=POOL_CONTEXT)
+    return _simulation_pool
 
 app = FastAPI()
 
@@ -18,18 +132,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Rate limits and load shedding for calculate-roi (a limit of 0 disables it)
+admission = AdmissionController(
+    ip_per_minute=float(os.getenv('RATE_LIMIT_IP_PER_MINUTE', '60')),
+    ip_burst=float(os.getenv('RATE_LIMIT_IP_BURST', '60')),
+    email_per_minute=float(os.getenv('RATE_LIMIT_EMAIL_PER_MINUTE', '20')),
+    email_burst=float(os.getenv('RATE_LIMIT_EMAIL_BURST', '10')),
+    max_keys=int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000')),
+    max_in_flight=int(os.getenv('MAX_IN_FLIGHT_REQUESTS', '256')),
+    max_email_backlog=int(os.getenv('MAX_EMAIL_BACKLOG', '5000')),
+)
+app.add_middleware(InFlightMiddleware, controller=admission)
+# Outermost, so it times and counts every request
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(RequestValidationError)
+async def count_validation_errors(request: Request, exc: RequestValidationError):
+    ERRORS.inc("request_validation")
+    return await request_validation_exception_handler(request, exc)
 
 class ROICalculationRequest(BaseModel):
-    monthly_inquiries: int = 1000
-    automation_percentage: float = 60.0
-    minutes_per_inquiry: int = 4
-    monthly_crm_hours: int = 40
-    crm_automation_percentage: float = 50.0
-    team_members: int = 3
-    hourly_cost_ars: int = 5000
-    bitrix24_plan: str = "Standard Plan"
-    monthly_price_usd: int = 99
-    implementation_cost: int = 1000000
+    monthly_inquiries: int = INPUT_DEFAULTS["monthly_inquiries"]
+    automation_percentage: float = INPUT_DEFAULTS["automation_percentage"]
+    minutes_per_inquiry: int = INPUT_DEFAULTS["minutes_per_inquiry"]
+    monthly_crm_hours: int = INPUT_DEFAULTS["monthly_crm_hours"]
+    crm_automation_percentage: float = INPUT_DEFAULTS["crm_automation_percentage"]
+    team_members: int = INPUT_DEFAULTS["team_members"]
+    hourly_cost_ars: int = INPUT_DEFAULTS["hourly_cost_ars"]
+    bitrix24_plan: str = DEFAULT_PLAN
+    monthly_price_usd: int = INPUT_DEFAULTS["monthly_price_usd"]
+    implementation_cost: int = INPUT_DEFAULTS["implementation_cost"]
     # Optional fields for revenue calculation
     average_ticket_ars: Optional[int] = None
     current_conversion_rate: Optional[float] = None
@@ -60,271 +192,926 @@ class ROICalculationResponse(BaseModel):
     calculation_date: str
     calculation_id: str
     user_email: str
+    # Exchange rate applied to the license cost (absent on calculations stored before it was recorded)
+    usd_to_ars_rate: Optional[float] = None
+    usd_to_ars_rate_as_of: Optional[str] = None
 
-def send_roi_analysis_email(user_email: str, roi_data: dict, admin_email: str = "hola@efficiency.io"):
+class PlanComparison(BaseModel):
+    plan: str
+    monthly_price_usd: int
+    annual_license_cost_usd: int
+    total_investment: int
+    roi_percentage: float
+    # Break-even month of a flat projection, None if beyond its horizon
+    break_even_month: Optional[int] = None
+    payback_months: Optional[float] = None
+    # Whether the plan's user limit covers team_members
+    eligible: bool
+
+class ROIComparisonResponse(ROICalculationResponse):
+    recommended_plan: str
+    # One entry per catalog plan, in catalog order
+    plan_comparison: List[PlanComparison]
+
+class ROICalculationPage(BaseModel):
+    items: List[ROICalculationResponse]
+    # Pass as `cursor` to fetch the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+class ROIBatchRequest(BaseModel):
+    rows: List[ROICalculationRequest]
+    # Per-row user/admin emails are opt-in for bulk submissions
+    send_emails: bool = False
+
+class ROIBatchResponse(BaseModel):
+    count: int
+    calculation_date: str
+    usd_to_ars_rate: float
+    usd_to_ars_rate_as_of: str
+    # Column name -> one value per input row, in request order
+    columns: Dict[str, list]
+
+class SweepRange(BaseModel):
+    # Either explicit values, or `steps` evenly spaced points from start to stop (inclusive)
+    values: Optional[List[float]] = Field(None, min_length=1)
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: Optional[int] = None
+
+class ROISweepRequest(BaseModel):
+    # Fixed numeric inputs; anything omitted uses the ROICalculationRequest default
+    base: Dict[str, Optional[float]] = {}
+    # Swept numeric inputs, evaluated over their Cartesian product
+    ranges: Dict[str, SweepRange]
+    # Result columns to include in each row (default: all)
+    outputs: Optional[List[str]] = None
+
+class DistributionSpec(BaseModel):
+    distribution: Literal["uniform", "triangular", "normal"]
+    # uniform: low/high; triangular: low/mode/high; normal: mean/std (low/high optionally truncate)
+    low: Optional[float] = None
+    high: Optional[float] = None
+    mode: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+
+class ROISimulationRequest(BaseModel):
+    # Fixed numeric inputs; anything omitted uses the ROICalculationRequest default
+    base: Dict[str, Optional[float]] = {}
+    # Uncertain numeric inputs
+    distributions: Dict[str, DistributionSpec]
+    draws: int = 100000
+    seed: Optional[int] = None
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+
+async def send_roi_analysis_email(user_email: str, roi_data: dict, admin_email: str = "hola@efficiency.io"):
     """Send ROI analysis to both user and admin"""
     try:
-        sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
-        if not sendgrid_api_key or sendgrid_api_key == "your_sendgrid_api_key_here":
+        if email_dispatcher is None:
             print("Warning: SendGrid API key not configured. Email functionality disabled.")
             return
         
-        sg = SendGridAPIClient(sendgrid_api_key)
-        sender_email = os.getenv('SENDER_EMAIL', 'hola@efficiency.io')
-        
-        # User email content
-        user_subject = "Su Análisis ROI - Bitrix24 + Chatbot"
-        user_html_content = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; color: #333;">
-                <div style="background: linear-gradient(135deg, #007bff 0%, #0056b3 100%); color: white; padding: 30px; text-align: center;">
-                    <h1 style="margin: 0; font-size: 28px;">Efficiency24</h1>
-                    <p style="margin: 10px 0 0 0; font-size: 16px;">Análisis ROI - Bitrix24 + Chatbot</p>
-                </div>
-                
-                <div style="padding: 30px; background: #f8f9fa;">
-                    <h2 style="color: #007bff; margin-bottom: 20px;">Resumen de su Análisis ROI</h2>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                        <h3 style="color: #28a745; text-align: center; margin-bottom: 15px;">ROI Proyectado: {roi_data['roi_percentage']}%</h3>
-                        <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-top: 20px;">
-                            <div style="text-align: center; padding: 15px; background: #e8f5e8; border-radius: 6px;">
-                                <strong style="color: #28a745;">Ahorro Anual</strong><br>
-                                <span style="font-size: 20px; color: #333;">${roi_data['total_annual_savings']:,.0f} ARS</span>
-                            </div>
-                            <div style="text-align: center; padding: 15px; background: #ffe8e8; border-radius: 6px;">
-                                <strong style="color: #dc3545;">Inversión Total</strong><br>
-                                <span style="font-size: 20px; color: #333;">${roi_data['total_investment']:,.0f} ARS</span>
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
-                        <h3 style="color: #007bff; margin-bottom: 15px;">Plan Bitrix24 Seleccionado</h3>
-                        <p><strong>Plan:</strong> {roi_data['selected_plan']}</p>
-                        <p><strong>Costo Mensual:</strong> ${roi_data['monthly_price_usd']} USD</p>
-                        <p><strong>Costo Anual:</strong> ${roi_data['annual_license_cost_usd']} USD</p>
-                    </div>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
-                        <h3 style="color: #007bff; margin-bottom: 15px;">Desglose de Ahorros</h3>
-                        <div style="margin-bottom: 15px; padding: 15px; background: #e3f2fd; border-radius: 6px;">
-                            <strong>Ahorro por Chatbot:</strong> ${roi_data['chatbot_annual_savings']:,.0f} ARS/año<br>
-                            <small style="color: #666;">({roi_data['chatbot_monthly_hours_saved'] * 12:.1f} horas ahorradas anualmente)</small>
-                        </div>
-                        <div style="margin-bottom: 15px; padding: 15px; background: #e8f5e8; border-radius: 6px;">
-                            <strong>Ahorro por CRM:</strong> ${roi_data['crm_annual_savings']:,.0f} ARS/año<br>
-                            <small style="color: #666;">({roi_data['crm_annual_hours_saved']:.1f} horas ahorradas anualmente)</small>
-                        </div>
-                        <div style="padding: 15px; background: #fff3cd; border-radius: 6px;">
-                            <strong>Total Horas Ahorradas:</strong> {roi_data['total_hours_saved_annually']:.1f} horas/año
-                        </div>
-                    </div>
-                    
-                    {"<div style='background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px;'><h3 style='color: #007bff; margin-bottom: 15px;'>Ingresos Adicionales Estimados</h3><p style='font-size: 18px; color: #28a745;'><strong>${roi_data['additional_annual_revenue']:,.0f} ARS/año</strong></p><p style='color: #666;'>Por mejora en tasa de conversión</p></div>" if roi_data.get('additional_annual_revenue') else ""}
-                    
-                    <div style="background: #007bff; color: white; padding: 20px; border-radius: 8px; text-align: center;">
-                        <h3 style="margin: 0 0 10px 0;">¿Listo para dar el siguiente paso?</h3>
-                        <p style="margin: 0; font-size: 14px;">Nuestro equipo se pondrá en contacto contigo para analizar estos resultados y ayudarte a implementar la solución perfecta para tu PyME.</p>
-                    </div>
-                </div>
-                
-                <div style="background: #333; color: #ccc; padding: 20px; text-align: center; font-size: 12px;">
-                    <p style="margin: 0;">© 2024 Efficiency24. Todos los derechos reservados.</p>
-                    <p style="margin: 5px 0 0 0;">Análisis generado el {roi_data['calculation_date'][:10]}</p>
-                </div>
-            </body>
-        </html>
-        """
+        stage = "email_render"
+        with STAGE_SECONDS.time(stage):
+            user_subject, user_html_content = render_user_email(roi_data)
+            messages = [EmailMessage(user_email, user_subject, user_html_content)]
+            if admin_digest is None:
+                admin_subject, admin_html_content = render_admin_email(user_email, roi_data)
+                messages.append(EmailMessage(admin_email, admin_subject, admin_html_content))
         
-        # Admin notification email
-        admin_subject = f"Nueva Consulta ROI - {roi_data.get('company_name', 'Sin especificar')}"
-        admin_html_content = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="background: #007bff; color: white; padding: 20px;">
-                    <h1 style="margin: 0;">Nueva Consulta ROI Recibida</h1>
-                </div>
-                
-                <div style="padding: 20px; background: #f8f9fa;">
-                    <h2>Información del Lead</h2>
-                    <p><strong>Email:</strong> {user_email}</p>
-                    <p><strong>Empresa:</strong> {roi_data.get('company_name', 'No especificada')}</p>
-                    <p><strong>Fecha:</strong> {roi_data['calculation_date']}</p>
-                    <p><strong>ID de Cálculo:</strong> {roi_data['calculation_id']}</p>
-                    
-                    <h3>Resultados ROI</h3>
-                    <ul>
-                        <li><strong>ROI:</strong> {roi_data['roi_percentage']}%</li>
-                        <li><strong>Ahorro Anual:</strong> ${roi_data['total_annual_savings']:,.0f} ARS</li>
-                        <li><strong>Inversión Total:</strong> ${roi_data['total_investment']:,.0f} ARS</li>
-                        <li><strong>Plan Bitrix24:</strong> {roi_data['selected_plan']} (${roi_data['monthly_price_usd']}/mes)</li>
-                        <li><strong>Horas Ahorradas/Año:</strong> {roi_data['total_hours_saved_annually']:.1f}</li>
-                    </ul>
-                    
-                    <h3>Parámetros de Entrada</h3>
-                    <ul>
-                        <li><strong>Consultas mensuales:</strong> {roi_data['inputs']['monthly_inquiries']}</li>
-                        <li><strong>% Automatización chatbot:</strong> {roi_data['inputs']['automation_percentage']}%</li>
-                        <li><strong>Minutos por consulta:</strong> {roi_data['inputs']['minutes_per_inquiry']}</li>
-                        <li><strong>Horas CRM mensuales:</strong> {roi_data['inputs']['monthly_crm_hours']}</li>
-                        <li><strong>% Automatización CRM:</strong> {roi_data['inputs']['crm_automation_percentage']}%</li>
-                        <li><strong>Miembros del equipo:</strong> {roi_data['inputs']['team_members']}</li>
-                        <li><strong>Costo por hora:</strong> ${roi_data['inputs']['hourly_cost_ars']} ARS</li>
-                    </ul>
-                    
-                    {"<h3>Proyección de Ingresos</h3><ul><li><strong>Ticket promedio:</strong> $" + str(roi_data['inputs'].get('average_ticket_ars', 'N/A')) + " ARS</li><li><strong>Conversión actual:</strong> " + str(roi_data['inputs'].get('current_conversion_rate', 'N/A')) + "%</li><li><strong>Conversión esperada:</strong> " + str(roi_data['inputs'].get('expected_conversion_rate', 'N/A')) + "%</li><li><strong>Ingresos adicionales:</strong> $" + str(roi_data.get('additional_annual_revenue', 0)) + " ARS/año</li></ul>" if roi_data.get('additional_annual_revenue') else ""}
-                </div>
-            </body>
-        </html>
-        """
-        
-        # Send email to user
-        user_message = Mail(
-            from_email=sender_email,
-            to_emails=user_email,
-            subject=user_subject,
-            html_content=user_html_content
-        )
-        
-        # Send email to admin
-        admin_message = Mail(
-            from_email=sender_email,
-            to_emails=admin_email,
-            subject=admin_subject,
-            html_content=admin_html_content
-        )
-        
-        # Send both emails
-        sg.send(user_message)
-        sg.send(admin_message)
-        
-        print(f"ROI analysis emails sent successfully to {user_email} and {admin_email}")
+        # Commit the emails to the outbox; the drainer delivers them through the dispatcher.
+        # In digest mode the lead is stored for the next admin summary instead.
+        stage = "email_enqueue"
+        with STAGE_SECONDS.time(stage):
+            await email_outbox.enqueue(messages)
+            if admin_digest is not None:
+                await admin_digest.add(user_email, roi_data)
         
     except Exception as e:
+        ERRORS.inc(stage)
         print(f"Error sending ROI analysis email: {str(e)}")
 
+class ROIProjectionRequest(BaseModel):
+    # Numeric inputs shared by every scenario; anything omitted uses the ROICalculationRequest default
+    base: Dict[str, Optional[float]] = {}
+    # One projection per entry, each overriding `base`
+    rows: List[Dict[str, Optional[float]]] = [{}]
+    months: int = 36
+    # Either explicit % of the target automation reached in months 1..n, or a linear ramp over n months
+    ramp_up: Optional[List[float]] = None
+    ramp_up_months: int = 0
+
+class ROISolveRequest(BaseModel):
+    target_metric: Literal["roi_percentage", "total_annual_savings", "payback_months"] = "roi_percentage"
+    target: float
+    # Numeric input to solve for
+    variable: str
+    # Search/feasibility range for the variable (default: 0-100 for percentages, else 0-1e9)
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    # Numeric inputs shared by every client; anything omitted uses the ROICalculationRequest default
+    base: Dict[str, Optional[float]] = {}
+    # One solution per entry, each overriding `base`
+    rows: List[Dict[str, Optional[float]]] = [{}]
+    # Automation ramp-up assumed for payback_months
+    ramp_up_months: int = 0
+
+def admit(http_request: HTTPConnection, emails: List[str] = (), cost: float = 1.0) -> None:
+    """Raise 429/503 (with Retry-After) if admission control rejects the request"""
+    client_ip = http_request.client.host if http_request.client else "unknown"
+    rejection = admission.check(client_ip, emails, cost)
+    if rejection is not None:
+        REJECTED.inc(rejection.reason)
+        raise HTTPException(status_code=rejection.status_code, detail=rejection.detail,
+                            headers={"Retry-After": str(math.ceil(rejection.retry_after))})
+
+def resolve_plan_prices(requests: List[ROICalculationRequest]) -> None:
+    """Set each request's monthly_price_usd from the plan catalog; 400 for plans it doesn't list"""
+    prices = plan_catalog.current().prices
+    unknown = sorted({request.bitrix24_plan for request in requests if request.bitrix24_plan not in prices})
+    if unknown:
+        ERRORS.inc("unknown_plan")
+        raise HTTPException(status_code=400, detail=f"Unknown Bitrix24 plan: {', '.join(unknown)}")
+    for request in requests:
+        request.monthly_price_usd = prices[request.bitrix24_plan]
+
+def submission_fingerprint(request: ROICalculationRequest, *scope) -> tuple:
+    """Identity of a lead submission for dedup: email case-insensitively, every other field exactly"""
+    return (*scope, request.user_email.lower(), *(v for k, v in vars(request).items() if k != "user_email"))
+
+def lookup_submission(idempotency_key: Optional[str], fingerprint: tuple) -> Optional[dict]:
+    """The stored result of a repeated submission, None for a new one (422 for a reused key)"""
+    try:
+        replay = submissions.lookup(idempotency_key, fingerprint)
+    except IdempotencyKeyReused as e:
+        ERRORS.inc("idempotency_key_reused")
+        raise HTTPException(status_code=422, detail=str(e))
+    if replay is not None:
+        REPLAYS.inc("idempotency_key" if idempotency_key is not None else "duplicate")
+    return replay
+
+def replay_submission(idempotency_key: Optional[str], fingerprint: tuple) -> Optional[Response]:
+    """The original response of a repeated submission, None for a new one (422 for a reused key)"""
+    replay = lookup_submission(idempotency_key, fingerprint)
+    if replay is None:
+        return None
+    return Response(content=orjson.dumps(replay), media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+def store_calculation(roi_data: dict) -> None:
+    """Persist a calculation (without waiting) and count it in the analytics aggregates"""
+    if calculation_store is not None:
+        calculation_store.save(roi_data)
+    if analytics is not None:
+        analytics.record(roi_data)
+
+def build_roi_data(request: ROICalculationRequest, result: ROIResult, fx: FXQuote) -> dict:
+    """A plain dict in ROICalculationResponse field order, built once per calculation and
+    shared by the response, the store and the email task"""
+    return dict(
+        inputs={
+            "monthly_inquiries": request.monthly_inquiries,
+            "automation_percentage": request.automation_percentage,
+            "minutes_per_inquiry": request.minutes_per_inquiry,
+            "monthly_crm_hours": request.monthly_crm_hours,
+            "crm_automation_percentage": request.crm_automation_percentage,
+            "team_members": request.team_members,
+            "hourly_cost_ars": request.hourly_cost_ars,
+            "bitrix24_plan": request.bitrix24_plan,
+            "monthly_price_usd": request.monthly_price_usd,
+            "implementation_cost": request.implementation_cost,
+            "average_ticket_ars": request.average_ticket_ars,
+            "current_conversion_rate": request.current_conversion_rate,
+            "expected_conversion_rate": request.expected_conversion_rate,
+            "company_name": request.company_name,
+        },
+        selected_plan=request.bitrix24_plan,
+        monthly_price_usd=request.monthly_price_usd,
+        annual_license_cost_usd=result.annual_license_cost_usd,
+        chatbot_monthly_hours_saved=result.chatbot_monthly_hours_saved,
+        chatbot_annual_savings=result.chatbot_annual_savings,
+        crm_annual_hours_saved=result.crm_annual_hours_saved,
+        crm_annual_savings=result.crm_annual_savings,
+        total_annual_savings=result.total_annual_savings,
+        total_investment=result.total_investment,
+        roi_percentage=result.roi_percentage,
+        additional_annual_revenue=result.additional_annual_revenue,
+        total_hours_saved_annually=result.total_hours_saved_annually,
+        calculation_date=datetime.now().isoformat(),
+        calculation_id=str(uuid.uuid4()),
+        user_email=request.user_email,
+        usd_to_ars_rate=fx.rate,
+        usd_to_ars_rate_as_of=fx.as_of,
+    )
+
 @app.post("/api/calculate-roi", response_model=ROICalculationResponse)
-async def calculate_roi(request: ROICalculationRequest, background_tasks: BackgroundTasks):
+async def calculate_roi(request: ROICalculationRequest, background_tasks: BackgroundTasks, http_request: Request,
+                        idempotency_key: Optional[str] = Header(None, max_length=255)):
+    # Reading and validating the body happened before the handler was called
+    validation_seconds = since_request_start(http_request.scope)
+    if validation_seconds is not None:
+        STAGE_SECONDS.observe("validation", value=validation_seconds)
+    admit(http_request, [request.user_email])
+    started = time.perf_counter()
+    resolve_plan_prices([request])
+
+    # A retry or double click: answer with the original calculation and send no new emails
+    fingerprint = submission_fingerprint(request)
+    replay = replay_submission(idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+
+    fx = fx_rates.quote()
     try:
-        # Calculate annual license cost from monthly price
-        annual_license_cost_usd = request.monthly_price_usd * 12
-        
-        # Chatbot savings calculations
-        chatbot_monthly_hours_saved = (
-            request.monthly_inquiries * 
-            (request.automation_percentage / 100) * 
-            request.minutes_per_inquiry
-        ) / 60
-        
-        chatbot_annual_savings = (
-            chatbot_monthly_hours_saved * 
-            request.hourly_cost_ars * 
-            12
-        )
-        
-        # CRM automation savings calculations
-        crm_annual_hours_saved = (
-            request.monthly_crm_hours * 
-            (request.crm_automation_percentage / 100) * 
-            request.team_members * 
-            12
-        )
+        result = compute_roi(ROIInputs.from_mapping(vars(request)), fx.rate)
         
-        crm_annual_savings = crm_annual_hours_saved * request.hourly_cost_ars
+        roi_data = build_roi_data(request, result, fx)
+        STAGE_SECONDS.observe("calculation", value=time.perf_counter() - started)
+        submissions.remember(idempotency_key, fingerprint, roi_data)
         
-        # Total calculations
-        total_annual_savings = chatbot_annual_savings + crm_annual_savings
-        # Convert USD license cost to ARS (approximate rate: 1 USD = 800 ARS as of 2024)
-        annual_license_cost_ars = annual_license_cost_usd * 800
-        total_investment = annual_license_cost_ars + request.implementation_cost
-        
-        # ROI calculation
-        roi_percentage = ((total_annual_savings - total_investment) / total_investment) * 100
-        
-        # Optional revenue calculation
-        additional_annual_revenue = None
-        if (request.average_ticket_ars and 
-            request.current_conversion_rate and 
-            request.expected_conversion_rate):
-            
-            conversion_improvement = (
-                request.expected_conversion_rate - request.current_conversion_rate
-            ) / 100
-            
-            additional_annual_revenue = (
-                request.monthly_inquiries * 
-                conversion_improvement * 
-                request.average_ticket_ars * 
-                12
-            )
-        
-        # Total hours saved
-        total_hours_saved_annually = (chatbot_monthly_hours_saved * 12) + crm_annual_hours_saved
-        
-        # Prepare response
-        response_data = ROICalculationResponse(
-            inputs={
-                "monthly_inquiries": request.monthly_inquiries,
-                "automation_percentage": request.automation_percentage,
-                "minutes_per_inquiry": request.minutes_per_inquiry,
-                "monthly_crm_hours": request.monthly_crm_hours,
-                "crm_automation_percentage": request.crm_automation_percentage,
-                "team_members": request.team_members,
-                "hourly_cost_ars": request.hourly_cost_ars,
-                "bitrix24_plan": request.bitrix24_plan,
-                "monthly_price_usd": request.monthly_price_usd,
-                "implementation_cost": request.implementation_cost,
-                "average_ticket_ars": request.average_ticket_ars,
-                "current_conversion_rate": request.current_conversion_rate,
-                "expected_conversion_rate": request.expected_conversion_rate,
-                "company_name": request.company_name,
-            },
-            selected_plan=request.bitrix24_plan,
-            monthly_price_usd=request.monthly_price_usd,
-            annual_license_cost_usd=annual_license_cost_usd,
-            chatbot_monthly_hours_saved=round(chatbot_monthly_hours_saved, 2),
-            chatbot_annual_savings=round(chatbot_annual_savings, 2),
-            crm_annual_hours_saved=round(crm_annual_hours_saved, 2),
-            crm_annual_savings=round(crm_annual_savings, 2),
-            total_annual_savings=round(total_annual_savings, 2),
-            total_investment=total_investment,
-            roi_percentage=round(roi_percentage, 2),
-            additional_annual_revenue=round(additional_annual_revenue, 2) if additional_annual_revenue else None,
-            total_hours_saved_annually=round(total_hours_saved_annually, 2),
-            calculation_date=datetime.now().isoformat(),
-            calculation_id=str(uuid.uuid4()),
-            user_email=request.user_email
-        )
+        # Persist without waiting; the store's writer thread batches inserts
+        store_calculation(roi_data)
         
         # Send emails in background
         background_tasks.add_task(
             send_roi_analysis_email,
             request.user_email,
-            response_data.dict(),
+            roi_data,
             "hola@efficiency.io"
         )
         
-        return response_data
+        started = time.perf_counter()
+        if ROI_FAST_PATH:
+            # Already valid by construction: skip response_model re-validation and encode with orjson
+            response = Response(content=orjson.dumps(roi_data), media_type="application/json")
+        else:
+            response = ROICalculationResponse(**roi_data)
+        STAGE_SECONDS.observe("serialization", value=time.perf_counter() - started)
+        return response
         
+    except Exception as e:
+        ERRORS.inc("calculation")
+        raise HTTPException(status_code=400, detail=f"Calculation error: {str(e)}")
+
+@app.post("/api/calculate-roi/compare", response_model=ROIComparisonResponse)
+async def compare_roi_plans(request: ROICalculationRequest, background_tasks: BackgroundTasks, http_request: Request,
+                            idempotency_key: Optional[str] = Header(None, max_length=255)):
+    """Evaluate the inputs against every catalog plan and recommend one; sends a single lead email.
+
+    The response is the full analysis of the recommended plan (as from
+    /api/calculate-roi) plus the per-plan comparison. `bitrix24_plan` and
+    `monthly_price_usd` in the request are ignored.
+    """
+    from comparison import compare_plans
+
+    admit(http_request, [request.user_email])
+    catalog = plan_catalog.current()
+    plans = catalog.plans
+    fingerprint = submission_fingerprint(request, "compare", catalog.etag)
+    replay = replay_submission(idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+
+    fx = fx_rates.quote()
+    try:
+        base = _numeric_base({name: getattr(request, name) for name in NUMERIC_FIELDS})
+        comparison, recommended = compare_plans(base, plans, fx.rate)
+        request.bitrix24_plan = plans[recommended]["name"]
+        request.monthly_price_usd = plans[recommended]["monthly_price_usd"]
+        roi_data = build_roi_data(request, compute_roi(ROIInputs.from_mapping(vars(request)), fx.rate), fx)
+        roi_data["recommended_plan"] = request.bitrix24_plan
+        roi_data["plan_comparison"] = comparison
+    except Exception as e:
+        ERRORS.inc("calculation")
+        raise HTTPException(status_code=400, detail=f"Calculation error: {str(e)}")
+    submissions.remember(idempotency_key, fingerprint, roi_data)
+
+    # Stored and emailed once, as the recommended plan's calculation with the comparison attached
+    store_calculation(roi_data)
+    background_tasks.add_task(
+        send_roi_analysis_email,
+        request.user_email,
+        roi_data,
+        "hola@efficiency.io"
+    )
+    return Response(content=orjson.dumps(roi_data), media_type="application/json")
+
+# Live sessions: at most one result per frame however fast the client sends deltas
+LIVE_FRAME_SECONDS = float(os.getenv('LIVE_FRAME_SECONDS', str(1 / 60)))
+# Per-field validators for partial updates; the price always comes from the plan catalog
+LIVE_FIELDS = {
+    name: TypeAdapter(field.annotation) for name, field in ROICalculationRequest.model_fields.items()
+    if name not in ("user_email", "monthly_price_usd")
+}
+
+def validate_live_fields(fields: dict) -> Tuple[dict, Dict[str, str]]:
+    """Validate each field of a partial update on its own; returns the valid values and per-field errors"""
+    values, errors = {}, {}
+    for name, value in fields.items():
+        adapter = LIVE_FIELDS.get(name)
+        if adapter is None:
+            errors[name] = "Unknown field"
+            continue
+        try:
+            values[name] = adapter.validate_python(value)
+        except ValidationError as e:
+            errors[name] = e.errors()[0]["msg"]
+    if "bitrix24_plan" in values:
+        price = plan_catalog.price(values["bitrix24_plan"])
+        if price is None:
+            errors["bitrix24_plan"] = f"Unknown Bitrix24 plan: {values.pop('bitrix24_plan')}"
+        else:
+            values["monthly_price_usd"] = price
+    return values, errors
+
+async def submit_live_session(websocket: WebSocket, session: LiveSession, submit: dict) -> None:
+    """Turn the session's current inputs into a lead: store, email and reply with the full analysis"""
+    try:
+        request = ROICalculationRequest(**{**session.inputs, "user_email": submit.get("user_email")})
+    except ValidationError as e:
+        ERRORS.inc("request_validation")
+        detail = [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]
+        await websocket.send_json({"type": "error", "status": 422, "detail": detail})
+        return
+    idempotency_key = submit.get("idempotency_key")
+    try:
+        admit(websocket, [request.user_email])
+        resolve_plan_prices([request])
+        fingerprint = submission_fingerprint(request)
+        replay = lookup_submission(idempotency_key, fingerprint)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+        return
+    if replay is not None:
+        await websocket.send_json({"type": "submitted", "replayed": True, "result": replay})
+        return
+
+    fx = fx_rates.quote()
+    try:
+        result = compute_roi(ROIInputs.from_mapping(vars(request)), fx.rate)
+    except Exception as e:
+        ERRORS.inc("calculation")
+        await websocket.send_json({"type": "error", "status": 400, "detail": f"Calculation error: {str(e)}"})
+        return
+    roi_data = build_roi_data(request, result, fx)
+    submissions.remember(idempotency_key, fingerprint, roi_data)
+    store_calculation(roi_data)
+    await websocket.send_json({"type": "submitted", "replayed": False, "result": roi_data})
+    await send_roi_analysis_email(request.user_email, roi_data, "hola@efficiency.io")
+
+@app.websocket("/api/calculate-roi/live")
+async def calculate_roi_live(websocket: WebSocket):
+    """Slider session: send {"type": "update", "fields": {...}} deltas, receive changed result fields.
+
+    Replies are {"type": "result", "fields": {...}} with only the
+    ROICalculationResponse fields whose values changed (all of them right
+    after connecting), at most one per LIVE_FRAME_SECONDS. Nothing is stored
+    or emailed until {"type": "submit", "user_email": ..., "fields": {...}},
+    answered with {"type": "submitted", "result": <full analysis>}.
+    Problems are reported as {"type": "error", ...} and keep the session open.
+    """
+    await websocket.accept()
+    defaults = {name: field.default for name, field in ROICalculationRequest.model_fields.items()
+                if name != "user_email"}
+    defaults["monthly_price_usd"] = plan_catalog.price(defaults["bitrix24_plan"]) or defaults["monthly_price_usd"]
+    session = LiveSession(defaults)
+    messages: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+
+    async def read() -> None:
+        try:
+            while True:
+                try:
+                    message = await websocket.receive_json()
+                except ValueError:
+                    message = None
+                messages.put_nowait(message if isinstance(message, dict) else {"type": "invalid"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            messages.put_nowait(None)
+
+    reader = asyncio.create_task(read())
+    loop = asyncio.get_running_loop()
+    try:
+        fx = fx_rates.quote()
+        await websocket.send_json({"type": "result", "fields": session.result(fx.rate, fx.as_of)})
+        last_frame = loop.time()
+        failed = False
+        while True:
+            frame = await collect_frame(messages, LIVE_FRAME_SECONDS, last_frame)
+            known = []
+            for message in frame:
+                if message is None:
+                    continue
+                if message.get("type") not in ("update", "submit"):
+                    await websocket.send_json({"type": "error", "detail": "Expected an update or submit message"})
+                elif not isinstance(message.get("fields") or {}, Mapping):
+                    await websocket.send_json({"type": "error", "status": 422, "detail": "fields must be an object"})
+                else:
+                    known.append(message)
+            fields, submit = coalesce(known)
+            values, errors = validate_live_fields(fields)
+            if errors:
+                await websocket.send_json({"type": "error", "status": 422, "detail": errors})
+            session.apply(values)
+            fx = fx_rates.quote()
+            changed = {}
+            # After a failed calculation, wait for new values instead of repeating the error every frame
+            if values or not failed:
+                try:
+                    changed = session.result(fx.rate, fx.as_of)
+                    failed = False
+                except Exception as e:
+                    # Same answer as the REST endpoint (e.g. zero total investment); the session stays open
+                    ERRORS.inc("calculation")
+                    await websocket.send_json({"type": "error", "status": 400,
+                                               "detail": f"Calculation error: {str(e)}"})
+                    failed = True
+            if changed:
+                await websocket.send_json({"type": "result", "fields": changed})
+                last_frame = loop.time()
+            if submit is not None:
+                await submit_live_session(websocket, session, submit)
+            if frame[-1] is None:
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+def calculate_roi_batch(rows: List[ROICalculationRequest]) -> dict:
+    """Compute ROI results for many requests at once as NumPy columns"""
+    from vectorized import RESULT_FIELDS, column_to_list, compute_roi_columns, rows_to_columns
+
+    fx = fx_rates.quote()
+    results = compute_roi_columns(rows_to_columns(rows), fx.rate)
+    return {
+        "count": len(rows),
+        "calculation_date": datetime.now().isoformat(),
+        "usd_to_ars_rate": fx.rate,
+        "usd_to_ars_rate_as_of": fx.as_of,
+        "columns": {
+            "calculation_id": [str(uuid.uuid4()) for _ in rows],
+            **{name: column_to_list(results[name]) for name in RESULT_FIELDS},
+        },
+    }
+
+def _batch_row_email_data(request: ROICalculationRequest, batch: dict, index: int) -> dict:
+    """Rebuild the ROICalculationResponse-shaped dict of one batch row for emailing"""
+    roi_data = {name: values[index] for name, values in batch["columns"].items()}
+    roi_data["inputs"] = request.dict(exclude={"user_email"})
+    roi_data["selected_plan"] = request.bitrix24_plan
+    roi_data["calculation_date"] = batch["calculation_date"]
+    roi_data["usd_to_ars_rate"] = batch["usd_to_ars_rate"]
+    roi_data["usd_to_ars_rate_as_of"] = batch["usd_to_ars_rate_as_of"]
+    roi_data["user_email"] = request.user_email
+    return roi_data
+
+def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Endpoint dependency: 401 without a matching X-Admin-Key, 403 if ADMIN_API_KEY is not configured"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key")
+
+@app.get("/api/calculations/export", dependencies=[Depends(require_admin)])
+async def export_calculations(format: Literal["csv", "ndjson", "parquet"] = "csv", since: Optional[str] = None):
+    """Stream every stored calculation (optionally only those at or after `since`); admin only"""
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow on the server")
+    return StreamingResponse(
+        export_stream(CALCULATIONS_DB_PATH, format, since=since),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="calculations.{format}"'},
+    )
+
+@app.get("/api/calculations/{calculation_id}", response_model=ROICalculationResponse)
+async def get_calculation(calculation_id: str):
+    """Retrieve a stored analysis by its calculation_id"""
+    if calculation_store is None:
+        raise HTTPException(status_code=503, detail="Calculation history not available")
+    record = await run_in_threadpool(calculation_store.get, calculation_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Calculation not found")
+    return record
+
+async def _render_report(calculation_id: str, report_format: str) -> str:
+    """Render a stored calculation's report in the pool and cache it; returns the file path"""
+    if calculation_store is None:
+        raise HTTPException(status_code=503, detail="Calculation history not available")
+    record = await run_in_threadpool(calculation_store.get, calculation_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Calculation not found")
+    started = time.perf_counter()
+    data = await asyncio.wrap_future(report_pool.submit(render_report, record, report_format))
+    STAGE_SECONDS.observe("report_render", value=time.perf_counter() - started)
+    return await run_in_threadpool(report_cache.put, calculation_id, report_format, data)
+
+@app.get("/api/calculations/{calculation_id}/report")
+async def get_calculation_report(calculation_id: str, request: Request,
+                                 format: Literal["pdf", "html"] = "pdf"):
+    """Download the analysis as a PDF or standalone HTML report (rendered once, then served from disk)"""
+    if report_cache is None:
+        raise HTTPException(status_code=503, detail="Reports not available")
+    if not CALCULATION_ID.match(calculation_id):
+        raise HTTPException(status_code=404, detail="Calculation not found")
+    path = await run_in_threadpool(report_cache.get, calculation_id, format)
+    # Only a cached report proves the calculation exists; otherwise look it up before revalidating
+    if path is None:
+        if calculation_store is None:
+            raise HTTPException(status_code=503, detail="Calculation history not available")
+        if await run_in_threadpool(calculation_store.get, calculation_id) is None:
+            raise HTTPException(status_code=404, detail="Calculation not found")
+    # Calculations are immutable: the ETag only changes with the template version
+    etag = report_cache.etag(calculation_id, format)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if path is None:
+        key = (calculation_id, format)
+        render = report_renders.get(key)
+        if render is None:
+            render = report_renders[key] = asyncio.ensure_future(_render_report(calculation_id, format))
+            render.add_done_callback(lambda _: report_renders.pop(key, None))
+        # A disconnecting client must not cancel the render other downloads wait for
+        path = await asyncio.shield(render)
+    return FileResponse(path, media_type=CONTENT_TYPES[format], headers=headers,
+                        filename=f"analisis-roi-{calculation_id}.{format}")
+
+@app.get("/api/calculations", response_model=ROICalculationPage, dependencies=[Depends(require_admin)])
+async def list_calculations(email: str, limit: int = Query(20, ge=1, le=200), cursor: Optional[str] = None):
+    """Stored analyses for one email, newest first; admin only"""
+    if calculation_store is None:
+        raise HTTPException(status_code=503, detail="Calculation history not available")
+    try:
+        items, next_cursor = await run_in_threadpool(calculation_store.list_by_email, email, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/api/calculate-roi/cache")
+async def calculate_roi_cache_stats():
+    """Hit/miss counters of the memoized calculation core"""
+    return roi_cache_stats()
+
+@app.post("/api/calculate-roi/batch", response_model=ROIBatchResponse)
+async def calculate_roi_batch_endpoint(batch_request: ROIBatchRequest, background_tasks: BackgroundTasks,
+                                       http_request: Request):
+    if len(batch_request.rows) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Batch has {len(batch_request.rows)} rows (max {BATCH_MAX_ROWS})")
+    # Emailed batches are real leads and count one token per row against the client; others one per request
+    admit(http_request, cost=len(batch_request.rows) if batch_request.send_emails else 1.0)
+    resolve_plan_prices(batch_request.rows)
+    try:
+        batch = calculate_roi_batch(batch_request.rows)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Calculation error: {str(e)}")
+    # Zero total investment: the single endpoint answers 400 (division by zero), so does the batch
+    undefined = [index for index, value in enumerate(batch["columns"]["roi_percentage"])
+                 if value is None or not math.isfinite(value)]
+    if undefined:
+        ERRORS.inc("calculation")
+        raise HTTPException(status_code=400, detail=f"Calculation error: zero total investment in rows {undefined[:20]}")
+
+    # Rows submitted for emailing are real leads: store them like single calculations
+    if batch_request.send_emails:
+        for index, request in enumerate(batch_request.rows):
+            roi_data = _batch_row_email_data(request, batch, index)
+            store_calculation(roi_data)
+            background_tasks.add_task(
+                send_roi_analysis_email,
+                request.user_email,
+                roi_data,
+                "hola@efficiency.io"
+            )
+
+    # Columns are already plain lists; skip response_model re-validation
+    return JSONResponse(content=batch)
+
+def _numeric_base(overrides: Dict[str, Optional[float]]) -> Dict[str, float]:
+    """ROICalculationRequest numeric defaults with overrides applied (missing optionals as NaN).
+
+    Raises 400 for a null override of a field that is not optional.
+    """
+    required = sorted(name for name, value in overrides.items() if value is None and name not in OPTIONAL_INPUT_FIELDS)
+    if required:
+        raise HTTPException(status_code=400, detail=f"Fields cannot be null: {', '.join(required)}")
+    base = {name: ROICalculationRequest.model_fields[name].default for name in NUMERIC_FIELDS}
+    base.update(overrides)
+    return {name: (float('nan') if value is None else value) for name, value in base.items()}
+
+@app.post("/api/calculate-roi/sweep")
+async def calculate_roi_sweep(sweep_request: ROISweepRequest):
+    """Stream ROI results over a grid of inputs as NDJSON, one row per grid point"""
+    from sweep import axis_values, grid_size, iter_sweep_ndjson
+    from vectorized import RESULT_FIELDS
+
+    unknown = [name for name in list(sweep_request.base) + list(sweep_request.ranges) if name not in NUMERIC_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown numeric fields: {', '.join(unknown)}")
+    outputs = sweep_request.outputs or list(RESULT_FIELDS)
+    unknown = [name for name in outputs if name not in RESULT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown output fields: {', '.join(unknown)}")
+    if not sweep_request.ranges:
+        raise HTTPException(status_code=400, detail="At least one range is required")
+
+    try:
+        axes = {name: axis_values(**sweep_range.dict()) for name, sweep_range in sweep_request.ranges.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid range: {str(e)}")
+    points = grid_size(axes)
+    if points > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Sweep has {points} points (max {SWEEP_MAX_POINTS})")
+
+    fx = fx_rates.quote()
+    return StreamingResponse(
+        iter_sweep_ndjson(_numeric_base(sweep_request.base), axes, outputs, usd_to_ars=fx.rate),
+        media_type="application/x-ndjson",
+        headers={"X-Sweep-Points": str(points), "X-USD-ARS-Rate": str(fx.rate), "X-USD-ARS-Rate-As-Of": fx.as_of},
+    )
+
+@app.post("/api/calculate-roi/simulate")
+async def calculate_roi_simulation(simulation_request: ROISimulationRequest):
+    """Monte Carlo ROI: percentiles of savings, ROI and revenue under uncertain inputs"""
+    from simulation import new_seed, run_simulation
+
+    unknown = [
+        name for name in list(simulation_request.base) + list(simulation_request.distributions)
+        if name not in NUMERIC_FIELDS
+    ]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown numeric fields: {', '.join(unknown)}")
+    if not 0 < simulation_request.draws <= SIMULATION_MAX_DRAWS:
+        raise HTTPException(status_code=400, detail=f"draws must be between 1 and {SIMULATION_MAX_DRAWS}")
+    if any(not 0 <= p <= 100 for p in simulation_request.percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+
+    seed = simulation_request.seed if simulation_request.seed is not None else new_seed()
+    distributions = {
+        name: spec.dict(exclude_none=True) for name, spec in simulation_request.distributions.items()
+    }
+    fx = fx_rates.quote()
+    try:
+        result = await run_in_threadpool(
+            run_simulation,
+            _numeric_base(simulation_request.base),
+            distributions,
+            simulation_request.draws,
+            seed,
+            simulation_request.percentiles,
+            get_simulation_pool(),
+            fx.rate,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid distribution: {str(e)}")
+    result["usd_to_ars_rate"] = fx.rate
+    result["usd_to_ars_rate_as_of"] = fx.as_of
+    return result
+
+@app.post("/api/calculate-roi/projection")
+async def calculate_roi_projection(projection_request: ROIProjectionRequest):
+    """Monthly cash flow, cumulative net position and break-even month for one or many scenarios"""
+    from projection import MAX_MONTHS, MIN_MONTHS, project_cash_flow_columns, ramp_fractions
+    from vectorized import column_to_list, rows_to_columns
+
+    unknown = sorted({
+        name for overrides in [projection_request.base, *projection_request.rows]
+        for name in overrides if name not in NUMERIC_FIELDS
+    })
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown numeric fields: {', '.join(unknown)}")
+    months = projection_request.months
+    if not MIN_MONTHS <= months <= MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"months must be between {MIN_MONTHS} and {MAX_MONTHS}")
+    if not projection_request.rows:
+        raise HTTPException(status_code=400, detail="At least one row is required")
+    if len(projection_request.rows) * months > PROJECTION_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Projection exceeds {PROJECTION_MAX_CELLS} scenario-months")
+    try:
+        ramp = ramp_fractions(months, projection_request.ramp_up_months, projection_request.ramp_up)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid ramp-up: {str(e)}")
+
+    scenarios = [_numeric_base({**projection_request.base, **overrides}) for overrides in projection_request.rows]
+    fx = fx_rates.quote()
+    result = await run_in_threadpool(project_cash_flow_columns, rows_to_columns(scenarios), ramp, fx.rate)
+    columns = {name: values.tolist() for name, values in result.items()}
+    # 0 marks "not within the horizon"
+    columns["break_even_month"] = [month or None for month in columns["break_even_month"]]
+    columns["payback_months"] = column_to_list(result["payback_months"])
+    return JSONResponse(content={
+        "count": len(scenarios),
+        "months": months,
+        "ramp_up": [round(fraction * 100, 2) for fraction in ramp.tolist()],
+        "usd_to_ars_rate": fx.rate,
+        "usd_to_ars_rate_as_of": fx.as_of,
+        "columns": columns,
+    })
+
+@app.post("/api/calculate-roi/solve")
+async def calculate_roi_solve(solve_request: ROISolveRequest):
+    """Goal seek: the value of `variable` that brings `target_metric` to `target`, for one or many clients"""
+    from projection import MAX_MONTHS
+    from solver import solve
+    from vectorized import rows_to_columns
+
+    unknown = sorted({
+        name for overrides in [solve_request.base, *solve_request.rows]
+        for name in overrides if name not in NUMERIC_FIELDS
+    })
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown numeric fields: {', '.join(unknown)}")
+    if not solve_request.rows:
+        raise HTTPException(status_code=400, detail="At least one row is required")
+    if len(solve_request.rows) * MAX_MONTHS > PROJECTION_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"Too many rows (max {PROJECTION_MAX_CELLS // MAX_MONTHS})")
+
+    scenarios = [_numeric_base({**solve_request.base, **overrides}) for overrides in solve_request.rows]
+    fx = fx_rates.quote()
+    try:
+        result, method = await run_in_threadpool(
+            solve, rows_to_columns(scenarios), solve_request.target_metric, solve_request.target,
+            solve_request.variable, solve_request.lower, solve_request.upper, fx.rate, solve_request.ramp_up_months,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot solve: {str(e)}")
+    return JSONResponse(content={
+        "count": len(scenarios),
+        "target_metric": solve_request.target_metric,
+        "target": solve_request.target,
+        "variable": solve_request.variable,
+        "method": method,
+        "usd_to_ars_rate": fx.rate,
+        "usd_to_ars_rate_as_of": fx.as_of,
+        "columns": {
+            # None where no value within the bounds reaches the target
+            "value": [value if feasible else None for value, feasible in
+                      zip(result["value"].tolist(), result["feasible"].tolist())],
+            # The solution ignoring the bounds (e.g. an automation percentage above 100)
+            "unbounded_value": [value if math.isfinite(value) else None for value in result["value"].tolist()],
+            "is_minimum": result["is_minimum"].tolist(),
+        },
+    })
+
+@app.on_event("startup")
+async def open_calculation_store():
+    global calculation_store
+    calculation_store = CalculationStore(CALCULATIONS_DB_PATH)
+
+@app.on_event("shutdown")
+async def close_calculation_store():
+    global calculation_store
+    if calculation_store is not None:
+        calculation_store.close()
+        calculation_store = None
+
+@app.on_event("startup")
+async def start_report_pool():
+    """Open the report cache and start the render workers, warming each one up front"""
+    global report_pool, report_cache
+    report_cache = ReportCache(REPORT_CACHE_DIR, int(REPORT_CACHE_MAX_MB * 1024 * 1024))
+    report_pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=POOL_CONTEXT)
+    # One warm-up task per worker makes the pool spawn all of them now rather than on first download
+    pids = await asyncio.gather(*(asyncio.wrap_future(report_pool.submit(warm_up)) for _ in range(REPORT_WORKERS)))
+    print(f"Report pool ready ({len(set(pids))} workers, template version {report_cache.version})")
+
+@app.on_event("shutdown")
+async def stop_report_pool():
+    global report_pool, report_cache
+    if report_pool is not None:
+        report_pool.shutdown(wait=False, cancel_futures=True)
+    report_pool = report_cache = None
+
+@app.on_event("startup")
+async def start_analytics():
+    global analytics
+    analytics = CalculationAnalytics(ANALYTICS_DB_PATH, snapshot_interval=ANALYTICS_SNAPSHOT_SECONDS)
+    await analytics.start()
+
+@app.on_event("shutdown")
+async def stop_analytics():
+    global analytics
+    if analytics is not None:
+        await analytics.stop()
+        analytics = None
+
+@app.get("/api/analytics")
+async def calculation_analytics(since: Optional[str] = None, until: Optional[str] = None,
+                                group_by: Literal["day", "plan", "day_plan"] = "day"):
+    """ROI median/p90/mean, projected savings and plan mix of stored calculations, by day and/or plan.
+
+    `since`/`until` are inclusive YYYY-MM-DD days. Served from incrementally
+    maintained aggregates, so the cost depends on the number of day/plan
+    buckets rather than on the number of calculations.
+    """
+    if analytics is None:
+        raise HTTPException(status_code=503, detail="Analytics not available")
+    for name, value in (("since", since), ("until", until)):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{name} must be a YYYY-MM-DD date")
+    return await run_in_threadpool(analytics.report, since, until, group_by)
+
+@app.on_event("startup")
+async def start_fx_rates():
+    quote = await fx_rates.start()
+    print(f"USD/ARS rate {quote.rate} ({quote.source}, as of {quote.as_of})")
+
+@app.get("/api/fx-rate")
+async def fx_rate():
+    """Exchange rate currently applied to license costs, and refresh status"""
+    return fx_rates.stats()
+
+@app.on_event("startup")
+async def start_email_dispatcher():
+    global email_dispatcher, email_outbox, outbox_drainer, admin_digest
+    email_dispatcher = dispatcher_from_env()
+    if email_dispatcher is not None:
+        email_outbox = EmailOutbox(EMAIL_OUTBOX_PATH, max_attempts=int(os.getenv('EMAIL_MAX_ATTEMPTS', '5')))
+        outbox_drainer = OutboxDrainer(email_outbox, email_dispatcher)
+        if ADMIN_EMAIL_MODE == 'digest':
+            # Built before anything starts: a non-positive ADMIN_DIGEST_MAX_MINUTES fails startup
+            admin_digest = AdminDigest(
+                email_outbox, "hola@efficiency.io",
+                max_leads=int(os.getenv('ADMIN_DIGEST_MAX_LEADS', '50')),
+                max_age=float(os.getenv('ADMIN_DIGEST_MAX_MINUTES', '15')) * 60,
+            )
+        await outbox_drainer.start()
+        if admin_digest is not None:
+            await admin_digest.start()
+        await admission.start_backlog_sampler(email_outbox.backlog)
+
+@app.on_event("shutdown")
+async def stop_email_dispatcher():
+    global email_dispatcher, email_outbox, outbox_drainer, admin_digest
+    await admission.stop_backlog_sampler()
+    if admin_digest is not None:
+        await admin_digest.stop()
+    if outbox_drainer is not None:
+        await outbox_drainer.stop()
+    if email_dispatcher is not None:
+        await email_dispatcher.stop()
+    if email_outbox is not None:
+        email_outbox.close()
+    email_dispatcher = email_outbox = outbox_drainer = admin_digest = None
+
+@app.get("/api/email/stats")
+async def email_stats():
+    """Outbox row counts, delivery counters and send latency"""
+    if email_dispatcher is None:
+        return {"enabled": False}
+    outbox = await run_in_threadpool(email_outbox.stats)
+    stats = {"enabled": True, "outbox": outbox, **email_dispatcher.stats()}
+    if admin_digest is not None:
+        stats["admin_digest"] = await run_in_threadpool(admin_digest.stats)
+    return stats
+
+REGISTRY.gauge(
+    "roi_memo_cache", "compute_roi memo cache counters",
+    lambda: {(stat,): value for stat, value in roi_cache_stats().items()}, ("stat",),
+)
+REGISTRY.gauge(
+    "roi_submission_cache", "Idempotency/dedup cache entries and evictions",
+    lambda: {(name,): value for name, value in submissions.stats().items()}, ("stat",),
+)
+REGISTRY.gauge(
+    "report_cache", "Report disk cache size, hits, misses and evictions",
+    lambda: {(stat,): value for stat, value in report_cache.stats().items() if stat != "template_version"}
+    if report_cache is not None else None, ("stat",),
+)
+REGISTRY.gauge("http_requests_in_flight", "Requests in progress, including background tasks", lambda: admission.in_flight)
+REGISTRY.gauge("email_backlog", "Undelivered outbox rows (sampled)", lambda: admission.email_backlog)
+REGISTRY.gauge(
+    "rate_limit_tracked_keys", "Token buckets currently held",
+    lambda: dict(zip([("ip",), ("email",)], admission.tracked_keys())), ("key",),
+)
+REGISTRY.gauge(
+    "email_in_flight", "Messages in SendGrid requests currently in progress",
+    lambda: email_dispatcher.in_flight if email_dispatcher is not None else None,
+)
+
+@app.get("/api/metrics")
+async def metrics():
+    """Prometheus text exposition of request, stage-latency and error metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "message": "ROI Calculator API is running"}
 
 @app.get("/api/bitrix24-plans")
-async def get_bitrix24_plans():
+async def get_bitrix24_plans(request: Request):
     """Get available Bitrix24 plans with pricing"""
-    return {
-        "plans": [
-            {"name": "Basic Plan", "monthly_price_usd": 49, "description": "Essential CRM features for small teams"},
-            {"name": "Standard Plan", "monthly_price_usd": 99, "description": "Advanced automation and reporting", "default": True},
-            {"name": "Professional Plan", "monthly_price_usd": 199, "description": "Complete business solution with integrations"},
-            {"name": "Enterprise Plan", "monthly_price_usd": 399, "description": "Full-scale enterprise solution with premium support"}
-        ]
-    }
+    catalog = plan_catalog.current()
+    headers = {"ETag": catalog.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), catalog.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,166 @@
+"""Monte Carlo simulation of the ROI formula with uncertain inputs."""
+from concurrent.futures import Executor
+import math
+from typing import List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from calculations import USD_TO_ARS
+from vectorized import NUMERIC_FIELDS, compute_roi_columns
+
+# Draws per shard. Shards (not workers) own the random streams, so a seed
+# reproduces the same result whatever the pool size.
+SHARD_SIZE = 250000
+
+# Simulated result metrics
+SIMULATED_METRICS = ("roi_percentage", "total_annual_savings", "additional_annual_revenue")
+
+# Probability grid each shard reports its quantiles on (0.0, 0.1, ..., 100.0)
+QUANTILE_GRID = np.linspace(0, 100, 1001)
+
+DISTRIBUTIONS = ("uniform", "triangular", "normal")
+
+# Truncated normals are drawn by rejection; a low-high window holding less
+# than this share of the distribution would take too many draws
+MIN_TRUNCATED_MASS = 0.01
+
+
+def normal_mass(spec: Mapping) -> float:
+    """Probability that the (untruncated) normal of a spec falls within its low-high window"""
+    mean, std = spec["mean"], spec["std"]
+    low = -math.inf if spec.get("low") is None else spec["low"]
+    high = math.inf if spec.get("high") is None else spec["high"]
+    if std == 0:
+        return float(low <= mean <= high)
+    return 0.5 * (math.erf((high - mean) / (std * math.sqrt(2))) - math.erf((low - mean) / (std * math.sqrt(2))))
+
+
+def validate_distribution(spec: Mapping) -> None:
+    """Raise ValueError if a distribution spec is missing parameters or is inconsistent"""
+    kind = spec.get("distribution")
+    if kind == "uniform":
+        if spec.get("low") is None or spec.get("high") is None or spec["low"] > spec["high"]:
+            raise ValueError("uniform needs low <= high")
+    elif kind == "triangular":
+        low, mode, high = spec.get("low"), spec.get("mode"), spec.get("high")
+        if low is None or mode is None or high is None or not low <= mode <= high or low == high:
+            raise ValueError("triangular needs low <= mode <= high and low < high")
+    elif kind == "normal":
+        if spec.get("mean") is None or spec.get("std") is None or spec["std"] < 0:
+            raise ValueError("normal needs mean and std >= 0")
+        if normal_mass(spec) < MIN_TRUNCATED_MASS:
+            raise ValueError(f"normal low/high must keep at least {MIN_TRUNCATED_MASS:.0%} of the distribution")
+    else:
+        raise ValueError(f"distribution must be one of {', '.join(DISTRIBUTIONS)}")
+
+
+def sample(spec: Mapping, rng: np.random.Generator, size: int) -> np.ndarray:
+    """Draw `size` values from a distribution spec"""
+    kind = spec["distribution"]
+    if kind == "uniform":
+        values = rng.uniform(spec["low"], spec["high"], size)
+    elif kind == "triangular":
+        values = rng.triangular(spec["low"], spec["mode"], spec["high"], size)
+    else:
+        values = rng.normal(spec["mean"], spec["std"], size)
+        # Optional truncation, e.g. to keep percentages within 0-100: out-of-range
+        # draws are redrawn (clipping would pile their mass up on the bounds)
+        if spec.get("low") is not None or spec.get("high") is not None:
+            low = -np.inf if spec.get("low") is None else spec["low"]
+            high = np.inf if spec.get("high") is None else spec["high"]
+            mass = normal_mass(spec)
+            outside = np.flatnonzero((values < low) | (values > high))
+            while outside.size:
+                # Enough candidates to replace them all in one round, usually
+                draws = rng.normal(spec["mean"], spec["std"], int(outside.size / mass * 1.1) + 16)
+                draws = draws[(draws >= low) & (draws <= high)][:outside.size]
+                values[outside[:draws.size]] = draws
+                outside = outside[draws.size:]
+    return values
+
+
+def simulate_shard(base: Mapping[str, float], distributions: Mapping[str, Mapping], size: int,
+                   seed: np.random.SeedSequence, usd_to_ars: float = USD_TO_ARS) -> dict:
+    """Run one shard of draws and summarize it (runs in a worker process)"""
+    rng = np.random.default_rng(seed)
+    columns = {name: np.asarray(base[name], dtype=np.float64) for name in NUMERIC_FIELDS if name in base}
+    for name, spec in distributions.items():
+        columns[name] = sample(spec, rng, size)
+    columns = {name: np.broadcast_to(values, (size,)) for name, values in columns.items()}
+    results = compute_roi_columns(columns, usd_to_ars)
+
+    summary = {"size": size, "roi_positive": int(np.count_nonzero(results["roi_percentage"] > 0)), "metrics": {}}
+    for metric in SIMULATED_METRICS:
+        values = results[metric]
+        # NaN (no revenue inputs) and +-inf (zero total investment) have no percentile; leave them out
+        values = values[np.isfinite(values)]
+        summary["metrics"][metric] = {
+            "count": int(values.size),
+            "sum": float(values.sum()),
+            "quantiles": np.percentile(values, QUANTILE_GRID) if values.size else None,
+        }
+    return summary
+
+
+def merge_shards(shards: Sequence[dict], percentiles: Sequence[float]) -> dict:
+    """Combine shard summaries into percentiles, means and P(ROI > 0).
+
+    Percentiles average the shards' quantile functions weighted by shard
+    size; with equally sized shards of i.i.d. draws this converges to the
+    pooled percentile and avoids shipping raw draws between processes.
+    """
+    draws = sum(shard["size"] for shard in shards)
+    metrics = {}
+    for metric in SIMULATED_METRICS:
+        parts = [shard["metrics"][metric] for shard in shards if shard["metrics"][metric]["count"]]
+        count = sum(part["count"] for part in parts)
+        if not count:
+            metrics[metric] = None
+            continue
+        weights = np.array([part["count"] for part in parts], dtype=np.float64) / count
+        quantiles = np.tensordot(weights, np.vstack([part["quantiles"] for part in parts]), axes=1)
+        values = np.interp(percentiles, QUANTILE_GRID, quantiles)
+        metrics[metric] = {
+            # Draws with a finite value, the ones summarized here
+            "draws": count,
+            "mean": round(sum(part["sum"] for part in parts) / count, 2),
+            "percentiles": {f"p{p:g}": round(float(value), 2) for p, value in zip(percentiles, values)},
+        }
+    roi_positive = sum(shard["roi_positive"] for shard in shards)
+    return {
+        "draws": draws,
+        "probability_roi_positive": round(roi_positive / draws, 6) if draws else None,
+        "metrics": metrics,
+    }
+
+
+def shard_sizes(draws: int, shard_size: int = SHARD_SIZE) -> List[int]:
+    full, rest = divmod(draws, shard_size)
+    return [shard_size] * full + ([rest] if rest else [])
+
+
+def run_simulation(base: Mapping[str, float], distributions: Mapping[str, Mapping], draws: int, seed: int,
+                   percentiles: Sequence[float] = (5, 25, 50, 75, 95), executor: Optional[Executor] = None,
+                   usd_to_ars: float = USD_TO_ARS) -> dict:
+    """Simulate `draws` scenarios, sharded across `executor` (or in-process when None)"""
+    for spec in distributions.values():
+        validate_distribution(spec)
+    sizes = shard_sizes(draws)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    distributions = {name: dict(spec) for name, spec in distributions.items()}
+    base = dict(base)
+    if executor is None:
+        shards = [simulate_shard(base, distributions, size, shard_seed, usd_to_ars)
+                  for size, shard_seed in zip(sizes, seeds)]
+    else:
+        futures = [executor.submit(simulate_shard, base, distributions, size, shard_seed, usd_to_ars)
+                   for size, shard_seed in zip(sizes, seeds)]
+        shards = [future.result() for future in futures]
+    result = merge_shards(shards, percentiles)
+    result["seed"] = seed
+    return result
+
+
+def new_seed() -> int:
+    """A fresh random seed, returned to the client so the run can be reproduced"""
+    return int(np.random.SeedSequence().entropy % (2 ** 63))
@@ -0,0 +1,143 @@
+"""Goal seek: the value of one input that brings a result metric to a target, for many clients at once."""
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculations import USD_TO_ARS
+from projection import MAX_MONTHS, project_cash_flow_columns, ramp_fractions
+from vectorized import compute_roi_columns
+
+# Target metrics: +1 where higher is better, -1 where lower is better
+METRICS = {"roi_percentage": 1, "total_annual_savings": 1, "payback_months": -1}
+
+# Annual savings are affine in each of these (the others held fixed) ...
+SAVINGS_VARIABLES = (
+    "monthly_inquiries", "automation_percentage", "minutes_per_inquiry", "monthly_crm_hours",
+    "crm_automation_percentage", "team_members", "hourly_cost_ars",
+)
+# ... and the total investment in each of these
+INVESTMENT_VARIABLES = ("monthly_price_usd", "implementation_cost")
+VARIABLES = SAVINGS_VARIABLES + INVESTMENT_VARIABLES
+
+PERCENT_VARIABLES = ("automation_percentage", "crm_automation_percentage")
+# The request model's float inputs (solved to 2 decimals); the rest are whole numbers
+FLOAT_VARIABLES = PERCENT_VARIABLES
+
+DEFAULT_UPPER = 1e9
+
+
+def default_bounds(variable: str) -> Tuple[float, float]:
+    return (0.0, 100.0) if variable in PERCENT_VARIABLES else (0.0, DEFAULT_UPPER)
+
+
+def _closed_form(columns: Mapping[str, np.ndarray], metric: str, target: float, variable: str,
+                 lower: float, upper: float, usd_to_ars: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact inversion of the (affine in `variable`) savings or investment; returns values and d(metric)/dx signs.
+
+    Where the target is already met at both bounds (the root lies beyond
+    the bound the metric gets worse towards), the better bound is returned,
+    as _bisect does.
+    """
+    size = len(columns[variable])
+    at_zero = compute_roi_columns({**columns, variable: np.zeros(size)}, usd_to_ars, rounded=False)
+    at_one = compute_roi_columns({**columns, variable: np.ones(size)}, usd_to_ars, rounded=False)
+    savings, investment = at_zero["total_annual_savings"], at_zero["total_investment"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if variable in SAVINGS_VARIABLES:
+            slope = at_one["total_annual_savings"] - savings
+            # ROI = (S - I) / I, with I fixed: the savings needed are I * (1 + ROI)
+            needed = target if metric == "total_annual_savings" else investment * (1 + target / 100)
+            value, sign = (needed - savings) / slope, np.sign(slope)
+        else:
+            slope = at_one["total_investment"] - investment
+            # ROI falls as the investment grows: the largest investment allowed is S / (1 + ROI)
+            needed = savings / (1 + target / 100)
+            value, sign = (needed - investment) / slope, -np.sign(slope) * np.sign(savings)
+    improves = sign * METRICS[metric]
+    # Met throughout: the least that is needed, or the most that is allowed
+    value = np.where((improves > 0) & (value < lower), lower, value)
+    value = np.where((improves < 0) & (value > upper), upper, value)
+    return value, sign
+
+
+def _bisect(columns: Mapping[str, np.ndarray], target: float, variable: str, lower: float, upper: float,
+            ramp: np.ndarray, usd_to_ars: float, tolerance: float, max_iterations: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized bisection of payback_months - target on [lower, upper]; returns values and d(metric)/dx signs.
+
+    Every client is bracketed and halved in the same array operation. A
+    payback beyond the projection horizon counts as +inf. Where both ends
+    already meet the target the better end is returned; where neither
+    does, NaN.
+    """
+    size = len(columns[variable])
+
+    def excess(x: np.ndarray) -> np.ndarray:
+        payback = project_cash_flow_columns({**columns, variable: x}, ramp, usd_to_ars, rounded=False)
+        payback = payback["payback_months"]
+        return np.where(np.isnan(payback), np.inf, payback) - target
+
+    lo, hi = np.full(size, lower), np.full(size, upper)
+    excess_lo, excess_hi = excess(lo), excess(hi)
+    met_lo, met_hi = excess_lo <= 0, excess_hi <= 0
+    bracketed = met_lo != met_hi
+    increasing = excess_hi > excess_lo
+    for _ in range(max_iterations):
+        if not (hi - lo > tolerance * np.maximum(1.0, np.abs(hi))).any():
+            break
+        mid = (lo + hi) / 2
+        met_mid = excess(mid) <= 0
+        # Keep the half whose ends still disagree
+        move_lo = met_mid == met_lo
+        lo = np.where(move_lo, mid, lo)
+        hi = np.where(move_lo, hi, mid)
+    # The end of the final bracket that meets the target
+    value = np.where(bracketed, np.where(met_hi, hi, lo), np.nan)
+    # Met throughout: the most that is allowed, or the least that is needed
+    value = np.where(met_lo & met_hi, np.where(increasing, upper, lower), value)
+    return value, np.where(increasing, 1.0, -1.0)
+
+
+def solve(columns: Mapping[str, Sequence], metric: str, target: float, variable: str,
+          lower: Optional[float] = None, upper: Optional[float] = None, usd_to_ars: float = USD_TO_ARS,
+          ramp_up_months: int = 0, tolerance: float = 1e-9, max_iterations: int = 200) -> Tuple[Dict[str, np.ndarray], str]:
+    """Value of `variable` at which `metric` reaches `target`, for every client (row) of `columns`.
+
+    ROI and annual savings are affine in the savings inputs and ROI is a
+    simple function of the investment inputs, so those are inverted in
+    closed form. Payback (break-even of a MAX_MONTHS projection, optionally
+    ramped) is piecewise and found with a vectorized bisection over
+    [lower, upper]. Returns the columns `value` (rounded up for a minimum,
+    down for a maximum; whole numbers for integer inputs), `feasible`
+    (found and within the bounds) and `is_minimum` (True: at least this
+    value is needed; False: at most this value is allowed), plus the method.
+    Raises ValueError for unsupported combinations.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r} (expected one of {', '.join(METRICS)})")
+    if variable not in VARIABLES:
+        raise ValueError(f"cannot solve for {variable!r} (expected one of {', '.join(VARIABLES)})")
+    if metric == "total_annual_savings" and variable in INVESTMENT_VARIABLES:
+        raise ValueError(f"total_annual_savings does not depend on {variable}")
+    if metric == "roi_percentage" and target <= -100:
+        raise ValueError("target roi_percentage must be above -100")
+    default_lower, default_upper = default_bounds(variable)
+    lower = default_lower if lower is None else lower
+    upper = default_upper if upper is None else upper
+    if lower >= upper:
+        raise ValueError("lower bound must be below the upper bound")
+
+    columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+    if metric == "payback_months":
+        ramp = ramp_fractions(MAX_MONTHS, ramp_up_months)
+        value, slope = _bisect(columns, target, variable, lower, upper, ramp, usd_to_ars, tolerance, max_iterations)
+        method = "bisection"
+    else:
+        value, slope = _closed_form(columns, metric, target, variable, lower, upper, usd_to_ars)
+        method = "closed_form"
+
+    is_minimum = slope * METRICS[metric] > 0
+    scale = 100.0 if variable in FLOAT_VARIABLES else 1.0
+    # Round toward meeting the target; the epsilon absorbs float noise on exact solutions
+    value = np.where(is_minimum, np.ceil(value * scale - 1e-6), np.floor(value * scale + 1e-6)) / scale
+    feasible = np.isfinite(value) & (value >= lower) & (value <= upper)
+    return {"value": value, "feasible": feasible, "is_minimum": is_minimum}, method
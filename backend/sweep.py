@@ -0,0 +1,65 @@
+"""Parameter sweeps of the ROI formula over a Cartesian grid of inputs."""
+import json
+import math
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from calculations import USD_TO_ARS
+from vectorized import NUMERIC_FIELDS, RESULT_FIELDS, compute_roi_columns
+
+# Grid points evaluated per vectorized chunk; bounds memory regardless of grid size
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def axis_values(start: Optional[float] = None, stop: Optional[float] = None, steps: Optional[int] = None,
+                values: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Values of one sweep axis: explicit values, or `steps` evenly spaced points from start to stop"""
+    if values is not None:
+        return np.asarray(values, dtype=np.float64)
+    if start is None or stop is None or not steps:
+        raise ValueError("a sweep range needs either values or start, stop and steps")
+    return np.linspace(start, stop, steps)
+
+
+def grid_size(axes: Mapping[str, np.ndarray]) -> int:
+    return math.prod(len(values) for values in axes.values())
+
+
+def iter_grid_chunks(base: Mapping[str, float], axes: Mapping[str, np.ndarray],
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield input columns for consecutive slices of the flattened grid.
+
+    Only the current slice is materialized: grid coordinates are recovered
+    from the flat point index, so memory stays flat for any grid size.
+    """
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+    total = grid_size(axes)
+    for start in range(0, total, chunk_size):
+        flat_index = np.arange(start, min(start + chunk_size, total))
+        coordinates = np.unravel_index(flat_index, shape)
+        columns = {name: np.asarray(base[name], dtype=np.float64) for name in NUMERIC_FIELDS if name in base}
+        for name, index in zip(names, coordinates):
+            columns[name] = axes[name][index]
+        yield columns
+
+
+def iter_sweep_ndjson(base: Mapping[str, float], axes: Mapping[str, np.ndarray],
+                      outputs: Sequence[str] = RESULT_FIELDS,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, usd_to_ars: float = USD_TO_ARS) -> Iterator[bytes]:
+    """Evaluate the grid chunk by chunk and yield NDJSON lines (one encoded chunk at a time)"""
+    names = list(axes)
+    for columns in iter_grid_chunks(base, axes, chunk_size):
+        results = compute_roi_columns(columns, usd_to_ars)
+        keys: List[str] = names + list(outputs)
+        values = [columns[name].tolist() for name in names] + [results[name].tolist() for name in outputs]
+        lines = []
+        for row in zip(*values):
+            # NaN marks "not applicable" (e.g. no additional revenue) and zero investment gives an
+            # infinite ROI; emit null for both, since JSON has no NaN or Infinity
+            lines.append(json.dumps(
+                {key: (value if math.isfinite(value) else None) for key, value in zip(keys, row)},
+                separators=(",", ":"), allow_nan=False,
+            ))
+        yield ("\n".join(lines) + "\n").encode()
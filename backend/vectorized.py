@@ -0,0 +1,119 @@
+"""Column-oriented (NumPy) version of the ROI formula used by /api/calculate-roi."""
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from calculations import INPUT_FIELDS, OPTIONAL_INPUT_FIELDS, USD_TO_ARS
+
+# Numeric inputs of ROICalculationRequest, in model order
+NUMERIC_FIELDS = INPUT_FIELDS
+
+# Optional revenue inputs; missing values are carried as NaN
+OPTIONAL_FIELDS = OPTIONAL_INPUT_FIELDS
+
+# Result columns, in ROICalculationResponse order
+RESULT_FIELDS = (
+    "monthly_price_usd",
+    "annual_license_cost_usd",
+    "chatbot_monthly_hours_saved",
+    "chatbot_annual_savings",
+    "crm_annual_hours_saved",
+    "crm_annual_savings",
+    "total_annual_savings",
+    "total_investment",
+    "roi_percentage",
+    "additional_annual_revenue",
+    "total_hours_saved_annually",
+)
+
+
+def rows_to_columns(rows: Iterable) -> Dict[str, np.ndarray]:
+    """Transpose request rows (dicts or models) into float64 input columns"""
+    rows = [row if isinstance(row, Mapping) else vars(row) for row in rows]
+    columns = {}
+    for field in NUMERIC_FIELDS:
+        values = [row.get(field) for row in rows]
+        if field in OPTIONAL_FIELDS:
+            values = [np.nan if value is None else value for value in values]
+        columns[field] = np.asarray(values, dtype=np.float64)
+    return columns
+
+
+def compute_roi_columns(columns: Mapping[str, Sequence], usd_to_ars: float = USD_TO_ARS,
+                        rounded: bool = True) -> Dict[str, np.ndarray]:
+    """Evaluate the calculate_roi formula over whole input columns at once.
+
+    Every input is a 1-D array-like of the same length (scalars broadcast);
+    `usd_to_ars` is the exchange rate applied to the license cost.
+    Rounding and the "no additional revenue" rule (NaN in the output) match
+    the per-request endpoint; `rounded=False` returns exact float64 columns
+    instead (for numerical work on the formula).
+    """
+    col = {field: np.asarray(columns[field], dtype=np.float64) for field in NUMERIC_FIELDS if field in columns}
+    for field in OPTIONAL_FIELDS:
+        col.setdefault(field, np.array(np.nan))
+
+    monthly_price_usd = col["monthly_price_usd"]
+    annual_license_cost_usd = monthly_price_usd * 12
+
+    # Chatbot savings calculations
+    chatbot_monthly_hours_saved = (
+        col["monthly_inquiries"] * (col["automation_percentage"] / 100) * col["minutes_per_inquiry"]
+    ) / 60
+    chatbot_annual_savings = chatbot_monthly_hours_saved * col["hourly_cost_ars"] * 12
+
+    # CRM automation savings calculations
+    crm_annual_hours_saved = (
+        col["monthly_crm_hours"] * (col["crm_automation_percentage"] / 100) * col["team_members"] * 12
+    )
+    crm_annual_savings = crm_annual_hours_saved * col["hourly_cost_ars"]
+
+    # Total calculations
+    total_annual_savings = chatbot_annual_savings + crm_annual_savings
+    total_investment = annual_license_cost_usd * usd_to_ars + col["implementation_cost"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi_percentage = ((total_annual_savings - total_investment) / total_investment) * 100
+
+    # Optional revenue calculation, only where all three inputs are given and non-zero
+    average_ticket = col["average_ticket_ars"]
+    current_rate = col["current_conversion_rate"]
+    expected_rate = col["expected_conversion_rate"]
+    conversion_improvement = (expected_rate - current_rate) / 100
+    additional_annual_revenue = col["monthly_inquiries"] * conversion_improvement * average_ticket * 12
+    has_revenue = (
+        (np.nan_to_num(average_ticket) != 0)
+        & (np.nan_to_num(current_rate) != 0)
+        & (np.nan_to_num(expected_rate) != 0)
+        & (np.nan_to_num(additional_annual_revenue) != 0)
+    )
+    additional_annual_revenue = np.where(has_revenue, additional_annual_revenue, np.nan)
+
+    total_hours_saved_annually = chatbot_monthly_hours_saved * 12 + crm_annual_hours_saved
+
+    size = np.broadcast(*col.values()).shape
+    results = {
+        "monthly_price_usd": monthly_price_usd,
+        "annual_license_cost_usd": annual_license_cost_usd,
+        "chatbot_monthly_hours_saved": chatbot_monthly_hours_saved,
+        "chatbot_annual_savings": chatbot_annual_savings,
+        "crm_annual_hours_saved": crm_annual_hours_saved,
+        "crm_annual_savings": crm_annual_savings,
+        "total_annual_savings": total_annual_savings,
+        "total_investment": total_investment,
+        "roi_percentage": roi_percentage,
+        "additional_annual_revenue": additional_annual_revenue,
+        "total_hours_saved_annually": total_hours_saved_annually,
+    }
+    if rounded:
+        results = {name: np.round(values, 2) for name, values in results.items()}
+        results["monthly_price_usd"] = monthly_price_usd.astype(np.int64)
+        results["annual_license_cost_usd"] = annual_license_cost_usd.astype(np.int64)
+        results["total_investment"] = np.round(total_investment).astype(np.int64)
+    return {name: np.broadcast_to(values, size) for name, values in results.items()}
+
+def column_to_list(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a result column to JSON-ready Python values (NaN -> None)"""
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if value != value else value for value in values.tolist()]
+    return values.tolist()
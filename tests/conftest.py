@@ -0,0 +1,24 @@
+import os
+import sys
+from unittest import mock
+
+# The backend is run from its own directory (uvicorn server:app), so its
+# modules import each other as top-level modules.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+def isolated_server_paths(tmpdir: str):
+    """Patcher pointing the server's databases, email outbox and report cache into tmpdir.
+
+    Use it around a TestClient startup (``with isolated_server_paths(tmp):``,
+    or start() / addCleanup(stop)); reports render in a single worker.
+    """
+    import server
+    return mock.patch.multiple(
+        server,
+        CALCULATIONS_DB_PATH=os.path.join(tmpdir, "calculations.db"),
+        ANALYTICS_DB_PATH=os.path.join(tmpdir, "analytics.db"),
+        EMAIL_OUTBOX_PATH=os.path.join(tmpdir, "email_outbox.db"),
+        REPORT_CACHE_DIR=os.path.join(tmpdir, "reports"),
+        REPORT_WORKERS=1,
+    )
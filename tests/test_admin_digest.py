@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from admin_digest import AdminDigest
+from email_rendering import render_admin_digest
+from outbox import EmailOutbox
+import server
+from tests.test_email_rendering import roi_data
+
+
+class TestAdminDigest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.outbox = EmailOutbox(os.path.join(self.tmp.name, "outbox.db"))
+        self.digest = AdminDigest(self.outbox, "admin@example.com", max_leads=2, max_age=60)
+        # Creates the table; tests then call flush() themselves rather than racing the background loop
+        await self.digest.start()
+        await self.digest.stop()
+
+    async def asyncTearDown(self):
+        await self.digest.stop()
+        self.outbox.close()
+        self.tmp.cleanup()
+
+    async def add(self, n, **overrides):
+        for i in range(n):
+            await self.digest.add(f"lead{i}@example.com", roi_data(**overrides))
+
+    async def test_flushes_after_max_leads(self):
+        await self.add(1)
+        self.assertEqual(await self.digest.flush(), 0)
+        await self.add(2)
+        self.assertEqual(await self.digest.flush(), 3)
+        # Chunked into summaries of at most max_leads rows, moved to the outbox atomically
+        self.assertEqual(self.outbox.stats()["pending"], 2)
+        self.assertEqual(self.digest.stats()["waiting"], 0)
+        self.assertEqual(self.digest.digests_sent, 2)
+
+    async def test_flushes_after_max_age(self):
+        await self.add(1)
+        self.assertEqual(await self.digest.flush(), 0)
+        with mock.patch("admin_digest.time.time", return_value=time.time() + 61):
+            self.assertEqual(await self.digest.flush(), 1)
+        self.assertEqual(self.outbox.stats()["pending"], 1)
+
+    async def test_rejects_non_positive_max_age(self):
+        for max_age in (0, -60, float("nan")):
+            with self.assertRaises(ValueError):
+                AdminDigest(self.outbox, "admin@example.com", max_age=max_age)
+
+    async def test_send_roi_analysis_email_in_digest_mode(self):
+        with mock.patch.multiple(server, email_dispatcher=object(), email_outbox=self.outbox,
+                                 admin_digest=self.digest):
+            await server.send_roi_analysis_email("lead@example.com", roi_data())
+        # Only the lead's own email goes out immediately
+        self.assertEqual(self.outbox.stats()["pending"], 1)
+        self.assertEqual(self.digest.waiting(), 1)
+
+
+class TestDigestRendering(unittest.TestCase):
+
+    def test_table_rows_escaped(self):
+        leads = [
+            {"company_name": "<b>ACME</b>", "user_email": "a@example.com", "roi_percentage": 207.63,
+             "selected_plan": "Standard Plan", "total_annual_savings": 6000000.0, "created_at": 1714564800},
+            {"company_name": None, "user_email": "b@example.com", "roi_percentage": 12.5,
+             "selected_plan": "Basic Plan", "total_annual_savings": 100.0, "created_at": 1714568400},
+        ]
+        subject, html = render_admin_digest(leads)
+        self.assertEqual(subject, "Resumen ROI - 2 nuevas consultas")
+        self.assertIn("&lt;b&gt;ACME&lt;/b&gt;", html)
+        self.assertIn("No especificada", html)
+        self.assertIn("$6,000,000", html)
+        self.assertIn("2024-05-01 12:00 y 2024-05-01 13:00", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
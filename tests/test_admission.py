@@ -0,0 +1,66 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, TokenBucketLimiter
+import server
+from server import app
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill_and_retry_after(self):
+        limiter = TokenBucketLimiter(rate=1.0, burst=2)
+        self.assertEqual(limiter.acquire("a", now=0), 0)
+        self.assertEqual(limiter.acquire("a", now=0), 0)
+        self.assertAlmostEqual(limiter.acquire("a", now=0.25), 0.75)
+        self.assertEqual(limiter.acquire("a", now=1.0), 0)
+        # A cost above the burst is let through once, leaving the bucket in debt
+        self.assertEqual(limiter.acquire("b", cost=5, now=0), 0)
+        self.assertGreater(limiter.acquire("b", now=2), 0)
+
+    def test_memory_bounded_by_lru_eviction(self):
+        limiter = TokenBucketLimiter(rate=1.0, burst=1, max_keys=2)
+        limiter.acquire("a", now=0)
+        limiter.acquire("b", now=0)
+        limiter.acquire("a", now=0)
+        limiter.acquire("c", now=0)
+        self.assertEqual(list(limiter.buckets), ["a", "c"])
+        self.assertEqual(limiter.evictions, 1)
+
+    def test_load_shedding(self):
+        controller = AdmissionController(max_in_flight=2, max_email_backlog=10)
+        self.assertIsNone(controller.check("1.2.3.4"))
+        controller.email_backlog = 11
+        self.assertEqual(controller.check("1.2.3.4").reason, "email_backlog")
+        controller.in_flight = 3
+        self.assertEqual(controller.check("1.2.3.4").status_code, 503)
+
+
+class TestAdmissionEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        for name in ("email_limiter", "max_email_backlog", "email_backlog"):
+            self.addCleanup(setattr, server.admission, name, getattr(server.admission, name))
+
+    def test_email_rate_limited(self):
+        server.admission.email_limiter = TokenBucketLimiter(rate=1 / 60, burst=2)
+        statuses = [
+            self.client.post("/api/calculate-roi", json={"user_email": "flood@example.com", "team_members": n})
+            for n in range(3)
+        ]
+        self.assertEqual([response.status_code for response in statuses], [200, 200, 429])
+        self.assertGreaterEqual(int(statuses[-1].headers["retry-after"]), 1)
+        self.assertIn('roi_rejected_requests_total{reason="rate_limit_email"}', self.client.get("/api/metrics").text)
+
+    def test_backlog_sheds_load(self):
+        server.admission.max_email_backlog = 5
+        server.admission.email_backlog = 6
+        response = self.client.post("/api/calculate-roi", json={"user_email": "shed@example.com"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("retry-after", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from analytics import RELATIVE_ACCURACY, CalculationAnalytics, QuantileSketch
+import server
+from tests.conftest import isolated_server_paths
+
+
+def record(day, plan, roi, savings=1000.0):
+    return {"calculation_date": f"{day}T12:00:00", "selected_plan": plan, "roi_percentage": roi,
+            "total_annual_savings": savings, "total_investment": 500, "total_hours_saved_annually": 10.0}
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(4, 1.5) * rng.choice((1, 1, 1, -1)) for _ in range(20000)] + [0.0] * 500
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = np.quantile(values, q, method="lower")
+            self.assertLessEqual(abs(sketch.quantile(q) - exact), abs(exact) * RELATIVE_ACCURACY * 1.01 + 0.01)
+        self.assertLess(len(sketch.positive) + len(sketch.negative), 2000)
+
+    def test_merge_equals_union(self):
+        first, second, union = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for index in range(1000):
+            value = index * 3.7 - 800
+            (first if index % 3 else second).add(value)
+            union.add(value)
+        first.merge(QuantileSketch.from_json(second.to_json()))
+        self.assertEqual(first.count, union.count)
+        for q in (0, 0.25, 0.5, 0.9, 1):
+            self.assertEqual(first.quantile(q), union.quantile(q))
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+
+class TestCalculationAnalytics(unittest.TestCase):
+
+    def test_workers_merge_through_snapshots(self):
+        async def scenario(path):
+            # Two worker processes sharing one analytics file
+            workers = [CalculationAnalytics(path), CalculationAnalytics(path)]
+            workers[0].record(record("2024-03-01", "Basic Plan", 100))
+            workers[0].record(record("2024-03-01", "Standard Plan", 300))
+            workers[1].record(record("2024-03-01", "Basic Plan", 200))
+            workers[1].record(record("2024-03-02", "Basic Plan", -50))
+            # Unsnapshotted calculations are visible to their own worker only
+            self.assertEqual(workers[0].report()["totals"]["calculations"], 2)
+            for worker in workers:
+                await worker.snapshot()
+            workers[1].record(record("2024-03-02", "Standard Plan", 50))
+            by_day = workers[1].report(group_by="day")
+            by_plan = workers[0].report(since="2024-03-01", until="2024-03-01", group_by="plan")
+            for worker in workers:
+                await worker.stop()
+            return by_day, by_plan
+
+        with tempfile.TemporaryDirectory() as tmp:
+            by_day, by_plan = asyncio.run(scenario(os.path.join(tmp, "analytics.db")))
+            reopened = CalculationAnalytics(os.path.join(tmp, "analytics.db"))
+            totals = reopened.report()["totals"]
+            reopened.writer.close()
+
+        first, second = by_day["buckets"]
+        self.assertEqual((first["day"], first["calculations"]), ("2024-03-01", 3))
+        self.assertAlmostEqual(first["roi_median"], 200, delta=200 * RELATIVE_ACCURACY)
+        self.assertAlmostEqual(first["plan_mix"]["Basic Plan"], 0.6667)
+        self.assertEqual(first["total_annual_savings"], 3000)
+        self.assertEqual((second["day"], second["calculations"]), ("2024-03-02", 2))
+        self.assertEqual(second["roi_mean"], 0)
+        self.assertEqual(by_day["totals"]["calculations"], 5)
+
+        self.assertEqual([(row["plan"], row["calculations"]) for row in by_plan["buckets"]],
+                         [("Basic Plan", 2), ("Standard Plan", 1)])
+        # Everything, including the last worker's delta, was snapshotted at shutdown
+        self.assertEqual(totals["calculations"], 5)
+
+
+class TestAnalyticsEndpoint(unittest.TestCase):
+
+    def test_calculations_show_up(self):
+        with tempfile.TemporaryDirectory() as tmp, isolated_server_paths(tmp):
+            with TestClient(server.app) as client:
+                created = client.post("/api/calculate-roi", json={"user_email": "analytics@example.com"}).json()
+                day = created["calculation_date"][:10]
+                report = client.get("/api/analytics", params={"since": day, "group_by": "day_plan"}).json()
+                self.assertEqual(client.get("/api/analytics", params={"since": "yesterday"}).status_code, 400)
+        row, = report["buckets"]
+        self.assertEqual((row["day"], row["plan"], row["calculations"]), (day, created["selected_plan"], 1))
+        self.assertAlmostEqual(row["roi_median"], created["roi_percentage"],
+                               delta=abs(created["roi_percentage"]) * RELATIVE_ACCURACY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import server
+from server import app
+
+
+class TestROIBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.rows = [
+            {"user_email": "a@example.com"},
+            {
+                "user_email": "b@example.com",
+                "monthly_inquiries": 2500,
+                "automation_percentage": 75,
+                "team_members": 5,
+                "bitrix24_plan": "Professional Plan",
+                "monthly_price_usd": 199,
+                "average_ticket_ars": 15000,
+                "current_conversion_rate": 2,
+                "expected_conversion_rate": 3,
+            },
+            {"user_email": "c@example.com", "hourly_cost_ars": 0, "implementation_cost": 0},
+        ]
+
+    def test_batch_matches_single_calculation(self):
+        """Every batch column matches the per-request endpoint row by row"""
+        response = self.client.post("/api/calculate-roi/batch", json={"rows": self.rows})
+        self.assertEqual(response.status_code, 200)
+        batch = response.json()
+        self.assertEqual(batch["count"], len(self.rows))
+        self.assertEqual(len(set(batch["columns"]["calculation_id"])), len(self.rows))
+
+        for index, row in enumerate(self.rows):
+            single = self.client.post("/api/calculate-roi", json=row).json()
+            for name, values in batch["columns"].items():
+                if name == "calculation_id":
+                    continue
+                self.assertEqual(values[index], single[name], f"{name} differs on row {index}")
+
+    def test_batch_emails_are_opt_in(self):
+        """Per-row emails are only scheduled when send_emails is set"""
+        sent = []
+        original = server.send_roi_analysis_email
+        server.send_roi_analysis_email = lambda email, data, admin: sent.append((email, data))
+        try:
+            self.client.post("/api/calculate-roi/batch", json={"rows": self.rows})
+            self.assertEqual(sent, [])
+
+            self.client.post("/api/calculate-roi/batch", json={"rows": self.rows, "send_emails": True})
+            self.assertEqual([email for email, _ in sent], [row["user_email"] for row in self.rows])
+            self.assertEqual(sent[1][1]["selected_plan"], "Professional Plan")
+            self.assertEqual(sent[1][1]["inputs"]["team_members"], 5)
+        finally:
+            server.send_roi_analysis_email = original
+
+    def test_zero_investment_and_size_limit(self):
+        sent = []
+        original = server.send_roi_analysis_email
+        server.send_roi_analysis_email = lambda email, data, admin: sent.append((email, data))
+        try:
+            # Standard plan licenses cost 950400 ARS a year at 800 ARS/USD
+            rows = self.rows + [{"user_email": "d@example.com", "implementation_cost": -950400}]
+            response = self.client.post("/api/calculate-roi/batch", json={"rows": rows, "send_emails": True})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("[3]", response.json()["detail"])
+            self.assertEqual(sent, [])
+        finally:
+            server.send_roi_analysis_email = original
+
+        original_max = server.BATCH_MAX_ROWS
+        server.BATCH_MAX_ROWS = 2
+        try:
+            response = self.client.post("/api/calculate-roi/batch", json={"rows": self.rows})
+            self.assertEqual(response.status_code, 400)
+        finally:
+            server.BATCH_MAX_ROWS = original_max
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import server
+from calculation_store import CalculationStore
+from tests.conftest import isolated_server_paths
+
+
+class TestCalculationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CalculationStore(os.path.join(self.tmp.name, "calculations.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def record(self, calculation_id, email, date):
+        return {"calculation_id": calculation_id, "user_email": email, "calculation_date": date, "roi_percentage": 1.0}
+
+    def test_get_sees_pending_and_committed_records(self):
+        future = self.store.save(self.record("a", "x@example.com", "2024-01-01T00:00:00"))
+        self.assertEqual(self.store.get("a")["user_email"], "x@example.com")
+        future.result()
+        self.assertEqual(self.store.get("a")["calculation_id"], "a")
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_keyset_pagination_by_email(self):
+        for day in range(1, 6):
+            self.store.save(self.record(f"id{day}", "x@example.com", f"2024-01-0{day}T00:00:00"))
+        self.store.save(self.record("other", "y@example.com", "2024-01-09T00:00:00")).result()
+
+        first, cursor = self.store.list_by_email("x@example.com", limit=2)
+        self.assertEqual([r["calculation_id"] for r in first], ["id5", "id4"])
+        second, cursor = self.store.list_by_email("x@example.com", limit=2, cursor=cursor)
+        self.assertEqual([r["calculation_id"] for r in second], ["id3", "id2"])
+        last, cursor = self.store.list_by_email("x@example.com", limit=2, cursor=cursor)
+        self.assertEqual([r["calculation_id"] for r in last], ["id1"])
+        self.assertIsNone(cursor)
+        with self.assertRaises(ValueError):
+            self.store.list_by_email("x@example.com", cursor="garbage")
+
+
+class TestCalculationEndpoints(unittest.TestCase):
+
+    def test_calculation_is_retrievable(self):
+        with tempfile.TemporaryDirectory() as tmp, isolated_server_paths(tmp), \
+                mock.patch.object(server, "ADMIN_API_KEY", "secret"):
+            with TestClient(server.app) as client:
+                created = client.post("/api/calculate-roi", json={"user_email": "lead@example.com"}).json()
+                fetched = client.get(f"/api/calculations/{created['calculation_id']}")
+                self.assertEqual(fetched.status_code, 200)
+                self.assertEqual(fetched.json(), created)
+
+                # Listing reads committed rows; wait for the writer to flush
+                server.calculation_store.writer.submit(lambda conn: None).result()
+                self.assertEqual(client.get("/api/calculations", params={"email": "lead@example.com"}).status_code, 401)
+                page = client.get("/api/calculations", params={"email": "lead@example.com"},
+                                  headers={"X-Admin-Key": "secret"}).json()
+                self.assertEqual([item["calculation_id"] for item in page["items"]], [created["calculation_id"]])
+                self.assertEqual(client.get("/api/calculations/nope").status_code, 404)
+
+    def test_unavailable_before_startup(self):
+        client = TestClient(server.app)
+        with mock.patch.object(server, "calculation_store", None), mock.patch.object(server, "ADMIN_API_KEY", "secret"):
+            self.assertEqual(client.get("/api/calculations/abc").status_code, 503)
+            response = client.get("/api/calculations", params={"email": "a@example.com"}, headers={"X-Admin-Key": "secret"})
+            self.assertEqual(response.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
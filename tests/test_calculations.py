@@ -0,0 +1,55 @@
+import dataclasses
+import unittest
+
+from calculations import ROIInputs, compute_roi, roi_cache_stats
+
+
+DEFAULT_INPUTS = dict(
+    monthly_inquiries=1000,
+    automation_percentage=60.0,
+    minutes_per_inquiry=4,
+    monthly_crm_hours=40,
+    crm_automation_percentage=50.0,
+    team_members=3,
+    hourly_cost_ars=5000,
+    monthly_price_usd=99,
+    implementation_cost=1000000,
+)
+
+
+class TestCalculationCore(unittest.TestCase):
+
+    def test_standard_plan_figures(self):
+        result = compute_roi(ROIInputs(**DEFAULT_INPUTS))
+        self.assertEqual(result.annual_license_cost_usd, 1188)
+        self.assertEqual(result.chatbot_annual_savings, 2400000.0)
+        self.assertEqual(result.crm_annual_savings, 3600000.0)
+        self.assertEqual(result.total_investment, 99 * 12 * 800 + 1000000)
+        self.assertEqual(result.roi_percentage, round((6000000 - 1950400) / 1950400 * 100, 2))
+        self.assertIsNone(result.additional_annual_revenue)
+
+    def test_revenue_requires_all_optional_inputs(self):
+        with_revenue = ROIInputs(**DEFAULT_INPUTS, average_ticket_ars=15000,
+                                 current_conversion_rate=2, expected_conversion_rate=3)
+        self.assertEqual(compute_roi(with_revenue).additional_annual_revenue, 1800000.0)
+        partial = ROIInputs(**DEFAULT_INPUTS, average_ticket_ars=15000, current_conversion_rate=2)
+        self.assertIsNone(compute_roi(partial).additional_annual_revenue)
+
+    def test_inputs_are_immutable_and_slotted(self):
+        inputs = ROIInputs(**DEFAULT_INPUTS)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            inputs.team_members = 4
+        self.assertFalse(hasattr(inputs, "__dict__"))
+
+    def test_repeated_inputs_hit_cache(self):
+        compute_roi(ROIInputs(**DEFAULT_INPUTS))
+        before = roi_cache_stats()
+        # Equal values of a different numeric type normalize to the same key
+        compute_roi(ROIInputs(**{**DEFAULT_INPUTS, "automation_percentage": 60}))
+        after = roi_cache_stats()
+        self.assertEqual(after["hits"], before["hits"] + 1)
+        self.assertEqual(after["misses"], before["misses"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmarks.bench_cold_start import LAZY_MODULES
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+
+class TestColdStart(unittest.TestCase):
+
+    def test_heavy_modules_load_lazily(self):
+        """Importing the app must not pull in the email provider, httpx or NumPy"""
+        completed = subprocess.run(
+            [sys.executable, "-c", "import sys, server; print(' '.join(sorted(sys.modules)))"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        loaded = {name.split(".")[0] for name in completed.stdout.split()}
+        self.assertEqual(loaded & set(LAZY_MODULES), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from comparison import compare_plans
+from email_rendering import render_user_email
+import server
+from server import app
+
+PLANS = (
+    {"name": "Small", "monthly_price_usd": 49, "max_users": 5},
+    {"name": "Medium", "monthly_price_usd": 99, "max_users": 50},
+    {"name": "Large", "monthly_price_usd": 399},
+)
+
+
+class TestComparePlans(unittest.TestCase):
+
+    def base(self, **overrides):
+        return server._numeric_base(overrides)
+
+    def test_recommends_cheapest_plan_that_fits_the_team(self):
+        comparison, recommended = compare_plans(self.base(team_members=3), PLANS, 800)
+        self.assertEqual(recommended, 0)
+        self.assertEqual([plan["total_investment"] for plan in comparison],
+                         [49 * 12 * 800 + 1000000, 99 * 12 * 800 + 1000000, 399 * 12 * 800 + 1000000])
+        self.assertGreater(comparison[0]["roi_percentage"], comparison[1]["roi_percentage"])
+
+        comparison, recommended = compare_plans(self.base(team_members=20), PLANS, 800)
+        self.assertEqual(recommended, 1)
+        self.assertFalse(comparison[0]["eligible"])
+
+    def test_payback_beyond_horizon(self):
+        comparison, _ = compare_plans(self.base(hourly_cost_ars=1), PLANS, 800)
+        self.assertIsNone(comparison[0]["break_even_month"])
+        self.assertIsNone(comparison[0]["payback_months"])
+
+
+class TestCompareEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.sent = []
+
+        async def record_email(user_email, roi_data, admin_email):
+            self.sent.append(roi_data)
+
+        patcher = mock.patch.object(server, "send_roi_analysis_email", record_email)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_call_and_single_email(self):
+        payload = {"user_email": "compare@example.com", "team_members": 12, "company_name": "ACME"}
+        data = self.client.post("/api/calculate-roi/compare", json=payload).json()
+        catalog = [plan["name"] for plan in server.plan_catalog.current().plans]
+        self.assertEqual([plan["plan"] for plan in data["plan_comparison"]], catalog)
+        self.assertEqual(data["recommended_plan"], "Standard Plan")
+        self.assertEqual(data["selected_plan"], "Standard Plan")
+
+        # The headline numbers match a plain calculation with the recommended plan
+        single = self.client.post("/api/calculate-roi", json={**payload, "user_email": "compare2@example.com",
+                                                             "bitrix24_plan": "Standard Plan"}).json()
+        self.assertEqual(data["roi_percentage"], single["roi_percentage"])
+        self.assertEqual(len([email for email in self.sent if email["user_email"] == "compare@example.com"]), 1)
+
+        # A double click is replayed without a second email
+        again = self.client.post("/api/calculate-roi/compare", json=payload)
+        self.assertEqual(again.headers["idempotent-replayed"], "true")
+        self.assertEqual(len([email for email in self.sent if email["user_email"] == "compare@example.com"]), 1)
+
+        _, html = render_user_email(self.sent[0])
+        self.assertIn("Comparación de Planes", html)
+        self.assertIn("Enterprise Plan", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import httpx
+
+import fake_sendgrid
+from email_dispatcher import EmailDispatcher, EmailMessage, group_messages
+
+
+class TestEmailDispatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        fake_sendgrid.messages.clear()
+        fake_sendgrid.failures[0] = 0
+        self.dispatcher = EmailDispatcher(
+            api_key="test", sender_email="hola@efficiency.io", base_url="http://fake-sendgrid",
+            concurrency=2, backoff_base=0.001,
+            transport=httpx.ASGITransport(app=fake_sendgrid.app),
+        )
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+
+    async def test_identical_messages_are_batched(self):
+        messages = [EmailMessage(recipient, "Hola", "<p>same</p>")
+                    for recipient in ("a@example.com", "b@example.com", "c@example.com")]
+        messages.append(EmailMessage("admin@example.com", "Lead", "<p>other</p>"))
+        groups = group_messages(messages, self.dispatcher.batch_size)
+        self.assertEqual([len(group) for group in groups], [3, 1])
+        for group in groups:
+            self.assertIsNone(await self.dispatcher.deliver(group))
+
+        self.assertEqual(len(fake_sendgrid.messages), 2)
+        recipients = sorted(to["email"] for payload in fake_sendgrid.messages
+                            for p in payload["personalizations"] for to in p["to"])
+        self.assertEqual(recipients, ["a@example.com", "admin@example.com", "b@example.com", "c@example.com"])
+        stats = self.dispatcher.stats()
+        self.assertEqual(stats["sent"], 4)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["send_latency_ms"]["samples"], 2)
+
+    async def test_retries_transient_failures(self):
+        fake_sendgrid.failures[:] = [2, 503]
+        self.assertIsNone(await self.dispatcher.deliver([EmailMessage("a@example.com", "Hola", "<p>x</p>")]))
+        stats = self.dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 2, 0))
+
+    async def test_permanent_failure_is_not_retried(self):
+        fake_sendgrid.failures[:] = [1, 400]
+        error = await self.dispatcher.deliver([EmailMessage("a@example.com", "Hola", "<p>x</p>")])
+        self.assertTrue(error.startswith("HTTP 400"))
+        stats = self.dispatcher.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (0, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
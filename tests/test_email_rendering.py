@@ -0,0 +1,61 @@
+import unittest
+
+from email_rendering import HTMLTemplate, render_admin_email, render_user_email
+
+
+def roi_data(**overrides):
+    data = {
+        "inputs": {
+            "monthly_inquiries": 1000, "automation_percentage": 60.0, "minutes_per_inquiry": 4,
+            "monthly_crm_hours": 40, "crm_automation_percentage": 50.0, "team_members": 3,
+            "hourly_cost_ars": 5000, "bitrix24_plan": "Standard Plan", "monthly_price_usd": 99,
+            "implementation_cost": 1000000, "average_ticket_ars": 15000,
+            "current_conversion_rate": 2.0, "expected_conversion_rate": 3.0, "company_name": None,
+        },
+        "selected_plan": "Standard Plan", "monthly_price_usd": 99, "annual_license_cost_usd": 1188,
+        "chatbot_monthly_hours_saved": 40.0, "chatbot_annual_savings": 2400000.0,
+        "crm_annual_hours_saved": 720.0, "crm_annual_savings": 3600000.0,
+        "total_annual_savings": 6000000.0, "total_investment": 1950400, "roi_percentage": 207.63,
+        "additional_annual_revenue": 1800000.0, "total_hours_saved_annually": 1200.0,
+        "calculation_date": "2024-05-01T12:00:00", "calculation_id": "abc-123", "user_email": "lead@example.com",
+    }
+    data.update(overrides)
+    return data
+
+
+class TestEmailRendering(unittest.TestCase):
+
+    def test_template_fields(self):
+        template = HTMLTemplate("<b>{total:,.0f}</b> {inputs[team]} {{literal}}")
+        self.assertEqual(template.render({"total": 1234567.8, "inputs": {"team": 3}}), "<b>1,234,568</b> 3 {literal}")
+        with self.assertRaises(ValueError):
+            HTMLTemplate("{value!r}")
+
+    def test_cached_formatting_keeps_signed_zero(self):
+        template = HTMLTemplate("{value:.1f}")
+        self.assertEqual([template.render({"value": value}) for value in (0.0, -0.0, 2.5, 2.5)], ["0.0", "-0.0", "2.5", "2.5"])
+
+    def test_user_email_includes_formatted_revenue(self):
+        subject, html = render_user_email(roi_data())
+        self.assertEqual(subject, "Su Análisis ROI - Bitrix24 + Chatbot")
+        self.assertIn("ROI Proyectado: 207.63%", html)
+        self.assertIn("$6,000,000 ARS", html)
+        self.assertIn("(480.0 horas ahorradas anualmente)", html)
+        self.assertIn("<strong>$1,800,000 ARS/año</strong>", html)
+        self.assertIn("Análisis generado el 2024-05-01", html)
+
+    def test_revenue_sections_are_optional(self):
+        data = roi_data(additional_annual_revenue=None)
+        self.assertNotIn("Ingresos Adicionales", render_user_email(data)[1])
+        self.assertNotIn("Proyección de Ingresos", render_admin_email("lead@example.com", data)[1])
+
+    def test_admin_email(self):
+        subject, html = render_admin_email("lead@example.com", roi_data())
+        self.assertEqual(subject, "Nueva Consulta ROI - Sin especificar")
+        self.assertIn("<p><strong>Email:</strong> lead@example.com</p>", html)
+        self.assertIn("<li><strong>Miembros del equipo:</strong> 3</li>", html)
+        self.assertIn("<li><strong>Conversión esperada:</strong> 3.0%</li>", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from calculation_store import CalculationStore
+from export import EXPORT_COLUMNS, export_stream, iter_pages, main, parquet_available
+import server
+
+
+def record(index):
+    return {
+        "calculation_id": f"id-{index:03d}",
+        "calculation_date": f"2024-01-{index % 28 + 1:02d}T10:00:00",
+        "user_email": f"lead{index}@example.com",
+        "selected_plan": "Standard Plan",
+        "monthly_price_usd": 99,
+        "roi_percentage": 207.63,
+        "additional_annual_revenue": None,
+        "inputs": {"monthly_inquiries": 1000, "team_members": index, "company_name": "ACME"},
+    }
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "calculations.db")
+        store = CalculationStore(self.path)
+        for index in range(25):
+            store.save(record(index))
+        store.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_bounded_and_ordered(self):
+        pages = list(iter_pages(self.path, page_size=10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        keys = [(row["calculation_date"], row["calculation_id"]) for page in pages for row in page]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(pages[0][0]["input_company_name"], "ACME")
+
+    def test_csv_and_ndjson(self):
+        rows = list(csv.DictReader(io.StringIO(b"".join(export_stream(self.path, "csv")).decode())))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(list(rows[0]), list(EXPORT_COLUMNS))
+
+        lines = b"".join(export_stream(self.path, "ndjson", since="2024-01-20")).decode().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(json.loads(line)["calculation_date"] >= "2024-01-20" for line in lines))
+
+    @unittest.skipUnless(parquet_available(), "pyarrow not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        table = pq.read_table(io.BytesIO(b"".join(export_stream(self.path, "parquet"))))
+        self.assertEqual(table.num_rows, 25)
+        self.assertEqual(table.column_names, list(EXPORT_COLUMNS))
+
+    def test_cli_incremental_state(self):
+        state = os.path.join(self.tmp.name, "export.state")
+        first = os.path.join(self.tmp.name, "first.ndjson")
+        main(["--db", self.path, "--format", "ndjson", "--output", first, "--state-file", state])
+        self.assertEqual(len(open(first).read().splitlines()), 25)
+
+        store = CalculationStore(self.path)
+        store.save({**record(99), "calculation_date": "2024-12-31T00:00:00"})
+        store.close()
+        second = os.path.join(self.tmp.name, "second.ndjson")
+        main(["--db", self.path, "--format", "ndjson", "--output", second, "--state-file", state])
+        self.assertEqual([json.loads(line)["calculation_id"] for line in open(second)], ["id-099"])
+
+
+class TestExportEndpoint(unittest.TestCase):
+
+    def test_requires_admin_key(self):
+        client = TestClient(server.app)
+        with mock.patch.object(server, "ADMIN_API_KEY", None):
+            self.assertEqual(client.get("/api/calculations/export").status_code, 403)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(server, "ADMIN_API_KEY", "secret"), \
+                mock.patch.object(server, "CALCULATIONS_DB_PATH", os.path.join(tmp, "calculations.db")):
+            CalculationStore(server.CALCULATIONS_DB_PATH).close()
+            self.assertEqual(client.get("/api/calculations/export").status_code, 401)
+            self.assertEqual(client.get("/api/calculations/export", headers={"X-Admin-Key": "wrong"}).status_code, 401)
+            response = client.get("/api/calculations/export", headers={"X-Admin-Key": "secret"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.text.splitlines()[0].split(",")[0], EXPORT_COLUMNS[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import unittest
+
+from fastapi.testclient import TestClient
+
+from idempotency import SubmissionDeduplicator
+import server
+from server import app
+
+PAYLOAD = {
+    "user_email": "a@example.com",
+    "monthly_inquiries": 2500,
+    "automation_percentage": 75,
+    "bitrix24_plan": "Professional Plan",
+    "average_ticket_ars": 15000,
+    "current_conversion_rate": 2,
+    "expected_conversion_rate": 3,
+    "company_name": "ACME",
+}
+
+
+class TestCalculateRoiFastPath(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.addCleanup(setattr, server, "ROI_FAST_PATH", server.ROI_FAST_PATH)
+        # Identical submissions would otherwise be replayed from the first response
+        self.addCleanup(setattr, server, "submissions", server.submissions)
+        server.submissions = SubmissionDeduplicator(window=0)
+
+    def post(self, fast_path, payload):
+        server.ROI_FAST_PATH = fast_path
+        response = self.client.post("/api/calculate-roi", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        data = json.loads(response.content)
+        del data["calculation_id"], data["calculation_date"]
+        return data
+
+    def test_matches_response_model_output(self):
+        for payload in (PAYLOAD, {"user_email": "b@example.com"}):
+            fast, slow = self.post(True, payload), self.post(False, payload)
+            self.assertEqual(list(fast), list(slow))
+            # Same values and the same JSON types (e.g. floats stay floats)
+            self.assertEqual([(k, type(v), v) for k, v in fast.items()], [(k, type(v), v) for k, v in slow.items()])
+
+    def test_openapi_schema_kept(self):
+        operation = self.client.get("/openapi.json").json()["paths"]["/api/calculate-roi"]["post"]
+        schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+        self.assertEqual(schema["$ref"], "#/components/schemas/ROICalculationResponse")
+
+
+if __name__ == "__main__":
+    unittest.main()
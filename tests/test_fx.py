@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from calculations import ROIInputs, compute_roi
+from fx import FileFXProvider, FXProvider, FXQuote, FXRateCache
+import server
+from tests.conftest import isolated_server_paths
+from vectorized import compute_roi_columns, rows_to_columns
+
+
+class SlowProvider(FXProvider):
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = asyncio.Event()
+
+    async def fetch(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("provider down")
+        return FXQuote(1000.0 + self.calls, "2025-01-01T00:00:00+00:00", self.name)
+
+
+class TestFXRateCache(unittest.TestCase):
+
+    def test_stale_while_revalidate_single_flight(self):
+        async def scenario():
+            provider = SlowProvider()
+            cache = FXRateCache(provider, ttl=0, retry_interval=0)
+            provider.release.set()
+            self.assertEqual((await cache.start()).rate, 1001.0)
+
+            # Expired: every caller gets the old quote at once and only one refresh starts
+            provider.release.clear()
+            self.assertEqual({cache.quote().rate for _ in range(10)}, {1001.0})
+            await asyncio.sleep(0.01)
+            self.assertEqual(provider.calls, 2)
+            provider.release.set()
+            await asyncio.sleep(0.01)
+            self.assertEqual(cache.quote().rate, 1002.0)
+
+            # A failed refresh keeps serving the last good quote
+            provider.fail = True
+            cache.quote()
+            await asyncio.sleep(0.01)
+            self.assertEqual(cache.quote().rate, 1002.0)
+            self.assertIn("provider down", cache.stats()["last_error"])
+
+        asyncio.run(scenario())
+
+    def test_falls_back_until_first_fetch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fx.json")
+            cache = FXRateCache(FileFXProvider(path))
+            self.assertEqual(cache.quote().rate, 800)
+            self.assertEqual(asyncio.run(cache.start()).source, "fallback")
+
+            with open(path, "w") as f:
+                json.dump({"rate": 1050.5, "as_of": "2025-01-31T12:00:00Z"}, f)
+            quote = asyncio.run(cache.start())
+            self.assertEqual((quote.rate, quote.as_of, quote.source), (1050.5, "2025-01-31T12:00:00Z", "file"))
+
+    def test_rate_applies_to_scalar_and_vectorized_formula(self):
+        request = server.ROICalculationRequest(user_email="a@example.com")
+        result = compute_roi(ROIInputs.from_mapping(vars(request)), 1050.5)
+        self.assertEqual(result.total_investment, round(99 * 12 * 1050.5) + 1000000)
+        columns = compute_roi_columns(rows_to_columns([request]), 1050.5)
+        self.assertEqual(columns["total_investment"][0], result.total_investment)
+        self.assertEqual(columns["roi_percentage"][0], result.roi_percentage)
+
+
+class TestFXInResponses(unittest.TestCase):
+
+    def test_response_records_rate(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        paths = isolated_server_paths(tmp.name)
+        paths.start()
+        self.addCleanup(paths.stop)
+        with TestClient(server.app) as client:
+            data = client.post("/api/calculate-roi", json={"user_email": "fx@example.com"}).json()
+            self.assertEqual(data["usd_to_ars_rate"], 800)
+            self.assertEqual(data["total_investment"], 99 * 12 * 800 + 1000000)
+            self.assertEqual(data["usd_to_ars_rate_as_of"], client.get("/api/fx-rate").json()["as_of"])
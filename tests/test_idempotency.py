@@ -0,0 +1,77 @@
+import time
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from idempotency import SubmissionDeduplicator, TTLCache
+import server
+from server import app
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_bounded_and_expiring(self):
+        cache = TTLCache(max_entries=2, ttl=60)
+        for key in "abc":
+            cache.put(key, key.upper())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(cache.evictions, 1)
+
+        with mock.patch("idempotency.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get("c"))
+            cache.put("d", "D")
+            self.assertEqual(list(cache.entries), ["d"])
+
+
+class TestIdempotentSubmissions(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.addCleanup(setattr, server, "submissions", server.submissions)
+        server.submissions = SubmissionDeduplicator(window=300)
+        self.sent = []
+
+        async def record_email(user_email, roi_data, admin_email):
+            self.sent.append(roi_data["calculation_id"])
+
+        patcher = mock.patch.object(server, "send_roi_analysis_email", record_email)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, payload, key=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post("/api/calculate-roi", json=payload, headers=headers)
+
+    def test_duplicate_submission_replayed_without_email(self):
+        payload = {"user_email": "Lead@Example.com", "team_members": 7}
+        first = self.post(payload)
+        second = self.post({**payload, "user_email": "lead@example.com"})
+        self.assertEqual(first.json()["calculation_id"], second.json()["calculation_id"])
+        self.assertEqual(second.headers["idempotent-replayed"], "true")
+        self.assertEqual(self.sent, [first.json()["calculation_id"]])
+
+        changed = self.post({**payload, "team_members": 8})
+        self.assertNotEqual(changed.json()["calculation_id"], first.json()["calculation_id"])
+        self.assertEqual(len(self.sent), 2)
+
+    def test_idempotency_key(self):
+        payload = {"user_email": "key@example.com"}
+        first = self.post(payload, key="k-1")
+        self.assertEqual(self.post(payload, key="k-1").json(), first.json())
+        self.assertEqual(len(self.sent), 1)
+
+        reused = self.post({**payload, "team_members": 9}, key="k-1")
+        self.assertEqual(reused.status_code, 422)
+
+    def test_window_zero_disables_dedup(self):
+        server.submissions = SubmissionDeduplicator(window=0)
+        payload = {"user_email": "nodedup@example.com"}
+        self.assertNotEqual(self.post(payload).json()["calculation_id"], self.post(payload).json()["calculation_id"])
+        self.assertEqual(len(self.sent), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
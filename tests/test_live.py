@@ -0,0 +1,136 @@
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from idempotency import SubmissionDeduplicator
+from live import LiveSession
+import server
+from server import app
+
+DEFAULTS = {name: field.default for name, field in server.ROICalculationRequest.model_fields.items()
+            if name != "user_email"}
+
+
+class TestLiveSession(unittest.TestCase):
+
+    def test_only_changed_stages_and_fields(self):
+        session = LiveSession(DEFAULTS)
+        first = session.result(800, "2026-01-01")
+        self.assertEqual(session.stage_runs, 3)
+        self.assertIn("roi_percentage", first)
+        self.assertEqual(session.result(800, "2026-01-01"), {})
+
+        session.apply({"team_members": DEFAULTS["team_members"] + 1})
+        changed = session.result(800, "2026-01-01")
+        # Only the CRM stage ran again, and chatbot figures were not resent
+        self.assertEqual(session.stage_runs, 4)
+        self.assertIn("crm_annual_hours_saved", changed)
+        self.assertNotIn("chatbot_annual_savings", changed)
+        self.assertNotIn("selected_plan", changed)
+
+        # A new exchange rate moves the investment without rerunning any stage
+        changed = session.result(900, "2026-01-02")
+        self.assertEqual(session.stage_runs, 4)
+        self.assertIn("total_investment", changed)
+        self.assertNotIn("crm_annual_savings", changed)
+
+    def test_matches_compute_roi(self):
+        session = LiveSession(DEFAULTS)
+        session.apply({"monthly_inquiries": 1234, "hourly_cost_ars": 6100})
+        fields = session.result(800, "2026-01-01")
+        expected = server.compute_roi(server.ROIInputs.from_mapping({**DEFAULTS, "monthly_inquiries": 1234,
+                                                                      "hourly_cost_ars": 6100}), 800)
+        self.assertEqual(fields["roi_percentage"], expected.roi_percentage)
+        self.assertEqual(fields["total_annual_savings"], expected.total_annual_savings)
+
+
+class TestLiveEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.addCleanup(setattr, server, "submissions", server.submissions)
+        server.submissions = SubmissionDeduplicator(window=300)
+        self.sent = []
+
+        async def record_email(user_email, roi_data, admin_email):
+            self.sent.append(roi_data)
+
+        for patcher in (mock.patch.object(server, "send_roi_analysis_email", record_email),
+                        mock.patch.object(server, "LIVE_FRAME_SECONDS", 0.05)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_burst_is_coalesced_and_email_only_on_submit(self):
+        with self.client.websocket_connect("/api/calculate-roi/live") as websocket:
+            initial = websocket.receive_json()
+            self.assertEqual(initial["type"], "result")
+            self.assertIn("roi_percentage", initial["fields"])
+
+            for inquiries in range(600, 700):
+                websocket.send_json({"type": "update", "fields": {"monthly_inquiries": inquiries}})
+            websocket.send_json({"type": "update", "fields": {"team_members": "many"}})
+            messages = [websocket.receive_json()]
+            while messages[-1]["type"] != "result":
+                messages.append(websocket.receive_json())
+            self.assertEqual(self.sent, [])
+
+            websocket.send_json({"type": "submit", "user_email": "lead@example.com",
+                                 "fields": {"bitrix24_plan": "Professional Plan"}})
+            messages.append(websocket.receive_json())
+            while messages[-1]["type"] != "submitted":
+                messages.append(websocket.receive_json())
+
+        # 100 slider moves arrive within a few frames: far fewer replies than messages
+        self.assertLess(sum(message["type"] == "result" for message in messages), 10)
+        errors = [message for message in messages if message["type"] == "error"]
+        self.assertTrue(errors)
+        self.assertIn("team_members", errors[0]["detail"])
+        self.assertEqual(len(self.sent), 1)
+        submitted = messages[-1]["result"]
+        self.assertEqual(submitted["calculation_id"], self.sent[0]["calculation_id"])
+        self.assertEqual(submitted["selected_plan"], "Professional Plan")
+        rest = self.client.post("/api/calculate-roi", json={
+            "user_email": "other@example.com", "monthly_inquiries": 699, "bitrix24_plan": "Professional Plan",
+        }).json()
+        self.assertEqual(submitted["roi_percentage"], rest["roi_percentage"])
+        self.assertEqual(submitted["monthly_price_usd"], rest["monthly_price_usd"])
+
+    def test_calculation_error_keeps_session_open(self):
+        with self.client.websocket_connect("/api/calculate-roi/live") as websocket:
+            websocket.receive_json()
+            # Standard plan: 99 USD * 12 * 800 = 950400 ARS of licenses, so zero total investment
+            websocket.send_json({"type": "update", "fields": {"implementation_cost": -950400}})
+            error = websocket.receive_json()
+            self.assertEqual((error["type"], error["status"]), ("error", 400))
+
+            websocket.send_json({"type": "submit", "user_email": "lead@example.com"})
+            error = websocket.receive_json()
+            self.assertEqual((error["type"], error["status"]), ("error", 400))
+            self.assertEqual(self.sent, [])
+
+            websocket.send_json({"type": "update", "fields": {"implementation_cost": 500000}})
+            result = websocket.receive_json()
+            self.assertEqual(result["type"], "result")
+            self.assertEqual(result["fields"]["total_investment"], 1450400)
+            websocket.send_json({"type": "submit", "user_email": "lead@example.com"})
+            self.assertEqual(websocket.receive_json()["type"], "submitted")
+        self.assertEqual(len(self.sent), 1)
+
+    def test_malformed_fields_keep_session_open(self):
+        with self.client.websocket_connect("/api/calculate-roi/live") as websocket:
+            websocket.receive_json()
+            for fields in ([1, 2], "abc"):
+                websocket.send_json({"type": "update", "fields": fields})
+                error = websocket.receive_json()
+                self.assertEqual((error["type"], error["status"]), ("error", 422))
+
+            websocket.send_json({"type": "update", "fields": {"monthly_inquiries": 1234}})
+            result = websocket.receive_json()
+            while result["type"] != "result":
+                result = websocket.receive_json()
+            self.assertIn("roi_percentage", result["fields"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+
+from metrics import Registry
+from server import app
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_histogram_buckets_and_thread_shards(self):
+        registry = Registry()
+        histogram = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.01, 0.1))
+
+        def record():
+            for value in (0.005, 0.05, 0.5):
+                histogram.observe("calc", value=value)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(histogram.shards), 4)
+        lines = registry.render().splitlines()
+        self.assertIn('stage_seconds_bucket{stage="calc",le="0.01"} 4', lines)
+        self.assertIn('stage_seconds_bucket{stage="calc",le="0.1"} 8', lines)
+        self.assertIn('stage_seconds_bucket{stage="calc",le="+Inf"} 12', lines)
+        self.assertIn('stage_seconds_count{stage="calc"} 12', lines)
+        self.assertIn("# TYPE stage_seconds histogram", lines)
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        counter = registry.counter("errors_total", "Errors", ("type",))
+        counter.inc('bad "quote"')
+        counter.inc('bad "quote"')
+        registry.gauge("depth", "Queue depth", lambda: 3)
+        registry.gauge("disabled", "Not reported", lambda: None)
+        text = registry.render()
+        self.assertIn('errors_total{type="bad \\"quote\\""} 2', text)
+        self.assertIn("depth 3", text)
+        self.assertNotIn("disabled", text)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_stages_requests_and_errors_exposed(self):
+        client = TestClient(app)
+        response = client.post("/api/calculate-roi", json={"user_email": "metrics@example.com"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.post("/api/calculate-roi", json={"user_email": "nope"}).status_code, 422)
+
+        response = client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        text = response.text
+        for stage in ("validation", "calculation", "serialization"):
+            self.assertIn(f'roi_stage_duration_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('http_requests_total{method="POST",route="/api/calculate-roi",status="200"}', text)
+        self.assertIn('http_requests_total{method="POST",route="/api/calculate-roi",status="422"}', text)
+        self.assertIn('roi_errors_total{type="request_validation"}', text)
+        self.assertIn('roi_memo_cache{stat="hits"}', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
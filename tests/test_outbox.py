@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import httpx
+
+import fake_sendgrid
+from email_dispatcher import EmailDispatcher, EmailMessage
+from outbox import EmailOutbox, OutboxDrainer
+
+
+class TestEmailOutbox(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        fake_sendgrid.messages.clear()
+        fake_sendgrid.failures[0] = 0
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "outbox.db")
+        self.outbox = EmailOutbox(self.path, max_attempts=2, retry_base=0)
+        self.dispatcher = EmailDispatcher(
+            api_key="test", sender_email="hola@efficiency.io", base_url="http://fake-sendgrid",
+            max_retries=0, transport=httpx.ASGITransport(app=fake_sendgrid.app),
+        )
+        self.drainer = OutboxDrainer(self.outbox, self.dispatcher)
+
+    async def asyncTearDown(self):
+        await self.drainer.stop()
+        await self.dispatcher.stop()
+        self.outbox.close()
+        self.tmp.cleanup()
+
+    async def test_concurrent_enqueues_are_group_committed(self):
+        # Hold each group open briefly so the test doesn't depend on thread scheduling
+        self.outbox.writer.max_delay = 0.01
+        await asyncio.gather(*(
+            self.outbox.enqueue([EmailMessage(f"lead{i}@example.com", "Hola", f"<p>{i}</p>")]) for i in range(50)
+        ))
+        self.assertEqual(self.outbox.stats()["pending"], 50)
+        self.assertLess(self.outbox.writer.commits, 50)
+
+    async def test_drain_marks_sent(self):
+        await self.outbox.enqueue([EmailMessage("a@example.com", "Hola", "<p>a</p>"),
+                                   EmailMessage("b@example.com", "Hola", "<p>a</p>")])
+        self.assertEqual(await self.drainer.drain_once(), 2)
+        self.assertEqual(self.outbox.stats()["sent"], 2)
+        # Identical content went out as a single request
+        self.assertEqual(len(fake_sendgrid.messages), 1)
+
+    async def test_failures_are_retried_then_marked_failed(self):
+        fake_sendgrid.failures[:] = [10, 503]
+        await self.outbox.enqueue([EmailMessage("a@example.com", "Hola", "<p>a</p>")])
+        await self.drainer.drain_once()
+        self.assertEqual(self.outbox.stats()["pending"], 1)
+        await self.drainer.drain_once()
+        self.assertEqual(self.outbox.stats()["failed"], 1)
+
+        attempts, error = await self.outbox.writer.run(
+            lambda conn: conn.execute("SELECT attempts, last_error FROM email_outbox").fetchone()
+        )
+        self.assertEqual(attempts, 2)
+        self.assertIn("503", error)
+
+    async def test_rows_survive_restart(self):
+        await self.outbox.enqueue([EmailMessage("a@example.com", "Hola", "<p>a</p>")])
+        await self.outbox.claim_due(10)
+        self.outbox.close()
+
+        # Simulated crash mid-delivery: the row is requeued on startup
+        self.outbox = EmailOutbox(self.path)
+        self.drainer = OutboxDrainer(self.outbox, self.dispatcher, poll_interval=0.01)
+        await self.drainer.start()
+        for _ in range(100):
+            if self.outbox.stats()["sent"]:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.outbox.stats()["sent"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
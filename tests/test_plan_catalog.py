@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from plan_catalog import PlanCatalog, etag_matches
+from server import app
+
+
+def write_catalog(path, plans):
+    with open(path, "w") as f:
+        json.dump({"plans": plans}, f)
+
+
+class TestPlanCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "plans.json")
+        write_catalog(self.path, [{"name": "Basic Plan", "monthly_price_usd": 49}])
+        self.catalog = PlanCatalog(self.path, check_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reloads_changed_file(self):
+        before = self.catalog.current()
+        self.assertEqual(self.catalog.price("Basic Plan"), 49)
+        write_catalog(self.path, [{"name": "Basic Plan", "monthly_price_usd": 59}, {"name": "X", "monthly_price_usd": 1}])
+        after = self.catalog.current()
+        self.assertNotEqual(before.etag, after.etag)
+        self.assertEqual(self.catalog.price("Basic Plan"), 59)
+        self.assertEqual(json.loads(after.body)["plans"][1]["name"], "X")
+
+    def test_invalid_edit_keeps_previous_snapshot(self):
+        before = self.catalog.current()
+        with open(self.path, "w") as f:
+            f.write('{"plans": [{"name": "Basic Plan"}]}')
+        self.assertIs(self.catalog.current(), before)
+        self.assertEqual(self.catalog.price("Basic Plan"), 49)
+
+    def test_etag_matches(self):
+        etag = self.catalog.current().etag
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches('"other"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+
+class TestPlanEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_plans_revalidate_with_etag(self):
+        response = self.client.get("/api/bitrix24-plans")
+        self.assertEqual(response.status_code, 200)
+        plans = response.json()["plans"]
+        self.assertEqual([plan["monthly_price_usd"] for plan in plans], [49, 99, 199, 399])
+        self.assertTrue(plans[1]["default"])
+        self.assertIn("max-age", response.headers["cache-control"])
+
+        cached = self.client.get("/api/bitrix24-plans", headers={"If-None-Match": response.headers["etag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached.headers["etag"], response.headers["etag"])
+
+    def test_price_comes_from_catalog(self):
+        response = self.client.post("/api/calculate-roi", json={
+            "user_email": "a@example.com", "bitrix24_plan": "Enterprise Plan", "monthly_price_usd": 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["monthly_price_usd"], 399)
+        self.assertEqual(response.json()["annual_license_cost_usd"], 399 * 12)
+
+        response = self.client.post("/api/calculate-roi", json={"user_email": "a@example.com", "bitrix24_plan": "Free"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown Bitrix24 plan", response.json()["detail"])
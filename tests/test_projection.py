@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from projection import project_cash_flow_columns, ramp_fractions
+from server import app
+from vectorized import rows_to_columns
+
+DEFAULTS = {
+    "monthly_inquiries": 1000, "automation_percentage": 60.0, "minutes_per_inquiry": 4,
+    "monthly_crm_hours": 40, "crm_automation_percentage": 50.0, "team_members": 3,
+    "hourly_cost_ars": 5000, "monthly_price_usd": 99, "implementation_cost": 1000000,
+}
+
+
+class TestProjection(unittest.TestCase):
+
+    def test_break_even_and_payback(self):
+        # 500,000 ARS/month of savings against 79,200 ARS/month of license
+        result = project_cash_flow_columns(rows_to_columns([DEFAULTS, {**DEFAULTS, "hourly_cost_ars": 100}]),
+                                           ramp_fractions(12), usd_to_ars=800)
+        self.assertEqual(result["break_even_month"].tolist(), [3, 0])
+        self.assertEqual(result["payback_months"][0], round(2 + 158400 / 420800, 2))
+        self.assertTrue(np.isnan(result["payback_months"][1]))
+        self.assertEqual(result["cumulative_net_position"][0, 1], -158400)
+        self.assertEqual(result["final_net_position"][0], 12 * 420800 - 1000000)
+
+    def test_ramp_up(self):
+        np.testing.assert_allclose(ramp_fractions(12, ramp_up_months=4)[:5], [0.25, 0.5, 0.75, 1, 1])
+        np.testing.assert_allclose(ramp_fractions(12, ramp_up=[10, 50])[:3], [0.1, 0.5, 1])
+        with self.assertRaises(ValueError):
+            ramp_fractions(12, ramp_up=[150])
+
+        result = project_cash_flow_columns(rows_to_columns([DEFAULTS]), ramp_fractions(12, ramp_up_months=4), 800)
+        self.assertEqual(result["monthly_savings"][0, 0], 125000)
+        self.assertEqual(result["break_even_month"][0], 5)
+
+
+class TestProjectionEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_many_scenarios(self):
+        response = self.client.post("/api/calculate-roi/projection", json={
+            "base": {"team_members": 4},
+            "rows": [{}, {"implementation_cost": 50000000}],
+            "months": 24,
+            "ramp_up_months": 3,
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(len(data["columns"]["cumulative_net_position"][0]), 24)
+        self.assertEqual(data["ramp_up"][:3], [33.33, 66.67, 100.0])
+        self.assertIsInstance(data["columns"]["break_even_month"][0], int)
+        self.assertIsNone(data["columns"]["break_even_month"][1])
+        self.assertIsNone(data["columns"]["payback_months"][1])
+
+    def test_rejects_bad_requests(self):
+        for payload in ({"months": 6}, {"rows": [{"bogus": 1}]}, {"ramp_up": [50] * 40, "months": 12}):
+            self.assertEqual(self.client.post("/api/calculate-roi/projection", json=payload).status_code, 400)
+
+    def test_null_only_for_revenue_inputs(self):
+        response = self.client.post("/api/calculate-roi/projection", json={"base": {"hourly_cost_ars": None}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("hourly_cost_ars", response.json()["detail"])
+        solve = self.client.post("/api/calculate-roi/solve", json={
+            "target": 100, "variable": "team_members", "rows": [{"monthly_inquiries": None}],
+        })
+        self.assertEqual(solve.status_code, 400)
+        response = self.client.post("/api/calculate-roi/projection", json={"base": {"average_ticket_ars": None}})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
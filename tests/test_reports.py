@@ -0,0 +1,86 @@
+import os
+import re
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from reports import SAMPLE_CALCULATION, ReportCache, render_report_html, render_report_pdf
+import server
+from tests.conftest import isolated_server_paths
+
+
+class TestRendering(unittest.TestCase):
+
+    def test_pdf_is_well_formed_and_deterministic(self):
+        roi_data = {**SAMPLE_CALCULATION, "additional_annual_revenue": 1234567.0}
+        pdf = render_report_pdf(roi_data)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf.endswith(b"%%EOF\n"))
+        self.assertEqual(pdf, render_report_pdf(roi_data))
+        # Every xref offset points at its object
+        startxref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+        offsets = re.findall(rb"(\d{10}) 00000 n", pdf[startxref:])
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(pdf[int(offset):].startswith(b"%d 0 obj" % number))
+        self.assertIn(b"($1,234,567 ARS/a\xf1o)", pdf)
+
+    def test_html_is_standalone(self):
+        html = render_report_html(SAMPLE_CALCULATION).decode()
+        self.assertTrue(html.startswith("<!DOCTYPE html>"))
+        self.assertIn('<meta charset="utf-8">', html)
+        self.assertEqual(html.count("<body"), 1)
+        self.assertIn("ROI Proyectado: 207.63%", html)
+
+
+class TestReportCache(unittest.TestCase):
+
+    def test_evicts_least_recently_served(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ReportCache(tmp, max_bytes=250, version="v1")
+            for name in ("a", "b"):
+                cache.put(name, "pdf", b"x" * 100)
+            os.utime(cache.path("a", "pdf"), (1, 1))
+            os.utime(cache.path("b", "pdf"), (2, 2))
+            self.assertIsNotNone(cache.get("a", "pdf"))
+            cache.put("c", "pdf", b"x" * 100)
+            self.assertIsNone(cache.get("b", "pdf"))
+            self.assertIsNotNone(cache.get("a", "pdf"))
+            self.assertEqual(cache.evictions, 1)
+            self.assertEqual(ReportCache(tmp, max_bytes=250, version="v2").get("a", "pdf"), None)
+
+
+class TestReportEndpoint(unittest.TestCase):
+
+    def test_render_cache_and_revalidate(self):
+        with tempfile.TemporaryDirectory() as tmp, isolated_server_paths(tmp):
+            with TestClient(server.app) as client:
+                created = client.post("/api/calculate-roi", json={"user_email": "report@example.com"}).json()
+                url = f"/api/calculations/{created['calculation_id']}/report"
+
+                first = client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first.headers["content-type"], "application/pdf")
+                self.assertTrue(first.content.startswith(b"%PDF"))
+                second = client.get(url)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second.headers["etag"], first.headers["etag"])
+                self.assertEqual(server.report_cache.hits, 1)
+
+                revalidated = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+                self.assertEqual(revalidated.status_code, 304)
+
+                html = client.get(url, params={"format": "html"})
+                self.assertIn("text/html", html.headers["content-type"])
+                self.assertIn(f"ROI Proyectado: {created['roi_percentage']}%", html.text)
+                self.assertNotEqual(html.headers["etag"], first.headers["etag"])
+
+                self.assertEqual(client.get("/api/calculations/missing/report").status_code, 404)
+                guessed = client.get("/api/calculations/missing/report",
+                                     headers={"If-None-Match": server.report_cache.etag("missing", "pdf")})
+                self.assertEqual(guessed.status_code, 404)
+                self.assertEqual(client.get("/api/calculations/..%2Fetc/report").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+
+from calculations import ROIInputs, compute_roi
+from export import parquet_available
+from score_leads import main
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+
+@unittest.skipUnless(parquet_available(), "pyarrow not installed")
+class TestScoreLeads(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input = os.path.join(self.tmp.name, "leads.csv")
+        rows = [["Empresa", "Consultas", "team_members", "bitrix24_plan", "user_email"]]
+        for index in range(300):
+            rows.append([f"Co {index}", str(index * 10), "4", "Basic Plan", f"lead{index}@example.com"])
+        rows[11] = ["Bad number", "lots", "4", "Basic Plan", "a@example.com"]
+        rows[22] = ["Bad plan", "10", "4", "Mega Plan", "b@example.com"]
+        rows[33] = ["Fraction", "10", "2.5", "", "c@example.com"]
+        rows[44] = ["Bad email", "10", "4", "Basic Plan", "nobody"]
+        rows[55] = ["Defaults", "", "", "", "d@example.com"]
+        with open(self.input, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    def run_cli(self, *args):
+        with redirect_stderr(io.StringIO()) as log:
+            status = main([self.input, "--map", "Consultas=monthly_inquiries", "--chunk-rows", "64",
+                           "--workers", "2", *args])
+        return status, log.getvalue()
+
+    def test_csv_scoring_and_rejects(self):
+        output = os.path.join(self.tmp.name, "scored.csv")
+        status, log = self.run_cli("--output", output)
+        self.assertEqual(status, 0)
+        self.assertIn("Scored 300 rows (4 rejected)", log)
+
+        with open(output) as f:
+            scored = list(csv.DictReader(f))
+        self.assertEqual(len(scored), 296)
+        # Input order is kept across chunks and workers
+        self.assertEqual([row["Empresa"] for row in scored[:3]], ["Co 0", "Co 1", "Co 2"])
+        row = next(row for row in scored if row["Empresa"] == "Co 7")
+        expected = compute_roi(ROIInputs(70, 60.0, 4, 40, 50.0, 4, 5000, 49, 1000000), 800)
+        self.assertEqual(float(row["roi_percentage"]), expected.roi_percentage)
+        self.assertEqual(int(row["total_investment"]), expected.total_investment)
+        self.assertEqual(row["additional_annual_revenue"], "")
+        defaults = next(row for row in scored if row["Empresa"] == "Defaults")
+        self.assertEqual((defaults["selected_plan"], defaults["monthly_price_usd"]), ("Standard Plan", "99"))
+
+        with open(output + ".rejects.csv") as f:
+            rejects = {row["Empresa"]: row for row in csv.DictReader(f)}
+        self.assertEqual(rejects["Bad number"]["row_number"], "11")
+        self.assertEqual(rejects["Bad number"]["error"], "Consultas: not a number")
+        self.assertEqual(rejects["Bad plan"]["error"], "bitrix24_plan: unknown Bitrix24 plan")
+        self.assertEqual(rejects["Fraction"]["error"], "team_members: must be a whole number")
+        self.assertEqual(rejects["Bad email"]["error"], "user_email: not a valid email address")
+
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet as pq
+
+        self.input = os.path.join(self.tmp.name, "leads.parquet")
+        pq.write_table(_read_csv(os.path.join(self.tmp.name, "leads.csv")), self.input)
+        output = os.path.join(self.tmp.name, "scored.parquet")
+        status, log = self.run_cli("--output", output)
+        self.assertEqual(status, 0)
+        table = pq.read_table(output)
+        self.assertEqual(table.num_rows, 296)
+        self.assertEqual(table.schema.field("total_investment").type, "int64")
+        self.assertIn("/300 rows", log)
+
+    def test_rate_from_fx_settings(self):
+        rate_file = os.path.join(self.tmp.name, "rate.json")
+        with open(rate_file, "w") as f:
+            json.dump({"rate": 1000, "as_of": "2025-01-31T12:00:00Z"}, f)
+        output = os.path.join(self.tmp.name, "scored.csv")
+        with mock.patch.dict(os.environ, {"FX_RATE_FILE": rate_file}):
+            status, log = self.run_cli("--output", output)
+        self.assertEqual(status, 0)
+        self.assertIn("USD/ARS rate 1000.0 (file", log)
+        with open(output) as f:
+            row = next(row for row in csv.DictReader(f) if row["Empresa"] == "Co 7")
+        expected = compute_roi(ROIInputs(70, 60.0, 4, 40, 50.0, 4, 5000, 49, 1000000), 1000)
+        self.assertEqual(int(row["total_investment"]), expected.total_investment)
+
+    def test_does_not_load_the_api(self):
+        output = os.path.join(self.tmp.name, "scored.csv")
+        script = (f"import sys, score_leads; score_leads.main([{self.input!r}, '--output', {output!r}, "
+                  "'--workers', '1']); print('server' in sys.modules)")
+        completed = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True,
+                                   text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), "False")
+
+    def test_unknown_mapping(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main([self.input, "--output", os.path.join(self.tmp.name, "out.csv"), "--map", "Empresa=company"])
+
+
+def _read_csv(path):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    with open(path) as f:
+        header = next(csv.reader(f))
+    return pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+        column_types={name: pa.string() for name in header}, strings_can_be_null=True,
+    ))
+
+
+if __name__ == "__main__":
+    unittest.main()
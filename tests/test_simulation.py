@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import server
+from server import _numeric_base, app
+from simulation import run_simulation, sample, validate_distribution
+from vectorized import compute_roi_columns
+
+
+class TestROISimulation(unittest.TestCase):
+
+    def setUp(self):
+        self.base = _numeric_base({"average_ticket_ars": 15000})
+        self.distributions = {
+            "automation_percentage": {"distribution": "uniform", "low": 40, "high": 80},
+            "current_conversion_rate": {"distribution": "normal", "mean": 2, "std": 0.2, "low": 0.1},
+            "expected_conversion_rate": {"distribution": "triangular", "low": 2.5, "mode": 3, "high": 4},
+        }
+
+    def test_seed_reproduces_results(self):
+        first = run_simulation(self.base, self.distributions, 600000, seed=7)
+        second = run_simulation(self.base, self.distributions, 600000, seed=7)
+        self.assertEqual(first, second)
+        self.assertEqual(first["draws"], 600000)
+
+    def test_percentiles_are_ordered_and_bracket_point_estimate(self):
+        result = run_simulation(self.base, self.distributions, 300000, seed=1, percentiles=[5, 50, 95])
+        roi = result["metrics"]["roi_percentage"]["percentiles"]
+        self.assertLess(roi["p5"], roi["p50"])
+        self.assertLess(roi["p50"], roi["p95"])
+        # Uniform 40-80% automation is centered on 60%, the default point estimate
+        point = compute_roi_columns(self.base)["roi_percentage"]
+        self.assertLess(roi["p5"], point)
+        self.assertGreater(roi["p95"], point)
+        self.assertIsNotNone(result["metrics"]["additional_annual_revenue"])
+        self.assertEqual(result["probability_roi_positive"], 1.0)
+
+    def test_normal_is_truncated_not_clipped(self):
+        spec = {"distribution": "normal", "mean": 0, "std": 1, "low": 0, "high": 1}
+        values = sample(spec, np.random.default_rng(3), 200000)
+        self.assertTrue(((values >= 0) & (values <= 1)).all())
+        # No mass piled up on the bounds; mean of the standard normal truncated to [0, 1]
+        self.assertLess(np.count_nonzero((values == 0) | (values == 1)), 2)
+        self.assertAlmostEqual(values.mean(), 0.4599, delta=0.005)
+        with self.assertRaises(ValueError):
+            validate_distribution({"distribution": "normal", "mean": 0, "std": 1, "low": 5})
+
+    def test_zero_investment_roi_is_null(self):
+        base = _numeric_base({"monthly_price_usd": 0, "implementation_cost": 0})
+        result = run_simulation(base, {"team_members": {"distribution": "uniform", "low": 1, "high": 5}}, 1000, seed=2)
+        self.assertIsNone(result["metrics"]["roi_percentage"])
+        self.assertEqual(result["metrics"]["total_annual_savings"]["draws"], 1000)
+
+        original = server.get_simulation_pool
+        server.get_simulation_pool = lambda: None
+        try:
+            response = TestClient(app).post("/api/calculate-roi/simulate", json={
+                "base": {"monthly_price_usd": 0, "implementation_cost": 0},
+                "distributions": {"team_members": {"distribution": "uniform", "low": 1, "high": 5}},
+                "draws": 1000,
+            })
+        finally:
+            server.get_simulation_pool = original
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["metrics"]["roi_percentage"])
+
+    def test_endpoint_validates_distributions(self):
+        client = TestClient(app)
+        response = client.post("/api/calculate-roi/simulate", json={
+            "distributions": {"team_members": {"distribution": "triangular", "low": 5, "mode": 1, "high": 3}},
+            "draws": 10,
+        })
+        self.assertEqual(response.status_code, 400)
+
+        original = server.get_simulation_pool
+        server.get_simulation_pool = lambda: None
+        try:
+            response = client.post("/api/calculate-roi/simulate", json={
+                "distributions": {"team_members": {"distribution": "uniform", "low": 1, "high": 5}},
+                "draws": 1000,
+            })
+        finally:
+            server.get_simulation_pool = original
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json()["seed"], int)
+
+
+if __name__ == "__main__":
+    unittest.main()
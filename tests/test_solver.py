@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from projection import MAX_MONTHS, project_cash_flow_columns, ramp_fractions
+from server import _numeric_base, app
+from solver import solve
+from vectorized import compute_roi_columns, rows_to_columns
+
+CLIENTS = rows_to_columns([
+    _numeric_base({}),
+    _numeric_base({"monthly_inquiries": 300, "team_members": 1}),
+    _numeric_base({"hourly_cost_ars": 9000, "implementation_cost": 3000000}),
+])
+
+
+def evaluate(variable, values, metric):
+    columns = {**CLIENTS, variable: np.asarray(values, dtype=np.float64)}
+    if metric == "payback_months":
+        payback = project_cash_flow_columns(columns, ramp_fractions(MAX_MONTHS), 800, rounded=False)
+        payback = payback["payback_months"]
+        return np.where(np.isnan(payback), np.inf, payback)
+    return compute_roi_columns(columns, 800, rounded=False)[metric]
+
+
+class TestSolver(unittest.TestCase):
+
+    def test_closed_form_minimum(self):
+        result, method = solve(CLIENTS, "roi_percentage", 150, "automation_percentage", usd_to_ars=800)
+        self.assertEqual(method, "closed_form")
+        self.assertTrue(result["is_minimum"].all())
+        value = result["value"]
+        self.assertTrue((evaluate("automation_percentage", value, "roi_percentage") >= 150).all())
+        self.assertTrue((evaluate("automation_percentage", value - 0.01, "roi_percentage") < 150).all())
+        # Small client would need more than 100% automation
+        self.assertEqual(result["feasible"].tolist(), [True, False, True])
+
+    def test_closed_form_target_met_throughout(self):
+        # Without any automation the ROI is already above -50%: the least needed is the lower bound
+        result, _ = solve(CLIENTS, "roi_percentage", -50, "automation_percentage", usd_to_ars=800)
+        self.assertEqual(result["value"].tolist(), [0.0, 0.0, 0.0])
+        self.assertTrue(result["feasible"].all())
+        self.assertTrue((evaluate("automation_percentage", [0.0] * 3, "roi_percentage") >= -50).all())
+        # An investment that can't push ROI below the target: the most allowed is the upper bound
+        result, _ = solve(CLIENTS, "roi_percentage", -99, "implementation_cost", upper=1e6, usd_to_ars=800)
+        self.assertEqual(result["value"].tolist(), [1e6] * 3)
+        self.assertTrue(result["feasible"].all())
+
+    def test_closed_form_maximum_investment(self):
+        result, _ = solve(CLIENTS, "roi_percentage", 100, "implementation_cost", usd_to_ars=800)
+        self.assertFalse(result["is_minimum"].any())
+        value = result["value"]
+        self.assertTrue((evaluate("implementation_cost", value, "roi_percentage") >= 100).all())
+        self.assertTrue((evaluate("implementation_cost", value + 1, "roi_percentage") < 100).all())
+
+    def test_bisection_for_payback(self):
+        result, method = solve(CLIENTS, "payback_months", 6, "monthly_inquiries", usd_to_ars=800)
+        self.assertEqual(method, "bisection")
+        value = result["value"]
+        self.assertTrue(result["feasible"].all())
+        self.assertTrue((evaluate("monthly_inquiries", value, "payback_months") <= 6).all())
+        # The default client already pays back within 6 months with no inquiries at all (CRM savings)
+        self.assertEqual(value[0], 0)
+        self.assertTrue((evaluate("monthly_inquiries", value - 1, "payback_months")[1:] > 6).all())
+
+    def test_bisection_uses_exact_payback(self):
+        # Rounding the payback to 2 decimals during the search would allow up to 3.005 months
+        result, _ = solve(CLIENTS, "payback_months", 3, "implementation_cost", usd_to_ars=800)
+        value = result["value"]
+        self.assertTrue((evaluate("implementation_cost", value, "payback_months") <= 3).all())
+        self.assertTrue((evaluate("implementation_cost", value + 2, "payback_months") > 3).all())
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            solve(CLIENTS, "total_annual_savings", 1, "implementation_cost")
+
+
+class TestSolveEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_batch(self):
+        response = self.client.post("/api/calculate-roi/solve", json={
+            "target": 100, "variable": "team_members", "rows": [{}, {"monthly_crm_hours": 0, "monthly_inquiries": 1}],
+        })
+        self.assertEqual(response.status_code, 200)
+        columns = response.json()["columns"]
+        self.assertIsInstance(columns["value"][0], float)
+        self.assertEqual(columns["value"][0], int(columns["value"][0]))
+        # No amount of team members helps without CRM hours
+        self.assertIsNone(columns["value"][1])
+        self.assertIsNone(columns["unbounded_value"][1])
+
+    def test_rejects_bad_requests(self):
+        for payload in ({"target": 1, "variable": "bitrix24_plan"}, {"target": 1, "variable": "team_members",
+                                                                   "rows": [{"bogus": 1}]}):
+            self.assertEqual(self.client.post("/api/calculate-roi/solve", json=payload).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import unittest
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from server import app
+from sweep import iter_grid_chunks
+
+
+class TestROISweep(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_sweep_streams_cartesian_grid(self):
+        """Each grid point appears once and matches the per-request endpoint"""
+        payload = {
+            "base": {"team_members": 4},
+            "ranges": {
+                "automation_percentage": {"start": 40, "stop": 80, "steps": 3},
+                "hourly_cost_ars": {"values": [4000, 6000]},
+            },
+            "outputs": ["roi_percentage", "total_annual_savings"],
+        }
+        response = self.client.post("/api/calculate-roi/sweep", json=payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["x-sweep-points"], "6")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(set(rows[0]), {"automation_percentage", "hourly_cost_ars", "roi_percentage", "total_annual_savings"})
+
+        last = rows[-1]
+        single = self.client.post("/api/calculate-roi", json={
+            "user_email": "sweep@example.com",
+            "team_members": 4,
+            "automation_percentage": last["automation_percentage"],
+            "hourly_cost_ars": int(last["hourly_cost_ars"]),
+        }).json()
+        self.assertEqual(last["roi_percentage"], single["roi_percentage"])
+        self.assertEqual(last["total_annual_savings"], single["total_annual_savings"])
+
+    def test_grid_chunks_cover_grid_in_order(self):
+        """Chunks are bounded and concatenate to the full row-major grid"""
+        axes = {"team_members": np.arange(1.0, 8.0), "minutes_per_inquiry": np.arange(1.0, 6.0)}
+        chunks = list(iter_grid_chunks({}, axes, chunk_size=4))
+        self.assertTrue(all(len(chunk["team_members"]) <= 4 for chunk in chunks))
+        team = np.concatenate([chunk["team_members"] for chunk in chunks])
+        minutes = np.concatenate([chunk["minutes_per_inquiry"] for chunk in chunks])
+        expected_team, expected_minutes = np.meshgrid(axes["team_members"], axes["minutes_per_inquiry"], indexing="ij")
+        np.testing.assert_array_equal(team, expected_team.ravel())
+        np.testing.assert_array_equal(minutes, expected_minutes.ravel())
+
+    def test_zero_investment_is_null(self):
+        """Zero total investment (licenses offset by a negative implementation cost) has no finite ROI"""
+        response = self.client.post("/api/calculate-roi/sweep", json={
+            "ranges": {"implementation_cost": {"values": [-950400, 0]}}, "outputs": ["roi_percentage"],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Infinity", response.text)
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertIsNone(rows[0]["roi_percentage"])
+        self.assertIsInstance(rows[1]["roi_percentage"], float)
+
+    def test_sweep_rejects_unknown_fields(self):
+        response = self.client.post("/api/calculate-roi/sweep", json={"ranges": {"bitrix24_plan": {"values": [1]}}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sweep_rejects_empty_values(self):
+        response = self.client.post("/api/calculate-roi/sweep", json={"ranges": {"team_members": {"values": []}}})
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()